@@ -0,0 +1,477 @@
+"""Büyük hacimli, tekrarlanabilir deneme verisi.
+
+Restoranlar (sahip/kasa/mutfak kullanıcılarıyla), masalar, menüler, aylara yayılmış
+siparişler, yorumlar ve garson çağrıları üretir. Aynı --seed ve --now ile her çalıştırma
+birebir aynı dokümanları yazar; böylece get_owner_stats / get_admin_analytics ölçümleri
+farklı makinelerde ve commit'lerde karşılaştırılabilir.
+
+    python seed_data.py --restaurants 200 --orders 2000000 --months 12 --now 2024-06-01T12:00:00+00:00
+    python seed_data.py --restaurants 5 --orders 20000 --drop
+
+Dağılımlar:
+  - Restoran büyüklüğü log-normal: birkaç yoğun restoran siparişlerin çoğunu alır.
+  - Sipariş zamanı hafta sonu ve öğle/akşam yoğunluğu ile, geçmişe doğru azalan büyüme eğilimiyle dağılır.
+  - Ürün popülerliği Zipf; sepet 1-5 kalem, adetler çoğunlukla 1.
+  - Durumlar status_history'den türetilir: yalnızca son birkaç saatin siparişleri açıktır.
+  - Tamamlanan siparişlerin ~%8'i yorum alır; puanlar restoranın kalitesine göre kayar.
+  - Garson çağrıları sunucudaki TTL penceresindedir; her masada en fazla bir açık çağrı bulunur.
+
+Sunucunun tuttuğu türetilmiş veriler de yazılır: ORDER_ARCHIVE_AFTER_DAYS günden eski
+tamamlanmış siparişler orders_archive_YYYY_MM bölümlerine, son 8 günün satışları item_sales'e,
+puan toplamları review_stats'e. Üretim restoran başına bağımsız bir RNG ile işçi süreçlerde,
+yazma eşzamanlı ve sırasız insert_many partileriyle yapılır; parola bir kez hash'lenir.
+"""
+import argparse
+import asyncio
+import base64
+import io
+import itertools
+import math
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from passlib.context import CryptContext
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+ORDER_ARCHIVE_PREFIX = "orders_archive_"
+ITEM_SALES_RETENTION = {"hour": timedelta(days=2), "day": timedelta(days=8)}
+SEED_EMAIL_DOMAIN = "seed.qr-restaurant.com"
+SEED_COLLECTIONS = ("users", "restaurants", "tables", "menu_categories", "menu_items", "orders", "reviews", "review_stats", "waiter_calls", "item_sales")
+
+MENU = {
+    "Kahvaltı": (["Serpme Kahvaltı", "Menemen", "Sucuklu Yumurta", "Gözleme", "Simit Tabağı"], (60, 220), (8, 15)),
+    "Çorbalar": (["Mercimek Çorbası", "Ezogelin", "İşkembe", "Yayla Çorbası", "Domates Çorbası"], (45, 90), (3, 6)),
+    "Başlangıçlar": (["Humus", "Haydari", "Sigara Böreği", "Patlıcan Salatası", "Acılı Ezme"], (50, 120), (4, 8)),
+    "Izgaralar": (["Adana Kebap", "Urfa Kebap", "Kuzu Şiş", "Tavuk Şiş", "Köfte", "Pirzola"], (180, 420), (15, 25)),
+    "Ana Yemekler": (["İskender", "Hünkar Beğendi", "Karnıyarık", "Mantı", "Etli Nohut"], (160, 360), (12, 22)),
+    "Pideler": (["Kıymalı Pide", "Kaşarlı Pide", "Lahmacun", "Kuşbaşılı Pide"], (90, 220), (10, 18)),
+    "Salatalar": (["Çoban Salata", "Gavurdağı", "Sezar Salata", "Roka Salatası"], (70, 160), (4, 8)),
+    "Tatlılar": (["Künefe", "Baklava", "Sütlaç", "Kazandibi", "Katmer"], (80, 200), (5, 12)),
+    "İçecekler": (["Ayran", "Çay", "Türk Kahvesi", "Şalgam", "Limonata", "Kola"], (20, 80), (1, 3)),
+}
+STREETS = ["Atatürk Cd.", "İstiklal Cd.", "Bağdat Cd.", "Cumhuriyet Cd.", "Kordon Boyu", "Gazi Blv."]
+NAME_WORDS = ["Lezzet", "Sofra", "Ocakbaşı", "Konak", "Bahçe", "Köşk", "Liman", "Çınar", "Mavi", "Usta"]
+
+# Saat (UTC) ve haftanın günü (Pzt..Paz) ağırlıkları: öğle ve akşam yoğun, gece kapalı
+HOUR_WEIGHTS = [2, 1, 0, 0, 0, 0, 0, 0, 1, 3, 5, 8, 14, 16, 12, 8, 6, 8, 12, 16, 15, 11, 7, 4]
+WEEKDAY_WEIGHTS = [0.85, 0.85, 0.9, 0.95, 1.2, 1.4, 1.25]
+# Yüzdelik tablolar: sipariş başına rng.choices yerine tek rng.random() ile okunur
+BASKET_SIZES = [1] * 30 + [2] * 35 + [3] * 20 + [4] * 10 + [5] * 5
+QUANTITIES = [1] * 70 + [2] * 22 + [3] * 8
+RATING_WEIGHTS = [5, 7, 13, 30, 45]
+REVIEW_RATE = 0.08
+WAITER_CALLS_PER_ORDER = 0.2
+OPEN_CALL_RATE = 0.04
+COMMENTS = {
+    1: ["Siparişim çok geç geldi.", "Yemek soğuktu.", "Bir daha gelmem."],
+    2: ["Porsiyonlar küçük.", "Servis yavaştı.", "Beklediğim gibi değildi."],
+    3: ["Fena değil.", "Ortalama bir deneyim.", "Fiyatlar biraz yüksek."],
+    4: ["Lezzetliydi, tavsiye ederim.", "Güzel ortam, hızlı servis.", "Tekrar geleceğiz."],
+    5: ["Harika!", "Şehrin en iyisi.", "Her şey mükemmeldi, teşekkürler."],
+}
+
+
+def seeded_id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def iso(value: datetime) -> str:
+    return value.isoformat()
+
+
+def restaurant_order_counts(options) -> list:
+    """Toplam siparişi restoranlara log-normal ağırlıklarla böler (--seed ile sabit)."""
+    rng = random.Random(f"{options.seed}:sizes")
+    weights = [rng.lognormvariate(0, 0.8) for _ in range(options.restaurants)]
+    if not weights:
+        return []
+    total = sum(weights)
+    # Yuvarlama farkı son restorana yazılır: toplam her zaman tam --orders olur
+    counts = [int(options.orders * w / total) for w in weights[:-1]]
+    return counts + [options.orders - sum(counts)]
+
+
+def order_times(rng: random.Random, now: datetime, days: int, count: int) -> list:
+    start = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_starts = [start + timedelta(days=d) for d in range(days + 1)]
+    day_weights = [
+        WEEKDAY_WEIGHTS[day.weekday()] * (0.7 + 0.3 * d / days)
+        for d, day in enumerate(day_starts)
+    ]
+    picked_days = rng.choices(day_starts, weights=day_weights, k=count)
+    picked_hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+    times = []
+    for day, hour in zip(picked_days, picked_hours):
+        at = day + timedelta(hours=hour, seconds=rng.random() * 3600)
+        # Bugünün henüz gelmemiş saatleri önceki güne kayar
+        times.append(at if at <= now else at - timedelta(days=1))
+    times.sort()
+    return times
+
+
+def build_menu(rng: random.Random, restaurant_id: str, item_count: int, created_at: str):
+    category_names = rng.sample(list(MENU), k=min(len(MENU), max(3, item_count // 8)))
+    categories = [{
+        "id": seeded_id(rng),
+        "restaurant_id": restaurant_id,
+        "name": name,
+        "order": index + 1,
+        "created_at": created_at,
+    } for index, name in enumerate(category_names)]
+
+    items = []
+    for index in range(item_count):
+        category = categories[index % len(categories)]
+        names, (low, high), (prep_low, prep_high) = MENU[category["name"]]
+        base = names[(index // len(categories)) % len(names)]
+        round_number = index // (len(categories) * len(names))
+        items.append({
+            "id": seeded_id(rng),
+            "restaurant_id": restaurant_id,
+            "category_id": category["id"],
+            "name": base if round_number == 0 else f"{base} {round_number + 1}",
+            "description": f"{base}, günlük taze hazırlanır",
+            "price": float(rng.randrange(low, high + 1, 5)),
+            "image_url": None,
+            "available": rng.random() > 0.05,
+            "preparation_time_minutes": rng.randint(prep_low, prep_high),
+            "created_at": created_at,
+        })
+    return categories, items
+
+
+def build_order(rng: random.Random, restaurant_id: str, table: dict, created: datetime, now: datetime, items: list, cum_weights: list) -> dict:
+    lines = {}
+    draw = rng.random
+    for item in rng.choices(items, cum_weights=cum_weights, k=BASKET_SIZES[int(draw() * 100)]):
+        line = lines.get(item["id"])
+        if line is None:
+            lines[item["id"]] = {
+                "menu_item_id": item["id"],
+                "name": item["name"],
+                "price": item["price"],
+                "quantity": QUANTITIES[int(draw() * 100)],
+                "preparation_time_minutes": item["preparation_time_minutes"],
+            }
+        else:
+            line["quantity"] += 1
+    order_items = list(lines.values())
+    max_prep = max(line["preparation_time_minutes"] for line in order_items)
+
+    preparing = created + timedelta(minutes=rng.uniform(0.5, 6))
+    ready = preparing + timedelta(minutes=max_prep * rng.uniform(0.8, 1.6))
+    completed = ready + timedelta(minutes=rng.uniform(3, 45))
+    history, status = {"pending": iso(created)}, "pending"
+    for name, at in (("preparing", preparing), ("ready", ready), ("completed", completed)):
+        if at > now:
+            break
+        history[name], status = iso(at), name
+
+    return {
+        "id": seeded_id(rng),
+        "restaurant_id": restaurant_id,
+        "table_id": table["id"],
+        "table_number": table["table_number"],
+        "items": order_items,
+        "total_amount": round(sum(line["price"] * line["quantity"] for line in order_items), 2),
+        "payment_method": "card" if rng.random() < 0.65 else "cash",
+        "status": status,
+        "estimated_completion_minutes": max_prep + 5,
+        "status_history": history,
+        "created_at": history["pending"],
+        "updated_at": history[status],
+    }
+
+
+def build_waiter_calls(rng: random.Random, restaurant_id: str, tables: list, now: datetime, recent_orders: int, ttl: timedelta) -> list:
+    calls = []
+    for created in order_times(rng, now, max(1, ttl.days), int(recent_orders * WAITER_CALLS_PER_ORDER)):
+        if created < now - ttl:
+            continue
+        table = rng.choice(tables)
+        call_count = rng.choices([1, 2, 3], [75, 20, 5])[0]
+        last_called = created + timedelta(seconds=rng.uniform(20, 120) * (call_count - 1))
+        calls.append({
+            "id": seeded_id(rng),
+            "restaurant_id": restaurant_id,
+            "table_id": table["id"],
+            "table_number": table["table_number"],
+            "status": "resolved",
+            "call_count": call_count,
+            "created_at": iso(created),
+            "last_called_at": iso(last_called),
+            "resolved_at": min(now, last_called + timedelta(minutes=rng.uniform(0.5, 8))),
+        })
+    # Masa başına en fazla bir açık çağrı (one_open_call_per_table index'i)
+    for table in tables:
+        if rng.random() < OPEN_CALL_RATE:
+            created = now - timedelta(minutes=rng.uniform(0, 10))
+            calls.append({
+                "id": seeded_id(rng),
+                "restaurant_id": restaurant_id,
+                "table_id": table["id"],
+                "table_number": table["table_number"],
+                "status": "pending",
+                "call_count": 1,
+                "created_at": iso(created),
+                "last_called_at": iso(created),
+            })
+    return calls
+
+
+def item_sales_docs(restaurant_id: str, orders: list, now: datetime) -> list:
+    """Sunucunun record_item_sales ile tuttuğu saatlik/günlük satış sayaçları (yalnızca saklama süresi içindekiler)."""
+    buckets = {}
+    for order in orders:
+        created = datetime.fromisoformat(order["created_at"])
+        for window, bucket in (("hour", created.strftime("%Y-%m-%dT%H")), ("day", created.strftime("%Y-%m-%d"))):
+            if created + ITEM_SALES_RETENTION[window] <= now:
+                continue
+            doc = buckets.get((window, bucket))
+            if doc is None:
+                doc = buckets[(window, bucket)] = {
+                    "restaurant_id": restaurant_id, "window": window, "bucket": bucket,
+                    "counts": defaultdict(int), "names": {}, "expires_at": created + ITEM_SALES_RETENTION[window],
+                }
+            for line in order["items"]:
+                doc["counts"][line["menu_item_id"]] += line["quantity"]
+                doc["names"][line["menu_item_id"]] = line["name"]
+    for doc in buckets.values():
+        doc["counts"] = dict(doc["counts"])
+    return list(buckets.values())
+
+
+def generate_restaurant(index: int, order_count: int, options, password_hash: str) -> dict:
+    """Bir restoranın tüm dokümanları; yalnızca (seed, index) çiftine bağlıdır, işçi sayısından bağımsızdır."""
+    rng = random.Random(f"{options.seed}:restaurant:{index}")
+    now = options.now
+    days = options.months * 30
+    number = index + 1
+    opened = now - timedelta(days=days + rng.randint(0, 90))
+    restaurant_id = seeded_id(rng)
+    docs = defaultdict(list)
+
+    staff = [("owner", "owner", f"{rng.choice(NAME_WORDS)} Sahibi")]
+    kasa_enabled, mutfak_enabled = rng.random() < 0.7, rng.random() < 0.6
+    if kasa_enabled:
+        staff.append(("cashier", "kasa", "Kasa"))
+    if mutfak_enabled:
+        staff.append(("kitchen", "mutfak", "Mutfak"))
+    for role, prefix, full_name in staff:
+        docs["users"].append({
+            "id": seeded_id(rng),
+            "email": f"{prefix}{number}@{SEED_EMAIL_DOMAIN}",
+            "full_name": full_name,
+            "password": password_hash,
+            "role": role,
+            "restaurant_id": restaurant_id,
+            "created_at": opened,
+        })
+    docs["restaurants"].append({
+        "id": restaurant_id,
+        "name": f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {number}",
+        "address": f"{rng.choice(STREETS)} No:{rng.randint(1, 250)}",
+        "phone": f"+90 5{rng.randint(30, 59)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        "owner_id": docs["users"][0]["id"],
+        "subscription_status": "active" if rng.random() < 0.9 else "expired",
+        "subscription_end_date": now + timedelta(days=rng.randint(-30, 365)),
+        "created_at": opened,
+        "kasa_enabled": kasa_enabled,
+        "mutfak_enabled": mutfak_enabled,
+    })
+
+    tables = [{
+        "id": seeded_id(rng),
+        "restaurant_id": restaurant_id,
+        "table_number": str(t + 1),
+        "qr_code": "",
+        "created_at": iso(opened),
+    } for t in range(rng.randint(options.min_tables, options.max_tables))]
+    if options.qr_codes:
+        import qrcode
+        for table in tables:
+            buffer = io.BytesIO()
+            qrcode.make(f"https://tabletech-1-production.up.railway.app/menu/{table['id']}").save(buffer, format="PNG")
+            table["qr_code"] = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+    docs["tables"] = tables
+
+    categories, items = build_menu(rng, restaurant_id, rng.randint(options.min_menu_items, options.max_menu_items), iso(opened))
+    docs["menu_categories"], docs["menu_items"] = categories, items
+
+    # Zipf popülerlik: menüdeki sırası karıştırılmış ürünlerin ağırlığı 1/rank^1.1
+    popular = rng.sample(items, len(items))
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(popular))))
+    # Bazı masalar (cam kenarı, bahçe) diğerlerinden daha sık dolar
+    table_weights = [rng.uniform(0.5, 1.5) for _ in tables]
+
+    quality = rng.gauss(0, 1)
+    rating_weights = [w * math.exp(quality * (r - 3) * 0.35) for r, w in zip(range(1, 6), RATING_WEIGHTS)]
+    review_stats = {"restaurant_id": restaurant_id, "count": 0, "sum": 0, "histogram": {}}
+    archive_cutoff = now - timedelta(days=options.archive_after_days) if options.archive_after_days > 0 else None
+    recent_orders, sales_orders = 0, []
+
+    created_times = order_times(rng, now, days, order_count)
+    for created, table in zip(created_times, rng.choices(tables, weights=table_weights, k=len(created_times))):
+        order = build_order(rng, restaurant_id, table, created, now, popular, cum_weights)
+        if archive_cutoff is not None and order["status"] == "completed" and created < archive_cutoff:
+            docs[f"{ORDER_ARCHIVE_PREFIX}{order['created_at'][:4]}_{order['created_at'][5:7]}"].append(order)
+        else:
+            docs["orders"].append(order)
+        if created >= now - ITEM_SALES_RETENTION["day"]:
+            sales_orders.append(order)
+        if created >= now - options.waiter_call_ttl:
+            recent_orders += 1
+
+        if order["status"] == "completed" and rng.random() < REVIEW_RATE:
+            reviewed = datetime.fromisoformat(order["status_history"]["completed"]) + timedelta(minutes=rng.uniform(5, 180))
+            if reviewed <= now:
+                rating = rng.choices(range(1, 6), weights=rating_weights)[0]
+                docs["reviews"].append({
+                    "id": seeded_id(rng),
+                    "restaurant_id": restaurant_id,
+                    "order_id": order["id"],
+                    "rating": rating,
+                    "comment": rng.choice(COMMENTS[rating]),
+                    "created_at": iso(reviewed),
+                })
+                review_stats["count"] += 1
+                review_stats["sum"] += rating
+                review_stats["histogram"][str(rating)] = review_stats["histogram"].get(str(rating), 0) + 1
+
+    if review_stats["count"]:
+        docs["review_stats"].append(review_stats)
+    docs["item_sales"] = item_sales_docs(restaurant_id, sales_orders, now)
+    docs["waiter_calls"] = build_waiter_calls(rng, restaurant_id, tables, now, recent_orders, options.waiter_call_ttl)
+    return dict(docs)
+
+
+async def insert_batches(db, name: str, docs: list, options, semaphore: asyncio.Semaphore, counts: dict):
+    async def insert(batch):
+        async with semaphore:
+            await db[name].insert_many(batch, ordered=False)
+        counts[name] += len(batch)
+
+    await asyncio.gather(*[
+        insert(docs[start:start + options.batch_size]) for start in range(0, len(docs), options.batch_size)
+    ])
+
+
+async def drop_seeded(db) -> int:
+    """Yalnızca önceki seed'lerin restoranlarını siler: kullanıcısı @SEED_EMAIL_DOMAIN olan restoranlar
+    ve bu restoranların tüm koleksiyonlardaki (arşiv bölümleri dahil) dokümanları. Gerçek veri kalır."""
+    restaurant_ids = set()
+    async for user in db.users.find({}, {"_id": 0, "email": 1, "restaurant_id": 1}):
+        if user.get("restaurant_id") and str(user.get("email", "")).endswith(f"@{SEED_EMAIL_DOMAIN}"):
+            restaurant_ids.add(user["restaurant_id"])
+    if not restaurant_ids:
+        return 0
+
+    seeded = {"$in": sorted(restaurant_ids)}
+    names = [n for n in SEED_COLLECTIONS if n != "restaurants"]
+    names += [n for n in await db.list_collection_names() if n.startswith(ORDER_ARCHIVE_PREFIX)]
+    for name in names:
+        await db[name].delete_many({"restaurant_id": seeded})
+    await db.restaurants.delete_many({"id": seeded})
+    return len(restaurant_ids)
+
+
+async def seed_data(db, options) -> dict:
+    """Seçeneklere göre veriyi üretip `db`ye yazar; koleksiyon başına yazılan doküman sayısını döner."""
+    if options.drop:
+        print(f"✓ {await drop_seeded(db)} seed restoranı ve verileri silindi")
+
+    # bcrypt kasıtlı olarak yavaştır: tüm kullanıcılar aynı parolayı paylaşır, hash bir kez hesaplanır
+    password_hash = pwd_context.hash(options.password)
+    order_counts = restaurant_order_counts(options)
+    counts = defaultdict(int)
+    semaphore = asyncio.Semaphore(options.concurrency)
+    # Sırasız insert_many'ler ve restoran üretimi aynı anda ilerler; bekleyen restoran sayısı sınırlıdır
+    pending = asyncio.Semaphore(max(2, options.workers * 2))
+    loop = asyncio.get_running_loop()
+    executor = ProcessPoolExecutor(max_workers=options.workers) if options.workers > 1 else None
+    started = time.perf_counter()
+
+    async def seed_restaurant(index: int):
+        async with pending:
+            if executor is None:
+                docs = generate_restaurant(index, order_counts[index], options, password_hash)
+            else:
+                docs = await loop.run_in_executor(executor, generate_restaurant, index, order_counts[index], options, password_hash)
+            await asyncio.gather(*[insert_batches(db, name, batch, options, semaphore, counts) for name, batch in docs.items()])
+
+    try:
+        await asyncio.gather(*[seed_restaurant(index) for index in range(options.restaurants)])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Arşiv bölümlerinin index'leri; sıcak koleksiyonlarınkini sunucu açılışta kurar
+    for name in counts:
+        if name.startswith(ORDER_ARCHIVE_PREFIX):
+            await db[name].create_index("id", unique=True)
+            await db[name].create_index([("restaurant_id", 1), ("created_at", 1)])
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"✓ {total} doküman {elapsed:.1f} sn'de yazıldı ({total / max(elapsed, 1e-9):,.0f} doküman/sn)")
+    for name in sorted(counts):
+        print(f"  {name}: {counts[name]}")
+    return dict(counts)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--restaurants", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=100000, help="toplam sipariş (arşiv dahil)")
+    parser.add_argument("--months", type=int, default=6, help="siparişlerin yayıldığı ay sayısı")
+    parser.add_argument("--min-tables", type=int, default=8)
+    parser.add_argument("--max-tables", type=int, default=30)
+    parser.add_argument("--min-menu-items", type=int, default=25)
+    parser.add_argument("--max-menu-items", type=int, default=80)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None,
+                        help="verinin bittiği an (ISO); tekrarlanabilir çalıştırmalar için sabitleyin")
+    parser.add_argument("--password", default="demo123", help="tüm restoran kullanıcılarının parolası")
+    parser.add_argument("--archive-after-days", type=int, default=int(os.environ.get("ORDER_ARCHIVE_AFTER_DAYS", "30")),
+                        help="bu günden eski tamamlanmış siparişler arşiv bölümlerine yazılır; 0 = hepsi orders'a")
+    parser.add_argument("--waiter-call-ttl-seconds", type=int, default=int(os.environ.get("WAITER_CALL_TTL_SECONDS", str(60 * 60 * 24))))
+    parser.add_argument("--qr-codes", action="store_true", help="masalara gerçek QR PNG'leri üret (yavaş)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="insert_many başına doküman")
+    parser.add_argument("--concurrency", type=int, default=8, help="aynı anda açık insert_many sayısı")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="üretim için süreç sayısı")
+    parser.add_argument("--drop", action="store_true",
+                        help=f"yazmadan önce önceki seed restoranlarını (@{SEED_EMAIL_DOMAIN} kullanıcıları) ve verilerini sil")
+    options = parser.parse_args(argv)
+    if options.now is None:
+        options.now = datetime.now(timezone.utc)
+    elif options.now.tzinfo is None:
+        options.now = options.now.replace(tzinfo=timezone.utc)
+    options.waiter_call_ttl = timedelta(seconds=options.waiter_call_ttl_seconds)
+    return options
+
+
+async def main(argv=None):
+    options = parse_args(argv)
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        await seed_data(db, options)
+    finally:
+        client.close()
+    print(f"  Giriş: owner1@{SEED_EMAIL_DOMAIN} / {options.password}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,43 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
+from starlette.datastructures import Headers
 from starlette.middleware.cors import CORSMiddleware
+from starlette.staticfiles import NotModifiedResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne, timeout as operation_timeout
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 import os
+import asyncio
+import cProfile
+import contextlib
+import contextvars
+import csv
+import gzip
+import hashlib
+import heapq
+import hmac
+import ipaddress
+import json
 import logging
+import math
+import mimetypes
+import pstats
+import re
+import socket
+import stat
+import sys
+import threading
+import time
 import traceback
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from urllib.parse import parse_qsl
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
+from typing import Dict, List, Optional, Set
 import uuid
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
@@ -18,6 +45,10 @@ from jose import JWTError, jwt
 import qrcode
 import io
 import base64
+import httpx
+from PIL import Image, ImageOps
+
+from backend.storage import open_local_storage
 
 # -------------------------
 # ENV yükle
@@ -30,17 +61,71 @@ load_dotenv(ROOT_DIR / ".env")
 # -------------------------
 app = FastAPI()
 
+# -------------------------
+# DEPOLAMA ARKA UCU
+# STORAGE_BACKEND Motor'un kullanılan alt kümesini sağlayan depoyu seçer: mongo (varsayılan),
+# memory ya da sqlite (SQLITE_PATH). Yerel depolar backend/storage.py'dedir.
+# -------------------------
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", str(ROOT_DIR / "tabletech.sqlite3"))
+
 # -------------------------
 # Mongo bağlantısını ENV'den al
 # -------------------------
 MONGO_URL = os.environ.get("MONGO_URL")
 DB_NAME = os.environ.get("DB_NAME", "railway")
 
-if not MONGO_URL:
+if STORAGE_BACKEND == "mongo" and not MONGO_URL:
     raise Exception("MONGO_URL environment variable not set!")
 
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
+# -------------------------
+# İstek kapsamlı cursor takibi: istemci koptuğunda isteğin açtığı cursor'lar kapatılır
+# (bkz. İSTEK SÜRESİ SINIRI). Koleksiyonlar dışındaki her şey olduğu gibi geçer.
+# -------------------------
+request_cursors: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_cursors", default=None)
+
+def track_cursor(cursor):
+    cursors = request_cursors.get()
+    if cursors is not None:
+        cursors.append(cursor)
+    return cursor
+
+class CursorTrackingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name: str):
+        return getattr(self.collection, name)
+
+    def find(self, *args, **kwargs):
+        return track_cursor(self.collection.find(*args, **kwargs))
+
+    def aggregate(self, *args, **kwargs):
+        return track_cursor(self.collection.aggregate(*args, **kwargs))
+
+class CursorTrackingDatabase:
+    def __init__(self, database):
+        self.database = database
+        self.collections: Dict[str, CursorTrackingCollection] = {}
+
+    def __getattr__(self, name: str):
+        collection = self.collections.get(name)
+        if collection is None:
+            attr = getattr(self.database, name)
+            if not hasattr(attr, "find"):
+                return attr
+            collection = self.collections[name] = CursorTrackingCollection(attr)
+        return collection
+
+    def __getitem__(self, name: str):
+        return self.__getattr__(name)
+
+if STORAGE_BACKEND == "mongo":
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = CursorTrackingDatabase(client[DB_NAME])
+else:
+    client = None
+    db = CursorTrackingDatabase(open_local_storage(STORAGE_BACKEND, SQLITE_PATH))
 
 # -------------------------
 # Mongo bağlantı testi (SADECE BİR KEZ)
@@ -49,10 +134,86 @@ db = client[DB_NAME]
 async def startup_db_check():
     try:
         await db.command("ping")
-        print("✅ MongoDB Connected")
+        print("✅ MongoDB Connected" if client is not None else f"✅ Yerel depo hazır: {STORAGE_BACKEND}")
     except Exception as e:
         print("❌ MongoDB Connection Error:", e)
 
+# -------------------------
+# Index'ler (idempotent, her açılışta)
+# -------------------------
+@app.on_event("startup")
+async def ensure_indexes():
+    try:
+        await db.waiter_calls.create_index("id")
+        await db.waiter_calls.create_index([("restaurant_id", 1), ("status", 1), ("created_at", -1)])
+        # Masa başına tek açık çağrı: coalescing upsert'ünün yarış durumunda da tekil kalmasını sağlar.
+        # Birleştirme kapalıyken her dokunuş ayrı kayıttır, index kurulmaz.
+        if WAITER_CALL_COALESCE:
+            await db.waiter_calls.create_index(
+                [("restaurant_id", 1), ("table_id", 1)],
+                unique=True,
+                partialFilterExpression={"status": "pending"},
+                name="one_open_call_per_table",
+            )
+        # Çözülen çağrılar WAITER_CALL_TTL_SECONDS sonra Mongo tarafından silinir
+        await db.waiter_calls.create_index(
+            "resolved_at",
+            expireAfterSeconds=WAITER_CALL_TTL_SECONDS,
+            partialFilterExpression={"status": "resolved"},
+        )
+        await db.orders.create_index("id")
+        await db.orders.create_index([("restaurant_id", 1), ("status", 1), ("created_at", 1)])
+        await db.orders.create_index([("status", 1), ("created_at", 1)])
+        await db.item_sales.create_index([("restaurant_id", 1), ("window", 1), ("bucket", 1)], unique=True)
+        await db.item_sales.create_index("expires_at", expireAfterSeconds=0)
+        await db.reviews.create_index([("restaurant_id", 1), ("created_at", -1), ("id", -1)])
+        await db.review_stats.create_index("restaurant_id", unique=True)
+        await db.cache_versions.create_index("updated_at", expireAfterSeconds=CACHE_VERSION_RETENTION_SECONDS)
+        await db.order_events.create_index([("restaurant_id", 1), ("seq", 1)], unique=True)
+        await db.order_events.create_index("created_at", expireAfterSeconds=ORDER_EVENT_TTL_SECONDS)
+        # Menü içe aktarma upsert'ü ve kategori bazlı dışa aktarma bu index'i kullanır
+        await db.menu_items.create_index([("restaurant_id", 1), ("category_id", 1), ("name", 1)])
+        # Kimlik ve kiracı aramaları; yerel depolar da sorgu planında bu index'leri kullanır
+        await db.users.create_index("id")
+        await db.users.create_index("email")
+        await db.users.create_index("restaurant_id")
+        await db.restaurants.create_index("id")
+        await db.tables.create_index("id")
+        await db.tables.create_index("restaurant_id")
+        await db.menu_items.create_index("id")
+        await db.menu_categories.create_index("id")
+        await db.menu_categories.create_index([("restaurant_id", 1), ("order", 1)])
+        await db.reviews.create_index("id")
+        await db.migrations.create_index("id", unique=True)
+    except Exception as e:
+        print("❌ Index oluşturma hatası:", e)
+
+# -------------------------
+# Tek seferlik veri taşımaları
+# Her taşıma migrations koleksiyonuna kendi id'siyle bir kez yazılır; aynı anda açılan
+# worker'lardan yalnızca kaydı ekleyebilen çalıştırır. Hata olursa kayıt silinir, sonraki açılışta yeniden denenir.
+# -------------------------
+async def claim_migration(name: str) -> Optional[datetime]:
+    started_at = datetime.now(timezone.utc)
+    try:
+        await db.migrations.insert_one({"id": name, "started_at": started_at.isoformat()})
+    except DuplicateKeyError:
+        return None
+    return started_at
+
+async def run_migration(name: str, migration):
+    started_at = await claim_migration(name)
+    if started_at is None:
+        return
+    try:
+        result = await migration(started_at)
+    except Exception as e:
+        await db.migrations.delete_one({"id": name})
+        print(f"❌ Veri taşıma hatası ({name}):", e)
+        return
+    await db.migrations.update_one({"id": name}, {"$set": {"completed_at": datetime.now(timezone.utc).isoformat()}})
+    print(f"✅ Veri taşıma tamamlandı ({name}):", result)
+
 # -------------------------
 # DEBUG endpoint (admin panel sorunu için)
 # -------------------------
@@ -179,6 +340,7 @@ class MenuItem(BaseModel):
     description: str
     price: float
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, dict]] = None
     available: bool = True
     preparation_time_minutes: int = 10
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -192,6 +354,21 @@ class MenuItemCreate(BaseModel):
     available: bool = True
     preparation_time_minutes: int = 10
 
+class MenuImportRow(BaseModel):
+    category: str = Field(min_length=1)
+    name: str = Field(min_length=1)
+    description: str = ""
+    price: float = Field(ge=0)
+    image_url: Optional[str] = None
+    available: bool = True
+    preparation_time_minutes: int = Field(default=10, ge=0)
+
+class CategoryReorder(BaseModel):
+    category_ids: List[str]
+
+class MenuImageSource(BaseModel):
+    url: str
+
 class OrderItem(BaseModel):
     menu_item_id: str
     name: str
@@ -210,6 +387,7 @@ class Order(BaseModel):
     payment_method: str
     status: str = "pending"
     estimated_completion_minutes: int = 15
+    status_history: Dict[str, datetime] = Field(default_factory=dict)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -224,6 +402,20 @@ class OrderStatusUpdate(BaseModel):
 class OrderPaymentUpdate(BaseModel):
     payment_status: str
 
+class BulkOrderStatusItem(BaseModel):
+    order_id: str
+    status: str
+
+class BulkOrderStatusUpdate(BaseModel):
+    updates: List[BulkOrderStatusItem]
+
+class BulkOrderPaymentItem(BaseModel):
+    order_id: str
+    payment_status: str
+
+class BulkOrderPaymentUpdate(BaseModel):
+    updates: List[BulkOrderPaymentItem]
+
 class Review(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -246,7 +438,9 @@ class WaiterCall(BaseModel):
     table_id: str
     table_number: str
     status: str = "pending"
+    call_count: int = 1
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_called_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class WaiterCallCreate(BaseModel):
     table_id: str
@@ -265,7 +459,9 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+    return await get_user_from_token(credentials.credentials)
+
+async def get_user_from_token(token: str) -> User:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -274,9 +470,15 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    user = await principal_cache.get(user_id, lambda: load_principal(user_id))
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+async def load_principal(user_id: str) -> Optional[User]:
+    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    if user is None:
+        return None
     
     if isinstance(user['created_at'], str):
         user['created_at'] = datetime.fromisoformat(user['created_at'])
@@ -294,6 +496,1609 @@ def generate_qr_code(data: str) -> str:
     img_str = base64.b64encode(buffered.getvalue()).decode()
     return f"data:image/png;base64,{img_str}"
 
+# -----------------------------
+# SİPARİŞ ARŞİVİ
+# Tamamlanmış ve ORDER_ARCHIVE_AFTER_DAYS günden eski siparişler aylık
+# orders_archive_YYYY_MM koleksiyonlarına taşınır; sıcak orders koleksiyonu
+# yalnızca açık ve yakın tarihli siparişleri tutar.
+# -----------------------------
+ORDER_ARCHIVE_PREFIX = "orders_archive_"
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get("ORDER_ARCHIVE_AFTER_DAYS", "30"))
+ORDER_ARCHIVE_INTERVAL_SECONDS = int(os.environ.get("ORDER_ARCHIVE_INTERVAL_SECONDS", "3600"))
+ORDER_ARCHIVE_BATCH_SIZE = 1000
+WAITER_CALL_TTL_SECONDS = int(os.environ.get("WAITER_CALL_TTL_SECONDS", str(60 * 60 * 24)))
+
+def order_archive_name(created_at: str) -> str:
+    return f"{ORDER_ARCHIVE_PREFIX}{created_at[:4]}_{created_at[5:7]}"
+
+_archive_partition_cache = {"names": None, "loaded_at": 0.0}
+ARCHIVE_PARTITION_CACHE_SECONDS = 60
+
+def recent_archive_names() -> List[str]:
+    if ORDER_ARCHIVE_AFTER_DAYS <= 0:
+        return []
+    cutoff = datetime.now(timezone.utc) - timedelta(days=ORDER_ARCHIVE_AFTER_DAYS)
+    previous_month = cutoff.replace(day=1) - timedelta(days=1)
+    return [order_archive_name(previous_month.isoformat()), order_archive_name(cutoff.isoformat())]
+
+async def order_archive_partitions(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+    now = time.monotonic()
+    if _archive_partition_cache["names"] is None or now - _archive_partition_cache["loaded_at"] > ARCHIVE_PARTITION_CACHE_SECONDS:
+        all_names = await db.list_collection_names()
+        _archive_partition_cache["names"] = [n for n in all_names if n.startswith(ORDER_ARCHIVE_PREFIX)]
+        _archive_partition_cache["loaded_at"] = now
+    # Başka bir worker'ın önbellek süresi içinde açtığı bölüm yalnızca arşiv sınırındaki aylar
+    # olabilir; bunlar listede olmasa da okunur (olmayan koleksiyon boş döner)
+    names = set(_archive_partition_cache["names"]) | set(recent_archive_names())
+    if start is not None:
+        names = [n for n in names if n >= order_archive_name(start.isoformat())]
+    if end is not None:
+        names = [n for n in names if n <= order_archive_name(end.isoformat())]
+    return sorted(names)
+
+async def _collection_order_totals(collection, query: dict):
+    result = await collection.aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "orders": {"$sum": 1}, "revenue": {"$sum": "$total_amount"}}}
+    ]).to_list(1)
+    if not result:
+        return 0, 0
+    return result[0]["orders"], result[0]["revenue"]
+
+async def order_totals(query: dict, start: Optional[datetime] = None, end: Optional[datetime] = None, include_hot: bool = True):
+    """Sipariş sayısı ve cirosu; sıcak koleksiyon ile ilgili arşiv aylarını birlikte toplar."""
+    query = dict(query)
+    if start is not None or end is not None:
+        created_at = {}
+        if start is not None:
+            created_at["$gte"] = start.isoformat()
+        if end is not None:
+            created_at["$lt"] = end.isoformat()
+        query["created_at"] = created_at
+    
+    collections = [db[name] for name in await order_archive_partitions(start, end)]
+    if include_hot:
+        collections.append(db.orders)
+    totals = await asyncio.gather(*[_collection_order_totals(c, query) for c in collections])
+    return sum(t[0] for t in totals), sum(t[1] for t in totals)
+
+async def archive_completed_orders(older_than_days: int = ORDER_ARCHIVE_AFTER_DAYS) -> int:
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+    archived = 0
+    
+    while True:
+        batch = await db.orders.find(
+            {"status": "completed", "created_at": {"$lt": cutoff}}, {"_id": 0}
+        ).sort("created_at", 1).to_list(ORDER_ARCHIVE_BATCH_SIZE)
+        if not batch:
+            break
+        
+        partitions = defaultdict(list)
+        for order in batch:
+            partitions[order_archive_name(order["created_at"])].append(order)
+        
+        for name, orders in partitions.items():
+            await db[name].create_index("id", unique=True)
+            await db[name].create_index([("restaurant_id", 1), ("created_at", 1)])
+            try:
+                await db[name].insert_many(orders, ordered=False)
+            except BulkWriteError as e:
+                # Önceki yarım kalmış çalışmadan gelen kopyalar zaten arşivde
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+        
+        _archive_partition_cache["names"] = None
+        result = await db.orders.delete_many({"id": {"$in": [o["id"] for o in batch]}, "status": "completed"})
+        archived += result.deleted_count
+        for restaurant_id in {o["restaurant_id"] for o in batch}:
+            await invalidate_cache("orders", restaurant_id)
+        if len(batch) < ORDER_ARCHIVE_BATCH_SIZE:
+            break
+    
+    # TTL index'i öncesinden kalan, resolved_at alanı olmayan çağrılar için doldurulur
+    await db.waiter_calls.update_many(
+        {"status": "resolved", "resolved_at": {"$exists": False}},
+        {"$set": {"resolved_at": datetime.now(timezone.utc)}}
+    )
+    return archived
+
+async def order_archive_loop():
+    while True:
+        try:
+            archived = await archive_completed_orders()
+            if archived:
+                print(f"[ARCHIVE] {archived} sipariş arşivlendi")
+        except Exception as e:
+            print("❌ Sipariş arşivleme hatası:", e)
+        await asyncio.sleep(ORDER_ARCHIVE_INTERVAL_SECONDS)
+
+background_tasks: Set[asyncio.Task] = set()
+
+@app.on_event("startup")
+async def start_order_archiver():
+    if ORDER_ARCHIVE_AFTER_DAYS > 0:
+        background_tasks.add(asyncio.create_task(order_archive_loop()))
+
+# -----------------------------
+# YORUMLAR
+# Restoran başına puan toplamları (adet, toplam, 1-5 histogram) her yorumda $inc ile
+# atomik güncellenir; özetler ve sayfalı akış yorumları taramadan sabit maliyetle okunur.
+# -----------------------------
+REVIEW_RATINGS = (1, 2, 3, 4, 5)
+REVIEW_PAGE_SIZE = 20
+REVIEW_MAX_PAGE_SIZE = 100
+
+def rating_summary(stats: Optional[dict]) -> dict:
+    stats = stats or {}
+    count = stats.get("count", 0)
+    histogram = stats.get("histogram", {})
+    return {
+        "count": count,
+        "average": round(stats.get("sum", 0) / count, 2) if count else None,
+        "histogram": {str(r): histogram.get(str(r), 0) for r in REVIEW_RATINGS}
+    }
+
+async def review_feed(restaurant_id: str, limit: int, cursor: Optional[str]) -> dict:
+    """created_at + id üzerinden keyset sayfalama; cursor bir önceki sayfanın next_cursor değeridir."""
+    limit = min(max(limit, 1), REVIEW_MAX_PAGE_SIZE)
+    query = {"restaurant_id": restaurant_id}
+    if cursor:
+        created_at, _, review_id = cursor.partition("|")
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": review_id}}
+        ]
+    
+    reviews = await db.reviews.find(query, {"_id": 0}).sort(
+        [("created_at", -1), ("id", -1)]
+    ).to_list(limit + 1)
+    
+    has_more = len(reviews) > limit
+    reviews = reviews[:limit]
+    next_cursor = f"{reviews[-1]['created_at']}|{reviews[-1]['id']}" if has_more else None
+    return {"reviews": reviews, "next_cursor": next_cursor}
+
+async def backfill_review_stats(started_at: datetime) -> int:
+    # Sayaçlardan önce yazılmış yorumlar için toplamlar yorumlardan yeniden hesaplanır; $set olduğu için
+    # tekrar çalıştırmak aynı sonucu verir
+    groups = await db.reviews.aggregate([
+        {"$group": {"_id": {"restaurant_id": "$restaurant_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+    ]).to_list(None)
+    
+    stats = defaultdict(lambda: {"count": 0, "sum": 0, "histogram": {}})
+    for group in groups:
+        rating = group["_id"]["rating"]
+        if rating not in REVIEW_RATINGS:
+            continue
+        doc = stats[group["_id"]["restaurant_id"]]
+        doc["count"] += group["count"]
+        doc["sum"] += rating * group["count"]
+        doc["histogram"][str(rating)] = group["count"]
+    
+    for restaurant_id, doc in stats.items():
+        await db.review_stats.update_one({"restaurant_id": restaurant_id}, {"$set": doc}, upsert=True)
+    return len(stats)
+
+@app.on_event("startup")
+async def backfill_review_stats_once():
+    await run_migration("review_stats_backfill", backfill_review_stats)
+
+# -----------------------------
+# İSTEK BİRLEŞTİRME (SINGLE-FLIGHT / BATCH LOADER)
+# Aynı anahtar için uçuştaki sorguya yeni gelenler bağlanır; aynı tick içinde istenen
+# farklı id'ler tek bir $in sorgusunda toplanır. Sonuç önbelleğe alınmaz, yalnızca
+# uçuştaki sorgu paylaşılır. Bekleyenler shield'lıdır: bir istemcinin iptali diğerlerini etkilemez.
+# -----------------------------
+class LookupStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.coalesced = 0
+        self.batched = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "coalesced": self.coalesced,
+            "batched": self.batched,
+            "coalescing_ratio": round(1 - self.queries / self.requests, 4) if self.requests else 0.0,
+        }
+
+def detached_task(coro) -> asyncio.Task:
+    # Paylaşılan sorgu onu başlatan isteğin süre sınırını ve cursor listesini devralmaz;
+    # ilk istek koptuğunda ya da süresi dolduğunda bağlanan diğer istekler etkilenmez
+    return asyncio.get_running_loop().create_task(coro, context=contextvars.Context())
+
+class SingleFlight:
+    def __init__(self):
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.stats = LookupStats()
+
+    async def do(self, key: str, factory):
+        self.stats.requests += 1
+        future = self.inflight.get(key)
+        if future is None:
+            self.stats.queries += 1
+            future = detached_task(factory())
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.stats.coalesced += 1
+        return await asyncio.shield(future)
+
+class BatchLoader:
+    def __init__(self, collection: str, key: str = "id", projection: Optional[dict] = None):
+        self.collection = collection
+        self.key = key
+        self.projection = projection or {"_id": 0}
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+        self.stats = LookupStats()
+
+    async def load(self, key: str) -> Optional[dict]:
+        self.stats.requests += 1
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self.inflight[key] = future
+            if self.pending:
+                self.stats.batched += 1
+            self.pending[key] = future
+            if self.flush_task is None:
+                self.flush_task = detached_task(self._flush())
+        doc = await asyncio.shield(future)
+        # Çağıranlar dokümanı değiştirebilir; paylaşılan nesne verilmez
+        return dict(doc) if doc is not None else None
+
+    async def _flush(self):
+        batch, self.pending, self.flush_task = self.pending, {}, None
+        keys = list(batch)
+        self.stats.queries += 1
+        try:
+            query = {self.key: keys[0]} if len(keys) == 1 else {self.key: {"$in": keys}}
+            docs = await getattr(db, self.collection).find(query, self.projection).to_list(len(keys))
+        except Exception as e:
+            for key, future in batch.items():
+                self.inflight.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_key = {doc.get(self.key): doc for doc in docs}
+        for key, future in batch.items():
+            self.inflight.pop(key, None)
+            if not future.done():
+                future.set_result(by_key.get(key))
+
+table_loader = BatchLoader("tables")
+restaurant_loader = BatchLoader("restaurants")
+menu_flight = SingleFlight()
+
+def lookup_metrics() -> dict:
+    return {
+        "tables": table_loader.stats.snapshot(),
+        "restaurants": restaurant_loader.stats.snapshot(),
+        "public_menu": menu_flight.stats.snapshot(),
+    }
+
+# -----------------------------
+# CANLI YAYIN (SSE) - worker içi restoran kanalları
+# -----------------------------
+class RestaurantPubSub:
+    """Restoran bazında abonelere olay dağıtır; yavaş abonelerin olayları düşürülür."""
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, restaurant_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers[restaurant_id].add(queue)
+        return queue
+
+    def unsubscribe(self, restaurant_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(restaurant_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            self._subscribers.pop(restaurant_id, None)
+
+    def publish(self, restaurant_id: str, event: str, data: dict):
+        for queue in list(self._subscribers.get(restaurant_id, ())):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                pass
+
+SSE_KEEPALIVE_SECONDS = 15
+
+def sse_format(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(pubsub: RestaurantPubSub, restaurant_id: str, request: Request) -> StreamingResponse:
+    queue = pubsub.subscribe(restaurant_id)
+
+    async def stream():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_format(event, data)
+        finally:
+            pubsub.unsubscribe(restaurant_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+waiter_call_events = RestaurantPubSub()
+
+# -----------------------------
+# MENÜ CANLI YAYINI (misafir menüleri)
+# Misafir bağlantıları binlerce ve çoğu boşta olduğu için abone başına kuyruk tutulmaz:
+# her olay restoran başına halka tamponda bir kez serileştirilir, abone yalnızca bir
+# imleç tutar ve ortak bir Event'i bekler. Tamponun gerisinde kalan (ya da başka bir
+# worker'dan/yeniden başlatmadan dönen) istemci "reset" alır ve menüyü yeniden yükler.
+# -----------------------------
+MENU_STREAM_HISTORY = 64
+
+class BroadcastChannel:
+    __slots__ = ("epoch", "seq", "frames", "changed", "subscribers")
+
+    def __init__(self, history: int):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.frames = deque(maxlen=history)
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+
+    def event_id(self) -> str:
+        return f"{self.epoch}.{self.seq}"
+
+    def frames_since(self, cursor: int) -> Optional[List[str]]:
+        if cursor == self.seq:
+            return []
+        if cursor > self.seq or not self.frames or self.frames[0][0] > cursor + 1:
+            return None
+        return [frame for seq, frame in self.frames if seq > cursor]
+
+class RestaurantBroadcast:
+    def __init__(self, history: int = MENU_STREAM_HISTORY):
+        self.history = history
+        self.channels: Dict[str, BroadcastChannel] = {}
+
+    def publish(self, restaurant_id: str, event: str, data: dict):
+        channel = self.channels.get(restaurant_id)
+        if channel is None:
+            # Bu worker'da abone yok; tutulacak bir şey yok
+            return
+        channel.seq += 1
+        channel.frames.append((channel.seq, f"id: {channel.event_id()}\n{sse_format(event, data)}"))
+        changed, channel.changed = channel.changed, asyncio.Event()
+        changed.set()
+
+    def publish_all(self, event: str, data: dict):
+        for restaurant_id in list(self.channels):
+            self.publish(restaurant_id, event, data)
+
+    def subscriber_count(self) -> int:
+        return sum(channel.subscribers for channel in self.channels.values())
+
+    def stream(self, restaurant_id: str, request: Request) -> StreamingResponse:
+        channel = self.channels.get(restaurant_id)
+        if channel is None:
+            channel = self.channels[restaurant_id] = BroadcastChannel(self.history)
+        channel.subscribers += 1
+        
+        epoch, _, last_seq = request.headers.get("last-event-id", "").partition(".")
+        cursor = int(last_seq) if epoch == channel.epoch and last_seq.isdigit() else None
+
+        async def frames():
+            nonlocal cursor
+            try:
+                if cursor is None:
+                    # Yeni bağlantı ya da başka bir kanaldan dönüş: istemci menüyü tazelemeli
+                    cursor = channel.seq
+                    yield f"id: {channel.event_id()}\n" + (sse_format("reset", {}) if request.headers.get("last-event-id") else ": connected\n\n")
+                while not await request.is_disconnected():
+                    pending = channel.frames_since(cursor)
+                    if pending is None:
+                        cursor = channel.seq
+                        yield f"id: {channel.event_id()}\n{sse_format('reset', {})}"
+                    elif pending:
+                        cursor = channel.seq
+                        yield "".join(pending)
+                    else:
+                        try:
+                            await asyncio.wait_for(channel.changed.wait(), timeout=SSE_KEEPALIVE_SECONDS)
+                        except asyncio.TimeoutError:
+                            yield ": keepalive\n\n"
+            finally:
+                channel.subscribers -= 1
+                if channel.subscribers == 0 and self.channels.get(restaurant_id) is channel:
+                    del self.channels[restaurant_id]
+
+        return StreamingResponse(
+            frames(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+menu_events = RestaurantBroadcast()
+
+def menu_item_delta(item: dict) -> dict:
+    return {"id": item.get("id"), "available": item.get("available", True), "price": item.get("price")}
+
+def publish_menu_event(restaurant_id: str, event: str, data: dict):
+    # Change stream varken olay veriyolundan gelir; yazan worker da dahil herkes tek kaynaktan alır
+    if invalidation_bus.mode != "change_stream":
+        menu_events.publish(restaurant_id, event, data)
+
+# -----------------------------
+# MUTFAK YÜKÜ / ETA TAHMİNİ / HAZIRLIK PANOSU
+# Her restoranın açık (pending/preparing) siparişleri worker belleğinde tutulur ve
+# sipariş oluşturma / durum değişikliğinde artımlı güncellenir; ETA O(1) hesaplanır.
+# Aynı model ürün bazında açık adetleri (hazırlık panosu) ve bunların fark akışını tutar.
+# -----------------------------
+OPEN_ORDER_STATUSES = ("pending", "preparing")
+KITCHEN_PARALLEL_TICKETS = int(os.environ.get("KITCHEN_PARALLEL_TICKETS", "3"))
+# Diğer worker'larda yapılan değişikliklerden doğan sapmayı sınırlamak için model periyodik olarak yeniden yüklenir
+KITCHEN_LOAD_RESYNC_SECONDS = int(os.environ.get("KITCHEN_LOAD_RESYNC_SECONDS", "60"))
+ETA_CALIBRATION_ALPHA = 0.1
+ETA_CALIBRATION_BOUNDS = (0.5, 3.0)
+PREP_BOARD_DELTA_HISTORY = 500
+
+def prep_board_items(items) -> list:
+    board_items = []
+    for item in items:
+        if not isinstance(item, dict):
+            item = item.model_dump()
+        key = item.get("menu_item_id") or item.get("name", "")
+        board_items.append((key, item.get("name", ""), item.get("quantity", 0)))
+    return board_items
+
+class KitchenLoad:
+    def __init__(self, parallel_tickets: int = KITCHEN_PARALLEL_TICKETS):
+        self.parallel_tickets = max(1, parallel_tickets)
+        self.open_orders: Dict[str, dict] = {}
+        self.backlog_minutes = 0.0
+        self.calibration = 1.0
+        self.calibration_samples = 0
+        self.loaded_at = 0.0
+        # menu_item_id -> {"name", "pending", "preparing"}
+        self.board: Dict[str, dict] = {}
+        self.board_seq = 0
+        self.board_reset_seq = 0
+        self.board_deltas: deque = deque(maxlen=PREP_BOARD_DELTA_HISTORY)
+
+    def _board_apply(self, items: list, status: str, sign: int):
+        for key, name, quantity in items:
+            if not quantity:
+                continue
+            entry = self.board.setdefault(key, {"name": name, "pending": 0, "preparing": 0})
+            entry[status] += sign * quantity
+            self.board_seq += 1
+            self.board_deltas.append({
+                "seq": self.board_seq, "menu_item_id": key, "name": entry["name"],
+                "status": status, "delta": sign * quantity
+            })
+            if entry["pending"] <= 0 and entry["preparing"] <= 0:
+                self.board.pop(key, None)
+
+    def reset_board_feed(self, previous_seq: int = 0):
+        """Yeniden yükleme sonrası: eski farklar geçersizdir, istemciler bir kez snapshot alır."""
+        self.board_deltas.clear()
+        self.board_seq = previous_seq + 1
+        self.board_reset_seq = self.board_seq
+
+    def board_snapshot(self) -> list:
+        rows = [
+            {"menu_item_id": key, "name": e["name"], "pending": e["pending"],
+             "preparing": e["preparing"], "total": e["pending"] + e["preparing"]}
+            for key, e in self.board.items()
+        ]
+        rows.sort(key=lambda r: r["total"], reverse=True)
+        return rows
+
+    def board_deltas_since(self, seq: int) -> Optional[list]:
+        if seq < self.board_reset_seq or seq > self.board_seq:
+            return None
+        if self.board_deltas and seq < self.board_deltas[0]["seq"] - 1:
+            return None
+        return [d for d in self.board_deltas if d["seq"] > seq]
+
+    def raw_estimate(self, prep_minutes: int) -> float:
+        return prep_minutes + self.backlog_minutes / self.parallel_tickets
+
+    def estimate(self, prep_minutes: int) -> int:
+        return max(prep_minutes, round(self.raw_estimate(prep_minutes) * self.calibration))
+
+    def add(self, order_id: str, prep_minutes: int, created_at: Optional[float] = None, predicted_minutes: Optional[float] = None,
+            items: Optional[list] = None, status: str = "pending"):
+        if order_id in self.open_orders:
+            return
+        if predicted_minutes is None:
+            predicted_minutes = self.raw_estimate(prep_minutes)
+        self.open_orders[order_id] = {
+            "prep_minutes": prep_minutes,
+            "predicted_minutes": predicted_minutes,
+            "created_at": created_at if created_at is not None else time.time(),
+            "items": items or [],
+            "status": status,
+        }
+        self.backlog_minutes += prep_minutes
+        self._board_apply(items or [], status, 1)
+
+    def transition(self, order_id: str, status: str, now: Optional[float] = None):
+        entry = self.open_orders.get(order_id)
+        if entry is None or entry["status"] == status:
+            return
+        self._board_apply(entry["items"], entry["status"], -1)
+        if status in OPEN_ORDER_STATUSES:
+            entry["status"] = status
+            self._board_apply(entry["items"], status, 1)
+            return
+        del self.open_orders[order_id]
+        self.backlog_minutes = max(0.0, self.backlog_minutes - entry["prep_minutes"])
+        if status == "ready" and entry["predicted_minutes"] > 0:
+            observed_minutes = ((now if now is not None else time.time()) - entry["created_at"]) / 60
+            ratio = min(max(observed_minutes / entry["predicted_minutes"], ETA_CALIBRATION_BOUNDS[0]), ETA_CALIBRATION_BOUNDS[1])
+            self.calibration += ETA_CALIBRATION_ALPHA * (ratio - self.calibration)
+            self.calibration_samples += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "open_orders": len(self.open_orders),
+            "backlog_minutes": round(self.backlog_minutes, 1),
+            "calibration": round(self.calibration, 3),
+            "calibration_samples": self.calibration_samples,
+        }
+
+kitchen_loads: Dict[str, KitchenLoad] = {}
+kitchen_load_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+def order_prep_minutes(items) -> int:
+    return max([item["preparation_time_minutes"] if isinstance(item, dict) else item.preparation_time_minutes for item in items], default=15)
+
+async def get_kitchen_load(restaurant_id: str) -> KitchenLoad:
+    load = kitchen_loads.get(restaurant_id)
+    if load is not None and time.monotonic() - load.loaded_at < KITCHEN_LOAD_RESYNC_SECONDS:
+        return load
+    
+    async with kitchen_load_locks[restaurant_id]:
+        current = kitchen_loads.get(restaurant_id)
+        if current is not None and current is not load:
+            return current
+        
+        fresh = KitchenLoad()
+        if load is not None:
+            fresh.calibration = load.calibration
+            fresh.calibration_samples = load.calibration_samples
+        open_orders = await db.orders.find(
+            {"restaurant_id": restaurant_id, "status": {"$in": list(OPEN_ORDER_STATUSES)}},
+            {"_id": 0, "id": 1, "status": 1, "created_at": 1, "estimated_completion_minutes": 1,
+             "items.preparation_time_minutes": 1, "items.menu_item_id": 1, "items.name": 1, "items.quantity": 1}
+        ).to_list(10000)
+        for order in open_orders:
+            created_at = order.get("created_at")
+            if isinstance(created_at, str):
+                created_at = datetime.fromisoformat(created_at)
+            fresh.add(
+                order["id"],
+                order_prep_minutes(order.get("items", [])),
+                created_at=created_at.timestamp() if created_at else None,
+                predicted_minutes=(load.open_orders.get(order["id"], {}).get("predicted_minutes") if load else None)
+                    or order.get("estimated_completion_minutes"),
+                items=prep_board_items(order.get("items", [])),
+                status=order["status"],
+            )
+        fresh.reset_board_feed(load.board_seq if load else 0)
+        fresh.loaded_at = time.monotonic()
+        kitchen_loads[restaurant_id] = fresh
+        return fresh
+
+# -----------------------------
+# MUTFAK GECİKME KANTİLLERİ
+# Durum geçişlerinden restoran ve ürün bazında akan kantil taslakları tutulur:
+#   queue  = pending -> preparing, prep = oluşturma -> ready, pickup = ready -> completed
+# Taslaklar bellekte güncellenir, birikmiş farklar periyodik olarak $inc ile Mongo'ya yazılır.
+# -----------------------------
+ORDER_STATUSES = ("pending", "preparing", "ready", "completed")
+LATENCY_METRICS = ("queue", "prep", "pickup")
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+LATENCY_SKETCH_ACCURACY = 0.02
+LATENCY_SKETCH_FLUSH_SECONDS = int(os.environ.get("LATENCY_SKETCH_FLUSH_SECONDS", "60"))
+LATENCY_SKETCH_RELOAD_SECONDS = int(os.environ.get("LATENCY_SKETCH_RELOAD_SECONDS", "300"))
+ALL_ITEMS_KEY = "__all__"
+
+class LatencySketch:
+    """DDSketch benzeri log-bucket taslak: göreli hata LATENCY_SKETCH_ACCURACY, bucket'lar toplanarak birleşir."""
+
+    def __init__(self, relative_accuracy: float = LATENCY_SKETCH_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = defaultdict(int)
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, seconds: float, count: int = 1):
+        if seconds < 1:
+            self.zero_count += count
+        else:
+            self.buckets[math.ceil(math.log(seconds) / self.log_gamma)] += count
+        self.count += count
+
+    def merge(self, other: "LatencySketch"):
+        for key, value in other.buckets.items():
+            self.buckets[key] += value
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def summary(self, unit: str = "seconds") -> dict:
+        result = {"count": self.count}
+        for q in LATENCY_QUANTILES:
+            value = self.quantile(q)
+            result[f"p{int(q * 100)}_{unit}"] = round(value, 1) if value is not None else None
+        return result
+
+    def to_inc(self, prefix: str) -> dict:
+        inc = {f"{prefix}.b.{key}": value for key, value in self.buckets.items()}
+        inc[f"{prefix}.zero"] = self.zero_count
+        inc[f"{prefix}.count"] = self.count
+        return inc
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "LatencySketch":
+        sketch = cls()
+        for key, value in doc.get("b", {}).items():
+            sketch.buckets[int(key)] = value
+        sketch.zero_count = doc.get("zero", 0)
+        sketch.count = doc.get("count", 0)
+        return sketch
+
+class RestaurantLatency:
+    def __init__(self):
+        self.sketches: Dict[str, Dict[str, LatencySketch]] = {m: defaultdict(LatencySketch) for m in LATENCY_METRICS}
+        self.pending: Dict[str, Dict[str, LatencySketch]] = {m: defaultdict(LatencySketch) for m in LATENCY_METRICS}
+        self.item_names: Dict[str, str] = {}
+        self.loaded_at = 0.0
+
+    def record(self, metric: str, seconds: float, items: list):
+        keys = [ALL_ITEMS_KEY]
+        for item in items:
+            item_id = item.get("menu_item_id")
+            # Anahtarlar Mongo alan yoluna girer
+            if item_id and item_id not in keys and "." not in item_id and not item_id.startswith("$"):
+                keys.append(item_id)
+                self.item_names[item_id] = item.get("name", "")
+        for key in keys:
+            self.sketches[metric][key].add(seconds)
+            self.pending[metric][key].add(seconds)
+
+    def has_pending(self) -> bool:
+        return any(self.pending[m] for m in LATENCY_METRICS)
+
+kitchen_latency: Dict[str, RestaurantLatency] = {}
+
+async def get_restaurant_latency(restaurant_id: str) -> RestaurantLatency:
+    latency = kitchen_latency.get(restaurant_id)
+    if latency is not None and time.monotonic() - latency.loaded_at < LATENCY_SKETCH_RELOAD_SECONDS:
+        return latency
+    
+    # Diğer worker'ların yazdıkları da görülsün diye kalıcı toplam yeniden okunur; henüz yazılmamış farklar üstüne eklenir
+    doc = await db.kitchen_latency.find_one({"restaurant_id": restaurant_id}, {"_id": 0}) or {}
+    latency = kitchen_latency.get(restaurant_id)
+    fresh = RestaurantLatency()
+    for metric in LATENCY_METRICS:
+        for key, sketch_doc in doc.get("sketches", {}).get(metric, {}).items():
+            fresh.sketches[metric][key] = LatencySketch.from_doc(sketch_doc)
+    fresh.item_names.update(doc.get("item_names", {}))
+    if latency is not None:
+        fresh.item_names.update(latency.item_names)
+        for metric in LATENCY_METRICS:
+            for key, sketch in latency.pending[metric].items():
+                fresh.sketches[metric][key].merge(sketch)
+                fresh.pending[metric][key].merge(sketch)
+    fresh.loaded_at = time.monotonic()
+    kitchen_latency[restaurant_id] = fresh
+    return fresh
+
+async def flush_kitchen_latency():
+    for restaurant_id, latency in list(kitchen_latency.items()):
+        if not latency.has_pending():
+            continue
+        pending, latency.pending = latency.pending, {m: defaultdict(LatencySketch) for m in LATENCY_METRICS}
+        inc = {}
+        for metric in LATENCY_METRICS:
+            for key, sketch in pending[metric].items():
+                inc.update(sketch.to_inc(f"sketches.{metric}.{key}"))
+        names = {f"item_names.{k}": v for k, v in latency.item_names.items()}
+        try:
+            await db.kitchen_latency.update_one(
+                {"restaurant_id": restaurant_id},
+                {"$inc": inc, "$set": {**names, "updated_at": datetime.now(timezone.utc).isoformat()}},
+                upsert=True
+            )
+        except Exception:
+            # Yazılamayan farklar kaybolmasın: bir sonraki flush'ta yeniden denensin. Bu arada taslak
+            # kalıcı kayıttan yeniden yüklendiyse yazılmamış farklar onun toplamına da eklenir.
+            current = kitchen_latency.get(restaurant_id, latency)
+            for metric in LATENCY_METRICS:
+                for key, sketch in pending[metric].items():
+                    current.pending[metric][key].merge(sketch)
+                    if current is not latency:
+                        current.sketches[metric][key].merge(sketch)
+            raise
+
+async def kitchen_latency_flush_loop():
+    while True:
+        await asyncio.sleep(LATENCY_SKETCH_FLUSH_SECONDS)
+        try:
+            await flush_kitchen_latency()
+        except Exception as e:
+            print("❌ Gecikme taslağı yazma hatası:", e)
+
+@app.on_event("startup")
+async def start_kitchen_latency_flusher():
+    background_tasks.add(asyncio.create_task(kitchen_latency_flush_loop()))
+
+@app.on_event("shutdown")
+async def flush_kitchen_latency_on_shutdown():
+    try:
+        await flush_kitchen_latency()
+    except Exception as e:
+        print("❌ Gecikme taslağı yazma hatası:", e)
+
+def _history_time(order: dict, status: str) -> Optional[datetime]:
+    value = (order.get("status_history") or {}).get(status)
+    if value is None and status == "pending":
+        value = order.get("created_at")
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value
+
+ORDER_TRANSITION_PROJECTION = {
+    "_id": 0, "id": 1, "status": 1, "created_at": 1, "status_history": 1,
+    "items.menu_item_id": 1, "items.name": 1
+}
+
+# -----------------------------
+# WORKER ÖNBELLEKLERİ VE GEÇERSİZLEŞTİRME VERİYOLU
+# Her worker kullanıcı, restoran, masa ve menü okumalarını kendi belleğinde tutar.
+# Değişiklikler Mongo change stream'inden izlenip ilgili kayıtlar düşürülür; change
+# stream yoksa (tekil mongod) yazanlar cache_versions'a sürüm yazar, worker'lar onu yoklar.
+# Yazan worker kendi önbelleğini hemen temizler. Değer yüklenirken gelen bir
+# geçersizleştirme o değerin önbelleğe yazılmasını engeller.
+# -----------------------------
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = 10000
+CACHE_POLL_INTERVAL_SECONDS = float(os.environ.get("CACHE_POLL_INTERVAL_SECONDS", "2"))
+CACHE_VERSION_RETENTION_SECONDS = 24 * 3600
+INVALIDATION_COLLECTIONS = {
+    "users": "user",
+    "restaurants": "restaurant",
+    "tables": "table",
+    "menu_items": "menu",
+    "menu_categories": "menu",
+    "orders": "orders",
+    "waiter_calls": "waiter_calls",
+}
+# Bu kapsamların anahtarı dokümanın id'si değil restaurant_id'sidir
+RESTAURANT_SCOPES = {"menu", "orders", "waiter_calls"}
+
+class WorkerCache:
+    """Paylaşılan nesneler döner; çağıranlar değiştirmemelidir."""
+
+    def __init__(self, name: str, ttl_seconds: int = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: Dict[str, tuple] = {}
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str, loader):
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        
+        self.misses += 1
+        epoch = self.epoch
+        value = await loader()
+        if value is not None and epoch == self.epoch:
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        return value
+
+    def evict(self, key: Optional[str] = None):
+        self.epoch += 1
+        if key is None:
+            self.evictions += len(self.entries)
+            self.entries.clear()
+        elif self.entries.pop(key, None) is not None:
+            self.evictions += 1
+
+    def snapshot(self) -> dict:
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class ListVersion:
+    """Restoran başına bellek içi liste sürümü; ETag'i üretir. Sürüm numaraları worker'a
+    özgü olduğundan ETag worker nonce'u taşır, başka worker'ın ETag'i hiçbir zaman eşleşmez."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.nonce = uuid.uuid4().hex[:8]
+        self.generation = 0
+        self.versions: Dict[str, int] = defaultdict(int)
+        self.not_modified = 0
+        self.served = 0
+
+    def evict(self, key: Optional[str] = None):
+        if key is None:
+            self.generation += 1
+        else:
+            self.versions[key] += 1
+
+    def etag(self, restaurant_id: str) -> str:
+        return f'W/"{self.name}-{self.nonce}-{self.generation}-{self.versions[restaurant_id]}"'
+
+    def snapshot(self) -> dict:
+        return {"restaurants": len(self.versions), "not_modified": self.not_modified, "served": self.served}
+
+principal_cache = WorkerCache("user")
+restaurant_cache = WorkerCache("restaurant")
+table_cache = WorkerCache("table")
+menu_cache = WorkerCache("menu")
+worker_caches = {cache.name: cache for cache in (principal_cache, restaurant_cache, table_cache, menu_cache)}
+order_list_version = ListVersion("orders")
+waiter_call_list_version = ListVersion("waiter_calls")
+list_versions = {v.name: v for v in (order_list_version, waiter_call_list_version)}
+invalidation_targets = {**worker_caches, **list_versions}
+
+class InvalidationBus:
+    def __init__(self):
+        self.origin = uuid.uuid4().hex[:8]
+        self.mode = "starting"
+        self.events = 0
+        # Değişikliğin yazılmasından bu worker'da düşürülmesine kadar geçen süre (ms)
+        self.lag = LatencySketch()
+        self.last_seen = datetime.now(timezone.utc)
+        self.seen_versions: Dict[str, int] = {}
+
+    def evict(self, scope: str, key: Optional[str], changed_at: Optional[datetime] = None):
+        invalidation_targets[scope].evict(key)
+        self.events += 1
+        if changed_at is not None:
+            if changed_at.tzinfo is None:
+                changed_at = changed_at.replace(tzinfo=timezone.utc)
+            self.lag.add(max(0.0, (datetime.now(timezone.utc) - changed_at).total_seconds() * 1000))
+
+    def apply_change(self, change: dict):
+        scope = INVALIDATION_COLLECTIONS.get(change.get("ns", {}).get("coll"))
+        if scope is None:
+            return
+        changed_at = change.get("wallTime")
+        if changed_at is None and change.get("clusterTime") is not None:
+            changed_at = change["clusterTime"].as_datetime()
+        
+        document = change.get("fullDocument")
+        if change.get("operationType") in ("insert", "update", "replace") and document:
+            key = document.get("restaurant_id") if scope in RESTAURANT_SCOPES else document.get("id")
+        else:
+            # Silmede yalnızca _id gelir; hangi kaydın düştüğü bilinemediği için kapsam temizlenir
+            key = None
+        self.evict(scope, key, changed_at)
+        
+        if scope == "menu":
+            if key is None:
+                menu_events.publish_all("menu_changed", {})
+            elif change["ns"]["coll"] == "menu_items":
+                menu_events.publish(key, "item", menu_item_delta(document))
+            else:
+                menu_events.publish(key, "menu_changed", {})
+
+    async def watch(self):
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": list(INVALIDATION_COLLECTIONS)}}},
+            # Sipariş olayları sık gelir; yalnızca anahtar alanları taşınır
+            {"$project": {
+                "operationType": 1, "ns": 1, "wallTime": 1, "clusterTime": 1,
+                "fullDocument.id": 1, "fullDocument.restaurant_id": 1,
+                "fullDocument.available": 1, "fullDocument.price": 1,
+            }},
+        ]
+        while True:
+            try:
+                async with db.watch(pipeline, full_document="updateLookup") as stream:
+                    self.mode = "change_stream"
+                    async for change in stream:
+                        self.apply_change(change)
+            except asyncio.CancelledError:
+                raise
+            except (NotImplementedError, AttributeError, OperationFailure) as e:
+                if self.mode == "starting" or getattr(e, "code", None) == 40573:
+                    print(f"⚠️ Change stream kullanılamıyor, sürüm yoklamaya geçiliyor: {e}")
+                    self.mode = "polling"
+                    return await self.poll()
+                print(f"⚠️ Change stream hatası, yeniden bağlanılıyor: {e}")
+            except Exception as e:
+                print(f"⚠️ Change stream hatası, yeniden bağlanılıyor: {e}")
+            # Kopuk kalınan sürede kaçan olaylar olabilir; kaldığı yerden devam etmek yerine temizlenir
+            for cache in worker_caches.values():
+                cache.evict()
+            await asyncio.sleep(1)
+
+    async def poll_once(self):
+        docs = await db.cache_versions.find(
+            {"updated_at": {"$gte": self.last_seen}}, {"_id": 1, "scope": 1, "key": 1, "version": 1, "updated_at": 1}
+        ).sort("updated_at", 1).to_list(1000)
+        for doc in docs:
+            if self.seen_versions.get(doc["_id"]) == doc["version"]:
+                continue
+            self.seen_versions[doc["_id"]] = doc["version"]
+            if doc.get("scope") in invalidation_targets:
+                self.evict(doc["scope"], doc.get("key"), doc["updated_at"])
+            if doc.get("scope") == "menu" and doc.get("origin") != self.origin:
+                # Yoklamada yalnızca anahtar bilinir; misafir menüsü tamamen tazelenir
+                if doc.get("key"):
+                    menu_events.publish(doc["key"], "menu_changed", {})
+                else:
+                    menu_events.publish_all("menu_changed", {})
+        if docs:
+            self.last_seen = docs[-1]["updated_at"]
+            if self.last_seen.tzinfo is None:
+                self.last_seen = self.last_seen.replace(tzinfo=timezone.utc)
+        if len(self.seen_versions) > CACHE_MAX_ENTRIES:
+            self.seen_versions.clear()
+
+    async def poll(self):
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Önbellek sürüm yoklama hatası: {e}")
+            await asyncio.sleep(CACHE_POLL_INTERVAL_SECONDS)
+
+    def snapshot(self) -> dict:
+        return {"mode": self.mode, "events": self.events, "lag": self.lag.summary("ms")}
+
+invalidation_bus = InvalidationBus()
+
+async def invalidate_cache(scope: str, key: Optional[str] = None):
+    """Yazma yollarından çağrılır: yerel önbelleği hemen temizler, yoklama modunda sürüm yayınlar."""
+    invalidation_targets[scope].evict(key)
+    if invalidation_bus.mode == "change_stream":
+        return
+    await db.cache_versions.update_one(
+        {"_id": f"{scope}:{key or '*'}"},
+        {"$inc": {"version": 1}, "$set": {
+            "scope": scope, "key": key, "origin": invalidation_bus.origin, "updated_at": datetime.now(timezone.utc)
+        }},
+        upsert=True
+    )
+
+def not_modified_response(request: Request, version: ListVersion, restaurant_id: str, response: Response) -> Optional[Response]:
+    """Sürüm sorgudan ÖNCE okunur: sorgu sırasında gelen yazma bir sonraki yoklamada görünür."""
+    etag = version.etag(restaurant_id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        version.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    version.served += 1
+    response.headers.update(headers)
+    return None
+
+@app.on_event("startup")
+async def start_invalidation_bus():
+    background_tasks.add(asyncio.create_task(invalidation_bus.watch()))
+
+# -----------------------------
+# TOPLU DURUM GÜNCELLEME
+# Geçiş kuralları update filtresine yazılır (status == okunan durum, okunan durum
+# hedefe geçebilen durumlardan biri olmalı); tüm güncellemeler tek sırasız bulk_write'tır.
+# -----------------------------
+ORDER_TRANSITIONS = {
+    "pending": ("preparing", "ready", "completed"),
+    "preparing": ("ready", "completed"),
+    "ready": ("completed",),
+    "completed": (),
+}
+BULK_ORDER_UPDATE_LIMIT = 500
+
+async def bulk_update_order_statuses(
+    restaurant_id: str, targets: List[tuple], extra_fields: Optional[dict] = None, event_fields: Optional[dict] = None
+) -> List[dict]:
+    """targets: (order_id, hedef durum) listesi. Her sipariş için sonuç döner."""
+    if len(targets) > BULK_ORDER_UPDATE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_ORDER_UPDATE_LIMIT} orders per request")
+    
+    now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
+    results = {}
+    target_by_id = {}
+    for order_id, target in targets:
+        if order_id in results:
+            continue
+        if target not in ORDER_STATUSES:
+            results[order_id] = {"order_id": order_id, "result": "invalid_status"}
+        else:
+            results[order_id] = None
+            target_by_id[order_id] = target
+    order_ids = list(target_by_id)
+    
+    orders_before = await db.orders.find(
+        {"id": {"$in": order_ids}, "restaurant_id": restaurant_id}, ORDER_TRANSITION_PROJECTION
+    ).to_list(len(order_ids))
+    before_by_id = {o["id"]: o for o in orders_before}
+    
+    operations, applied = [], []
+    for order_id in order_ids:
+        before = before_by_id.get(order_id)
+        target = target_by_id[order_id]
+        if before is None:
+            results[order_id] = {"order_id": order_id, "result": "not_found"}
+            continue
+        current = before.get("status", "pending")
+        if target not in ORDER_TRANSITIONS.get(current, ()):
+            results[order_id] = {"order_id": order_id, "result": "invalid_transition", "status": current}
+            continue
+        fields = {"status": target, "updated_at": now_iso, f"status_history.{target}": now_iso}
+        fields.update(extra_fields or {})
+        operations.append(UpdateOne(
+            {"id": order_id, "restaurant_id": restaurant_id, "status": current},
+            {"$set": fields}
+        ))
+        applied.append(order_id)
+    
+    if operations:
+        result = await db.orders.bulk_write(operations, ordered=False)
+        updated_ids = set(applied)
+        if result.matched_count < len(operations):
+            # Okuma ile yazma arasında durumu değişen siparişler filtreye takıldı
+            written = await db.orders.find(
+                {"id": {"$in": applied}, "updated_at": now_iso}, {"_id": 0, "id": 1}
+            ).to_list(len(applied))
+            updated_ids = {o["id"] for o in written}
+        events = []
+        for order_id in applied:
+            if order_id in updated_ids:
+                results[order_id] = {"order_id": order_id, "result": "updated", "status": target_by_id[order_id]}
+                await on_order_status_changed(restaurant_id, before_by_id[order_id], target_by_id[order_id], now)
+                events.append(order_status_event(order_id, target_by_id[order_id], now_iso, event_fields))
+            else:
+                results[order_id] = {"order_id": order_id, "result": "conflict"}
+        await append_order_events(restaurant_id, events)
+    
+    ordered_results, seen = [], set()
+    for order_id, _ in targets:
+        ordered_results.append(results[order_id] if order_id not in seen else {"order_id": order_id, "result": "duplicate"})
+        seen.add(order_id)
+    return ordered_results
+
+async def on_order_status_changed(restaurant_id: str, order_before: dict, status: str, changed_at: datetime):
+    """Sipariş durumu değiştikten sonra bellek içi mutfak modellerini günceller."""
+    if order_before.get("status") == status:
+        return
+    (await get_kitchen_load(restaurant_id)).transition(order_before["id"], status, now=changed_at.timestamp())
+    
+    latency = await get_restaurant_latency(restaurant_id)
+    items = order_before.get("items", [])
+    starts = {"preparing": ("queue", "pending"), "ready": ("prep", "pending"), "completed": ("pickup", "ready")}
+    if status in starts:
+        metric, from_status = starts[status]
+        started_at = _history_time(order_before, from_status)
+        if started_at is not None:
+            latency.record(metric, max(0.0, (changed_at - started_at).total_seconds()), items)
+
+# -----------------------------
+# SİPARİŞ OLAY GÜNLÜĞÜ
+# Her sipariş değişikliği restoran başına artan bir seq ile order_events'e yazılır
+# (TTL ile budanır). Yeniden bağlanan tablet ?since=<seq> ile yalnızca kaçırdıklarını
+# alır; günlük o noktadan önce budanmışsa anlık görüntüye düşülür.
+# -----------------------------
+ORDER_EVENT_TTL_SECONDS = int(os.environ.get("ORDER_EVENT_TTL_SECONDS", str(24 * 3600)))
+ORDER_EVENT_PAGE_SIZE = 500
+# Eşzamanlı yazanlar seq'leri sırasız ekleyebilir; bu süreden genç bir boşlukta durulur
+ORDER_EVENT_GAP_GRACE_SECONDS = 2
+
+def order_status_event(order_id: str, status: Optional[str], updated_at: str, extra_fields: Optional[dict] = None) -> dict:
+    event = {"type": "status" if status else "updated", "order_id": order_id, "updated_at": updated_at}
+    if status:
+        event["status"] = status
+    if extra_fields:
+        event.update(extra_fields)
+    return event
+
+async def current_order_event_seq(restaurant_id: str) -> int:
+    counter = await db.counters.find_one({"_id": f"order_events:{restaurant_id}"})
+    return counter["seq"] if counter else 0
+
+async def append_order_events(restaurant_id: str, events: List[dict]):
+    if not events:
+        return
+    # Tüm sipariş yazımları buradan geçer; ETag'li listelerin sürümü de burada artar
+    await invalidate_cache("orders", restaurant_id)
+    counter = await db.counters.find_one_and_update(
+        {"_id": f"order_events:{restaurant_id}"},
+        {"$inc": {"seq": len(events)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    first_seq = counter["seq"] - len(events) + 1
+    now = datetime.now(timezone.utc)
+    await db.order_events.insert_many([
+        {**event, "restaurant_id": restaurant_id, "seq": first_seq + i, "created_at": now}
+        for i, event in enumerate(events)
+    ], ordered=False)
+
+async def order_events_since(restaurant_id: str, since: int) -> Optional[dict]:
+    """Kaçırılan olayları döner; günlük budanmışsa None (istemci anlık görüntü almalı)."""
+    events = await db.order_events.find(
+        {"restaurant_id": restaurant_id, "seq": {"$gt": since}}, {"_id": 0, "restaurant_id": 0}
+    ).sort("seq", 1).to_list(ORDER_EVENT_PAGE_SIZE)
+    
+    if not events or events[0]["seq"] != since + 1:
+        current = await current_order_event_seq(restaurant_id)
+        if since > current:
+            return None
+        if since < current:
+            oldest = await db.order_events.find_one(
+                {"restaurant_id": restaurant_id}, {"_id": 0, "seq": 1, "created_at": 1}, sort=[("seq", 1)]
+            )
+            if oldest is None or oldest["seq"] > since + 1:
+                return None
+    
+    now = datetime.now(timezone.utc)
+    delivered, seq = [], since
+    for event in events:
+        if event["seq"] != seq + 1:
+            created_at = event["created_at"]
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            if (now - created_at).total_seconds() < ORDER_EVENT_GAP_GRACE_SECONDS:
+                # Önceki seq henüz yazılmamış olabilir; bir sonraki istekte tamamlanır
+                break
+        seq = event["seq"]
+        event["created_at"] = event["created_at"].isoformat()
+        delivered.append(event)
+    
+    return {"seq": seq, "events": delivered, "has_more": len(events) == ORDER_EVENT_PAGE_SIZE}
+
+# -----------------------------
+# POPÜLER ÜRÜNLER (TOP-K)
+# create_order her siparişte saatlik ve günlük satış sayaçlarını $inc ile günceller;
+# top-K tek bir küçük sorguyla (1 saat + 7 gün dokümanı) heap üzerinden hesaplanır.
+# -----------------------------
+POPULAR_ITEM_WINDOWS = ("hour", "day", "week")
+ITEM_SALES_RETENTION = {"hour": timedelta(days=2), "day": timedelta(days=8)}
+
+def item_sales_buckets(at: datetime) -> dict:
+    return {"hour": at.strftime("%Y-%m-%dT%H"), "day": at.strftime("%Y-%m-%d")}
+
+def add_item_sales(inc: dict, names: dict, items: list):
+    for item in items:
+        item_id = item.get("menu_item_id")
+        if not item_id or "." in item_id or item_id.startswith("$"):
+            continue
+        inc[f"counts.{item_id}"] = inc.get(f"counts.{item_id}", 0) + item.get("quantity", 0)
+        names[f"names.{item_id}"] = item.get("name", "")
+
+def item_sales_update(restaurant_id: str, window: str, bucket: str, inc: dict, names: dict, first_sale: datetime) -> UpdateOne:
+    return UpdateOne(
+        {"restaurant_id": restaurant_id, "window": window, "bucket": bucket},
+        {"$inc": inc, "$set": names, "$setOnInsert": {"expires_at": first_sale + ITEM_SALES_RETENTION[window]}},
+        upsert=True
+    )
+
+async def record_item_sales(order: Order):
+    inc, names = {}, {}
+    add_item_sales(inc, names, [item.model_dump() for item in order.items])
+    if not inc:
+        return
+    
+    operations = [
+        item_sales_update(order.restaurant_id, window, bucket, inc, names, order.created_at)
+        for window, bucket in item_sales_buckets(order.created_at).items()
+    ]
+    await db.item_sales.bulk_write(operations, ordered=False)
+
+ITEM_SALES_BACKFILL_BATCH_SIZE = 500
+
+async def backfill_item_sales(started_at: datetime) -> int:
+    # Sayaçlardan önce verilen siparişler saklama süreleri içindeki kovalara bir kez eklenir;
+    # started_at sonrası siparişleri record_item_sales zaten yazıyor
+    buckets, first_sales = {}, {}
+    orders = db.orders.find(
+        {"created_at": {"$gte": (started_at - ITEM_SALES_RETENTION["day"]).isoformat(), "$lt": started_at.isoformat()}},
+        {"_id": 0, "restaurant_id": 1, "created_at": 1, "items": 1}
+    )
+    async for order in orders:
+        created_at = datetime.fromisoformat(order["created_at"])
+        for window, bucket in item_sales_buckets(created_at).items():
+            if started_at - created_at > ITEM_SALES_RETENTION[window]:
+                continue
+            key = (order["restaurant_id"], window, bucket)
+            inc, names = buckets.setdefault(key, ({}, {}))
+            add_item_sales(inc, names, order.get("items") or [])
+            first_sales[key] = min(first_sales.get(key, created_at), created_at)
+    
+    operations = [
+        item_sales_update(*key, inc, names, first_sales[key])
+        for key, (inc, names) in buckets.items() if inc
+    ]
+    for start in range(0, len(operations), ITEM_SALES_BACKFILL_BATCH_SIZE):
+        await db.item_sales.bulk_write(operations[start:start + ITEM_SALES_BACKFILL_BATCH_SIZE], ordered=False)
+    return len(operations)
+
+@app.on_event("startup")
+async def backfill_item_sales_once():
+    await run_migration("item_sales_backfill", backfill_item_sales)
+
+async def popular_items_by_window(restaurant_id: str, limit: int = 5, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    current = item_sales_buckets(now)
+    week_days = [(now - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+    docs = await db.item_sales.find(
+        {"restaurant_id": restaurant_id, "$or": [
+            {"window": "hour", "bucket": current["hour"]},
+            {"window": "day", "bucket": {"$in": week_days}}
+        ]},
+        {"_id": 0, "window": 1, "bucket": 1, "counts": 1, "names": 1}
+    ).to_list(len(week_days) + 1)
+    
+    totals = {window: defaultdict(int) for window in POPULAR_ITEM_WINDOWS}
+    names = {}
+    for doc in docs:
+        windows = [doc["window"]]
+        if doc["window"] == "day":
+            windows = ["week", "day"] if doc["bucket"] == current["day"] else ["week"]
+        for window in windows:
+            for item_id, count in doc.get("counts", {}).items():
+                totals[window][item_id] += count
+        names.update(doc.get("names", {}))
+    
+    return {
+        window: [
+            {"menu_item_id": item_id, "name": names.get(item_id, ""), "count": count}
+            for item_id, count in heapq.nlargest(limit, counts.items(), key=lambda x: x[1])
+        ]
+        for window, counts in totals.items()
+    }
+
+# -----------------------------
+# MENÜ İÇE / DIŞA AKTARMA
+# İçe aktarma önce tüm satırları doğrular (hata varsa hiçbir şey yazılmaz), sonra
+# eksik kategorileri tek insert_many, ürünleri (kategori + ad eşleşmesiyle) tek
+# sırasız bulk_write upsert ile yazar. Dışa aktarma cursor'dan satır satır akar.
+# -----------------------------
+MENU_IMPORT_MAX_ROWS = 5000
+MENU_EXPORT_FIELDS = list(MenuImportRow.model_fields)
+
+def parse_menu_import(body: bytes, fmt: str) -> List[dict]:
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Import must be UTF-8")
+    
+    if fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(text)))
+        # Boş CSV hücreleri varsayılan değerleri kullansın
+        return [{k: v for k, v in row.items() if k and v not in (None, "")} for row in rows]
+    try:
+        rows = json.loads(text)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if isinstance(rows, dict):
+        rows = rows.get("items")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="JSON import must be a list of menu items")
+    return rows
+
+def validate_menu_import(rows: List[dict]) -> List[MenuImportRow]:
+    if len(rows) > MENU_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MENU_IMPORT_MAX_ROWS} rows per import")
+    
+    valid, errors = [], []
+    for index, row in enumerate(rows, start=1):
+        try:
+            valid.append(MenuImportRow.model_validate(row))
+        except ValidationError as e:
+            errors.append({
+                "row": index,
+                "errors": [{"field": ".".join(str(x) for x in err["loc"]), "message": err["msg"]} for err in e.errors()]
+            })
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "Menu import has invalid rows", "rows": errors})
+    return valid
+
+async def import_menu_rows(restaurant_id: str, rows: List[MenuImportRow]) -> dict:
+    now_iso = datetime.now(timezone.utc).isoformat()
+    categories = await db.menu_categories.find(
+        {"restaurant_id": restaurant_id}, {"_id": 0, "id": 1, "name": 1, "order": 1}
+    ).to_list(1000)
+    category_ids = {c["name"]: c["id"] for c in categories}
+    next_order = max((c.get("order", 0) for c in categories), default=0) + 1
+    
+    new_categories = []
+    for row in rows:
+        if row.category not in category_ids:
+            category = MenuCategory(restaurant_id=restaurant_id, name=row.category, order=next_order)
+            doc = category.model_dump()
+            doc['created_at'] = now_iso
+            new_categories.append(doc)
+            category_ids[row.category] = category.id
+            next_order += 1
+    if new_categories:
+        await db.menu_categories.insert_many(new_categories, ordered=False)
+    
+    operations = []
+    for row in rows:
+        fields = row.model_dump(exclude={"category"})
+        category_id = category_ids[row.category]
+        operations.append(UpdateOne(
+            {"restaurant_id": restaurant_id, "category_id": category_id, "name": row.name},
+            {"$set": fields, "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now_iso}},
+            upsert=True
+        ))
+    result = None
+    if operations:
+        result = await db.menu_items.bulk_write(operations, ordered=False)
+    await invalidate_cache("menu", restaurant_id)
+    publish_menu_event(restaurant_id, "menu_changed", {})
+    
+    return {
+        "categories_created": len(new_categories),
+        "items_created": result.upserted_count if result else 0,
+        "items_updated": result.matched_count if result else 0,
+    }
+
+async def export_menu_rows(restaurant_id: str, fmt: str):
+    categories = await db.menu_categories.find(
+        {"restaurant_id": restaurant_id}, {"_id": 0, "id": 1, "name": 1}
+    ).sort("order", 1).to_list(1000)
+    projection = {"_id": 0, **{field: 1 for field in MENU_EXPORT_FIELDS if field != "category"}}
+    
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=MENU_EXPORT_FIELDS)
+    if fmt == "csv":
+        writer.writeheader()
+    else:
+        buffer.write("[")
+    first = True
+    for category in categories:
+        cursor = db.menu_items.find({"restaurant_id": restaurant_id, "category_id": category["id"]}, projection)
+        async for item in cursor:
+            row = {field: item.get(field) for field in MENU_EXPORT_FIELDS}
+            row["category"] = category["name"]
+            if fmt == "csv":
+                writer.writerow(row)
+            else:
+                buffer.write(("" if first else ",") + json.dumps(row, ensure_ascii=False))
+            first = False
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if fmt != "csv":
+        buffer.write("]")
+    yield buffer.getvalue()
+
+# -----------------------------
+# MENÜ GÖRSELLERİ
+# Yüklenen ya da indirilen görsel process pool'da MENU_IMAGE_SIZES boyutlarında WebP ve
+# JPEG olarak yeniden kodlanır. Dosya adı içerik hash'i taşır, bu yüzden URL'ler kalıcı
+# önbelleğe alınabilir. Depolama yerel disk (/media) ya da S3 uyumlu bir bucket'tır.
+# -----------------------------
+MENU_IMAGE_SIZES = {"thumb": 160, "small": 320, "medium": 640, "large": 1280}
+MENU_IMAGE_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+MENU_IMAGE_DEFAULT_SIZE = "small"
+MENU_IMAGE_MAX_BYTES = int(os.environ.get("MENU_IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+MENU_IMAGE_MAX_PIXELS = 40_000_000
+MENU_IMAGE_DOWNLOAD_TIMEOUT = 10
+MENU_IMAGE_WORKERS = int(os.environ.get("MENU_IMAGE_WORKERS", "2"))
+MENU_IMAGE_DIR = Path(os.environ.get("MENU_IMAGE_DIR", str(ROOT_DIR / "media")))
+
+def render_image_variants(data: bytes) -> List[dict]:
+    """Process pool'da çalışır: her boyut ve format için kodlanmış baytları döner."""
+    image = Image.open(io.BytesIO(data))
+    if image.width * image.height > MENU_IMAGE_MAX_PIXELS:
+        raise ValueError("Image is too large")
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    
+    variants = []
+    for size, max_side in MENU_IMAGE_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.LANCZOS)
+        for fmt, (pil_format, content_type) in MENU_IMAGE_FORMATS.items():
+            out = io.BytesIO()
+            if fmt == "webp":
+                resized.save(out, pil_format, quality=80, method=4)
+            else:
+                resized.save(out, pil_format, quality=82, optimize=True, progressive=True)
+            variants.append({
+                "size": size,
+                "format": fmt,
+                "content_type": content_type,
+                "width": resized.width,
+                "height": resized.height,
+                "data": out.getvalue(),
+            })
+    return variants
+
+class LocalImageStore:
+    def __init__(self, directory: Path, base_url: str = "/media"):
+        self.directory = directory
+        self.base_url = base_url
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, key: str, data: bytes):
+        path = self.directory / key
+        if path.exists():
+            return
+        tmp_path = path.with_name(path.name + f".{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    async def put(self, key: str, data: bytes, content_type: str) -> str:
+        await asyncio.to_thread(self._write, key, data)
+        return f"{self.base_url}/{key}"
+
+class S3ImageStore:
+    def __init__(self, bucket: str, public_url: str, prefix: str = "menu/"):
+        import boto3
+        self.client = boto3.client("s3", endpoint_url=os.environ.get("MENU_IMAGE_S3_ENDPOINT") or None)
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/")
+        self.prefix = prefix
+
+    async def put(self, key: str, data: bytes, content_type: str) -> str:
+        await asyncio.to_thread(
+            self.client.put_object,
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=IMMUTABLE_CACHE_CONTROL,
+        )
+        return f"{self.public_url}/{self.prefix}{key}"
+
+def create_image_store():
+    if os.environ.get("MENU_IMAGE_STORE") == "s3":
+        return S3ImageStore(os.environ["MENU_IMAGE_S3_BUCKET"], os.environ["MENU_IMAGE_PUBLIC_URL"])
+    return LocalImageStore(MENU_IMAGE_DIR)
+
+image_store = create_image_store()
+image_executor: Optional[ProcessPoolExecutor] = None
+
+MENU_IMAGE_MAX_REDIRECTS = 3
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address)
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not (ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved or ip.is_multicast)
+
+async def resolve_public_address(url: httpx.URL) -> str:
+    """URL'in host'unu çözer; herhangi bir adresi iç ağa (özel, loopback, link-local, ayrılmış) düşüyorsa reddeder."""
+    if url.scheme not in ("http", "https") or not url.host:
+        raise HTTPException(status_code=400, detail="Image URL must be http(s)")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(url.host, url.port or (443 if url.scheme == "https" else 80), type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise HTTPException(status_code=400, detail="Image download failed")
+    addresses = {info[4][0].split("%", 1)[0] for info in infos}
+    if not addresses or not all(is_public_address(address) for address in addresses):
+        raise HTTPException(status_code=400, detail="Image download failed")
+    return sorted(addresses)[0]
+
+async def download_image(url: str) -> bytes:
+    # SSRF koruması: her adımda host çözülüp doğrulanır ve bağlantı doğrulanan adrese sabitlenir
+    # (DNS yeniden bağlama yok); yönlendirmeler elle izlenir ve her biri yeniden kontrol edilir.
+    # Uzak sunucunun yanıtı istemciye yansıtılmaz, hata mesajı geneldir.
+    try:
+        target = httpx.URL(url)
+    except httpx.InvalidURL:
+        raise HTTPException(status_code=400, detail="Image URL must be http(s)")
+    
+    chunks, size = [], 0
+    try:
+        async with httpx.AsyncClient(timeout=MENU_IMAGE_DOWNLOAD_TIMEOUT, follow_redirects=False) as http:
+            for _ in range(MENU_IMAGE_MAX_REDIRECTS + 1):
+                address = await resolve_public_address(target)
+                request = http.build_request(
+                    "GET", target.copy_with(host=address),
+                    headers={"Host": target.netloc.decode("ascii")},
+                    extensions={"sni_hostname": target.host} if target.scheme == "https" else {},
+                )
+                response = await http.send(request, stream=True)
+                try:
+                    if response.is_redirect:
+                        target = target.join(response.headers["location"])
+                        continue
+                    if response.status_code != 200:
+                        raise HTTPException(status_code=400, detail="Image download failed")
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > MENU_IMAGE_MAX_BYTES:
+                            raise HTTPException(status_code=413, detail="Image is too large")
+                        chunks.append(chunk)
+                    return b"".join(chunks)
+                finally:
+                    await response.aclose()
+    except (httpx.HTTPError, httpx.InvalidURL, KeyError):
+        pass
+    raise HTTPException(status_code=400, detail="Image download failed")
+
+async def read_limited_body(request: Request) -> bytes:
+    # Gövde parça parça okunur; MENU_IMAGE_MAX_BYTES aşılınca okuma kesilir, tamamı belleğe alınmaz
+    if int(request.headers.get("content-length") or 0) > MENU_IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MENU_IMAGE_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Image is too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def ingest_menu_image(data: bytes) -> Dict[str, dict]:
+    global image_executor
+    if image_executor is None:
+        image_executor = ProcessPoolExecutor(max_workers=MENU_IMAGE_WORKERS)
+    
+    try:
+        rendered = await asyncio.get_running_loop().run_in_executor(image_executor, render_image_variants, data)
+    except (ValueError, OSError, Image.DecompressionBombError):
+        raise HTTPException(status_code=400, detail="Invalid image")
+    
+    variants: Dict[str, dict] = {}
+    urls = await asyncio.gather(*[
+        image_store.put(
+            f"{v['size']}.{hashlib.sha256(v['data']).hexdigest()[:20]}.{'jpg' if v['format'] == 'jpeg' else v['format']}",
+            v["data"],
+            v["content_type"],
+        )
+        for v in rendered
+    ])
+    for v, url in zip(rendered, urls):
+        entry = variants.setdefault(v["size"], {"width": v["width"], "height": v["height"]})
+        entry[v["format"]] = url
+    return variants
+
 @api_router.post("/auth/register", response_model=User)
 async def register(user_data: UserCreate):
     existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
@@ -326,7 +2131,7 @@ async def login(credentials: UserLogin):
     user_doc.pop('password', None)
     user = User(**user_doc)
     
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data={"sub": user.id, "rid": user.restaurant_id})
     return Token(access_token=access_token, token_type="bearer", user=user)
 
 @api_router.post("/admin/restaurants")
@@ -393,7 +2198,8 @@ async def create_restaurant(data: RestaurantCreate, current_user: User = Depends
             "mutfak_enabled": data.mutfak_enabled
         }
 
-        await db.restaurants.insert_one(restaurant)
+        # insert_one dokümana ObjectId _id ekler; yanıtta dönen sözlük temiz kalmalı
+        await db.restaurants.insert_one(dict(restaurant))
         print(f"[CREATE RESTAURANT] Restoran oluşturuldu: {restaurant['name']}")
 
         return restaurant
@@ -433,6 +2239,13 @@ async def get_all_restaurants(current_user: User = Depends(get_current_user)):
         r["_id"] = str(r["_id"])
         restaurants.append(r)
 
+    stats = await db.review_stats.find(
+        {"restaurant_id": {"$in": [r.get("id") for r in restaurants]}}, {"_id": 0}
+    ).to_list(len(restaurants))
+    stats_by_restaurant = {doc["restaurant_id"]: doc for doc in stats}
+    for r in restaurants:
+        r["rating"] = rating_summary(stats_by_restaurant.get(r.get("id")))
+
     return restaurants
 
 @api_router.delete("/admin/restaurants/{restaurant_id}")
@@ -446,9 +2259,179 @@ async def delete_restaurant(restaurant_id: str, current_user: User = Depends(get
     await db.menu_categories.delete_many({"restaurant_id": restaurant_id})
     await db.menu_items.delete_many({"restaurant_id": restaurant_id})
     await db.orders.delete_many({"restaurant_id": restaurant_id})
+    await db.reviews.delete_many({"restaurant_id": restaurant_id})
+    await db.review_stats.delete_one({"restaurant_id": restaurant_id})
+    await db.waiter_calls.delete_many({"restaurant_id": restaurant_id})
+    await db.item_sales.delete_many({"restaurant_id": restaurant_id})
+    await db.order_events.delete_many({"restaurant_id": restaurant_id})
+    # Bellekteki yazılmamış farklar bir sonraki flush'ta kaydı upsert ile geri getirmesin
+    kitchen_latency.pop(restaurant_id, None)
+    await db.kitchen_latency.delete_one({"restaurant_id": restaurant_id})
+    for name in await order_archive_partitions():
+        await db[name].delete_many({"restaurant_id": restaurant_id})
+    
+    await invalidate_cache("restaurant", restaurant_id)
+    await invalidate_cache("menu", restaurant_id)
+    publish_menu_event(restaurant_id, "menu_changed", {})
+    await invalidate_cache("user")
+    await invalidate_cache("table")
+    await invalidate_cache("orders", restaurant_id)
+    await invalidate_cache("waiter_calls", restaurant_id)
     
     return {"message": "Restaurant deleted"}
 
+@api_router.post("/admin/archive/run")
+async def run_order_archive(older_than_days: int = ORDER_ARCHIVE_AFTER_DAYS, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    if older_than_days < 1:
+        raise HTTPException(status_code=400, detail="older_than_days must be at least 1")
+    
+    archived = await archive_completed_orders(older_than_days)
+    return {"archived": archived}
+
+@api_router.get("/admin/metrics")
+async def get_admin_metrics(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return {
+        "lookups": lookup_metrics(),
+        "caches": {name: cache.snapshot() for name, cache in worker_caches.items()},
+        "list_versions": {name: version.snapshot() for name, version in list_versions.items()},
+        "invalidation": invalidation_bus.snapshot(),
+        "menu_stream": {"channels": len(menu_events.channels), "subscribers": menu_events.subscriber_count()},
+        "admission": admission.snapshot(),
+        "deadlines": deadline_stats.snapshot(),
+        "routes": route_metrics.snapshot(),
+        "event_loop": loop_monitor.snapshot(),
+    }
+
+# -----------------------------
+# PROFİLLEME (YALNIZCA İSTENDİĞİNDE)
+# /admin/profile canlı süreçte süre sınırlı bir örnekleyici çalıştırır: ayrı bir thread her
+# interval_ms'de sys._current_frames() ile tüm thread'lerin yığınını alır. Çıktı flamegraph
+# araçlarının okuduğu collapsed-stack metni ya da speedscope JSON'udur. Aynı anda tek
+# profil çalışır; profil yokken hiçbir kanca kurulu değildir.
+# PROFILE_SECRET tanımlıysa "X-Profile: <secret>" başlığı taşıyan istek cProfile altında
+# çalışır ve yanıtın X-Profile-Id'si ile /admin/profile/requests/{id}'den okunur. cProfile
+# thread'i profiller: istek beklerken loop'ta koşan diğer işler de çıktıya girer.
+# -----------------------------
+PROFILE_MAX_SECONDS = 60
+PROFILE_MIN_INTERVAL_MS = 1
+PROFILE_SECRET = os.environ.get("PROFILE_SECRET", "")
+PROFILE_REQUEST_HISTORY = 20
+PROFILE_FORMATS = ("collapsed", "speedscope")
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def collect(self, seconds: float, interval_ms: float, stop: threading.Event) -> Dict[tuple, int]:
+        """Yığınları (thread adı, dıştan içe çerçeveler) anahtarıyla sayar."""
+        own_id = threading.get_ident()
+        counts: Dict[tuple, int] = defaultdict(int)
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not stop.wait(interval_ms / 1000):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                counts[(names.get(thread_id, str(thread_id)), *reversed(stack))] += 1
+        return counts
+
+    async def run(self, seconds: float, interval_ms: float) -> Dict[tuple, int]:
+        if not self.lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="A profile is already running")
+        stop = threading.Event()
+        try:
+            return await asyncio.to_thread(self.collect, seconds, interval_ms, stop)
+        finally:
+            # İstemci koparsa thread de durur
+            stop.set()
+            self.lock.release()
+
+sampling_profiler = SamplingProfiler()
+
+def collapsed_stacks(counts: Dict[tuple, int]) -> str:
+    return "".join(f"{';'.join(name.replace(';', ',') for name in stack)} {count}\n" for stack, count in sorted(counts.items()))
+
+def speedscope_profile(counts: Dict[tuple, int], interval_ms: float) -> dict:
+    frames: List[dict] = []
+    frame_ids: Dict[str, int] = {}
+    by_thread: Dict[str, dict] = {}
+    for (thread_name, *stack), count in sorted(counts.items()):
+        profile = by_thread.setdefault(thread_name, {
+            "type": "sampled", "name": thread_name, "unit": "milliseconds",
+            "startValue": 0, "endValue": 0, "samples": [], "weights": [],
+        })
+        sample = []
+        for label in stack:
+            if label not in frame_ids:
+                frame_ids[label] = len(frames)
+                frames.append({"name": label})
+            sample.append(frame_ids[label])
+        profile["samples"].append(sample)
+        profile["weights"].append(count * interval_ms)
+        profile["endValue"] += count * interval_ms
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": list(by_thread.values()),
+        "name": "tabletech backend",
+        "exporter": "backend/server.py",
+    }
+
+request_profiles: Dict[str, str] = {}
+
+@api_router.get("/admin/profile")
+async def profile_process(
+    seconds: float = 10,
+    interval_ms: float = 5,
+    format: str = "collapsed",
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS}")
+    if interval_ms < PROFILE_MIN_INTERVAL_MS:
+        raise HTTPException(status_code=400, detail=f"interval_ms must be at least {PROFILE_MIN_INTERVAL_MS}")
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(PROFILE_FORMATS)}")
+    
+    counts = await sampling_profiler.run(seconds, interval_ms)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    if format == "speedscope":
+        return Response(
+            json.dumps(speedscope_profile(counts, interval_ms)),
+            media_type="application/json",
+            headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.speedscope.json"'},
+        )
+    return Response(
+        collapsed_stacks(counts),
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.collapsed.txt"'},
+    )
+
+@api_router.get("/admin/profile/requests/{profile_id}")
+async def get_request_profile(profile_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    report = request_profiles.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(report, media_type="text/plain")
+
 @api_router.get("/admin/stats")
 async def get_admin_stats(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
@@ -456,10 +2439,7 @@ async def get_admin_stats(current_user: User = Depends(get_current_user)):
     
     total_restaurants = await db.restaurants.count_documents({})
     active_restaurants = await db.restaurants.count_documents({"subscription_status": "active"})
-    total_orders = await db.orders.count_documents({})
-    
-    orders = await db.orders.find({}, {"_id": 0, "total_amount": 1}).to_list(10000)
-    total_revenue = sum(order.get("total_amount", 0) for order in orders)
+    total_orders, total_revenue = await order_totals({})
     
     today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
     today_orders = await db.orders.count_documents({
@@ -514,16 +2494,7 @@ async def get_admin_analytics(current_user: User = Depends(get_current_user)):
         day_start = (datetime.now(timezone.utc) - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
         day_end = day_start + timedelta(days=1)
         
-        count = await db.orders.count_documents({
-            "created_at": {"$gte": day_start.isoformat(), "$lt": day_end.isoformat()}
-        })
-        
-        orders = await db.orders.find(
-            {"created_at": {"$gte": day_start.isoformat(), "$lt": day_end.isoformat()}},
-            {"_id": 0, "total_amount": 1}
-        ).to_list(10000)
-        
-        revenue = sum(order.get("total_amount", 0) for order in orders)
+        count, revenue = await order_totals({}, day_start, day_end)
         
         daily_orders.append({
             "date": day_start.strftime("%d.%m"),
@@ -535,12 +2506,7 @@ async def get_admin_analytics(current_user: User = Depends(get_current_user)):
     restaurant_stats = []
     
     for restaurant in restaurants:
-        order_count = await db.orders.count_documents({"restaurant_id": restaurant["id"]})
-        orders = await db.orders.find(
-            {"restaurant_id": restaurant["id"]},
-            {"_id": 0, "total_amount": 1}
-        ).to_list(10000)
-        revenue = sum(order.get("total_amount", 0) for order in orders)
+        order_count, revenue = await order_totals({"restaurant_id": restaurant["id"]})
         
         restaurant_stats.append({
             "name": restaurant["name"],
@@ -555,35 +2521,7 @@ async def get_admin_analytics(current_user: User = Depends(get_current_user)):
         "restaurant_stats": restaurant_stats[:10]
     }
 
-@api_router.get("/owner/stats")
-async def get_owner_stats(current_user: User = Depends(get_current_user)):
-    if current_user.role != "owner":
-        raise HTTPException(status_code=403, detail="Owner only")
-    
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    today_orders = await db.orders.find(
-        {
-            "restaurant_id": current_user.restaurant_id,
-            "created_at": {"$gte": today_start.isoformat()}
-        },
-        {"_id": 0}
-    ).to_list(10000)
-    
-    today_count = len(today_orders)
-    today_revenue = sum(order.get("total_amount", 0) for order in today_orders)
-    
-    week_start = (datetime.now(timezone.utc) - timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
-    week_orders = await db.orders.find(
-        {
-            "restaurant_id": current_user.restaurant_id,
-            "created_at": {"$gte": week_start.isoformat()}
-        },
-        {"_id": 0}
-    ).to_list(10000)
-    
-    week_count = len(week_orders)
-    week_revenue = sum(order.get("total_amount", 0) for order in week_orders)
-    
+async def owner_status_counts(restaurant_id: str) -> dict:
     status_counts = {
         "pending": 0,
         "preparing": 0,
@@ -592,7 +2530,7 @@ async def get_owner_stats(current_user: User = Depends(get_current_user)):
     }
     
     all_orders = await db.orders.find(
-        {"restaurant_id": current_user.restaurant_id},
+        {"restaurant_id": restaurant_id},
         {"_id": 0, "status": 1}
     ).to_list(10000)
     
@@ -600,38 +2538,42 @@ async def get_owner_stats(current_user: User = Depends(get_current_user)):
         status = order.get("status", "pending")
         if status in status_counts:
             status_counts[status] += 1
+    return status_counts
+
+async def owner_stats(restaurant_id: str) -> dict:
+    restaurant_query = {"restaurant_id": restaurant_id}
     
-    item_counts = {}
-    for order in all_orders:
-        for item in order.get("items", []):
-            name = item.get("name", "")
-            if name:
-                item_counts[name] = item_counts.get(name, 0) + item.get("quantity", 0)
-    
-    popular_items = sorted(item_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-    popular_items = [{"name": name, "count": count} for name, count in popular_items]
-    
-    daily_stats = []
-    for i in range(6, -1, -1):
-        day_start = (datetime.now(timezone.utc) - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        
-        day_orders = await db.orders.find(
-            {
-                "restaurant_id": current_user.restaurant_id,
-                "created_at": {"$gte": day_start.isoformat(), "$lt": day_end.isoformat()}
-            },
-            {"_id": 0, "total_amount": 1}
-        ).to_list(10000)
-        
-        count = len(day_orders)
-        revenue = sum(order.get("total_amount", 0) for order in day_orders)
-        
-        daily_stats.append({
-            "date": day_start.strftime("%d.%m"),
-            "orders": count,
-            "revenue": round(revenue, 2)
-        })
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = (datetime.now(timezone.utc) - timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_starts = [
+        (datetime.now(timezone.utc) - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
+        for i in range(6, -1, -1)
+    ]
+    
+    # Birbirinden bağımsız sorgular tek seferde çalışır
+    (
+        (today_count, today_revenue),
+        (week_count, week_revenue),
+        status_counts,
+        (archived_count, _),
+        popular_by_window,
+        *daily_totals,
+    ) = await asyncio.gather(
+        order_totals(restaurant_query, today_start),
+        order_totals(restaurant_query, week_start),
+        owner_status_counts(restaurant_id),
+        # Arşivdeki siparişlerin hepsi tamamlanmış siparişlerdir
+        order_totals(restaurant_query, include_hot=False),
+        popular_items_by_window(restaurant_id, limit=5),
+        *[order_totals(restaurant_query, day_start, day_start + timedelta(days=1)) for day_start in day_starts],
+    )
+    status_counts["completed"] += archived_count
+    popular_items = [{"name": i["name"], "count": i["count"]} for i in popular_by_window["week"]]
+    
+    daily_stats = [
+        {"date": day_start.strftime("%d.%m"), "orders": count, "revenue": round(revenue, 2)}
+        for day_start, (count, revenue) in zip(day_starts, daily_totals)
+    ]
     
     return {
         "today": {
@@ -644,9 +2586,114 @@ async def get_owner_stats(current_user: User = Depends(get_current_user)):
         },
         "status_distribution": status_counts,
         "popular_items": popular_items,
+        "popular_items_by_window": popular_by_window,
         "daily_stats": daily_stats
     }
 
+@api_router.get("/owner/stats")
+async def get_owner_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    return await owner_stats(current_user.restaurant_id)
+
+# -----------------------------
+# SAHİP PANELİ (TEK İSTEK)
+# Panelin ihtiyaç duyduğu bölümler tek kimlik doğrulamasıyla, asyncio.gather ile paralel
+# okunur ve tek (gerekirse gzip'li) yanıt olarak döner. Masalar varsayılan olarak QR
+# PNG'leri olmadan gelir; bölüm alanları ?<bölüm>_fields=id,name ile daraltılabilir.
+# -----------------------------
+DASHBOARD_SECTIONS = ("stats", "categories", "items", "tables", "orders")
+DASHBOARD_ORDERS_LIMIT = 1000
+DASHBOARD_GZIP_MIN_BYTES = 1024
+
+def dashboard_projection(fields: Optional[str], default_exclude: tuple = ()) -> dict:
+    if fields:
+        return {"_id": 0, **{f.strip(): 1 for f in fields.split(",") if f.strip() and not f.strip().startswith("$")}}
+    return {"_id": 0, **{f: 0 for f in default_exclude}}
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def compressed_json_response(request: Request, payload) -> Response:
+    body = json.dumps(payload, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-store"}
+    if len(body) >= DASHBOARD_GZIP_MIN_BYTES and "gzip" in accepted_encodings(request.headers):
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
+
+@api_router.get("/owner/dashboard")
+async def get_owner_dashboard(
+    request: Request,
+    sections: Optional[str] = None,
+    include_qr: bool = False,
+    orders_limit: int = DASHBOARD_ORDERS_LIMIT,
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    requested = [x.strip() for x in sections.split(",")] if sections else list(DASHBOARD_SECTIONS)
+    unknown = [x for x in requested if x not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+    
+    restaurant_query = {"restaurant_id": current_user.restaurant_id}
+    fields = {section: request.query_params.get(f"{section}_fields") for section in DASHBOARD_SECTIONS}
+    loaders = {
+        "stats": lambda: owner_stats(current_user.restaurant_id),
+        "categories": lambda: db.menu_categories.find(
+            restaurant_query, dashboard_projection(fields["categories"])
+        ).sort("order", 1).to_list(1000),
+        "items": lambda: db.menu_items.find(
+            restaurant_query, dashboard_projection(fields["items"])
+        ).to_list(1000),
+        "tables": lambda: db.tables.find(
+            restaurant_query, dashboard_projection(fields["tables"], () if include_qr else ("qr_code",))
+        ).to_list(1000),
+        "orders": lambda: db.orders.find(
+            restaurant_query, dashboard_projection(fields["orders"])
+        ).sort("created_at", -1).to_list(max(1, min(orders_limit, 1000))),
+    }
+    
+    results = await asyncio.gather(*[loaders[section]() for section in requested])
+    return compressed_json_response(request, dict(zip(requested, results)))
+
+@api_router.get("/owner/popular-items")
+async def get_popular_items(window: str = "week", limit: int = 10, current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    if window not in POPULAR_ITEM_WINDOWS:
+        raise HTTPException(status_code=400, detail="window must be one of: hour, day, week")
+    
+    limit = min(max(limit, 1), 50)
+    return (await popular_items_by_window(current_user.restaurant_id, limit=limit))[window]
+
+@api_router.get("/owner/kitchen-latency")
+async def get_kitchen_latency(current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    latency = await get_restaurant_latency(current_user.restaurant_id)
+    overall = {m: latency.sketches[m][ALL_ITEMS_KEY].summary() for m in LATENCY_METRICS}
+    
+    item_ids = set()
+    for metric in LATENCY_METRICS:
+        item_ids.update(k for k in latency.sketches[metric] if k != ALL_ITEMS_KEY)
+    items = []
+    for item_id in item_ids:
+        entry = {"menu_item_id": item_id, "name": latency.item_names.get(item_id, "")}
+        for metric in LATENCY_METRICS:
+            sketch = latency.sketches[metric].get(item_id)
+            entry[metric] = sketch.summary() if sketch else {"count": 0}
+        items.append(entry)
+    items.sort(key=lambda x: x["prep"]["count"], reverse=True)
+    
+    return {"overall": overall, "items": items}
+
 @api_router.get("/owner/menu/categories", response_model=List[MenuCategory])
 async def get_categories(current_user: User = Depends(get_current_user)):
     if current_user.role != "owner":
@@ -675,9 +2722,29 @@ async def create_category(data: MenuCategoryCreate, current_user: User = Depends
     doc = category.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.menu_categories.insert_one(doc)
+    await invalidate_cache("menu", current_user.restaurant_id)
+    publish_menu_event(current_user.restaurant_id, "menu_changed", {})
     
     return category
 
+@api_router.put("/owner/menu/categories/order", response_model=List[MenuCategory])
+async def reorder_categories(data: CategoryReorder, current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    if len(set(data.category_ids)) != len(data.category_ids):
+        raise HTTPException(status_code=400, detail="Duplicate category ids")
+    
+    operations = [
+        UpdateOne({"id": category_id, "restaurant_id": current_user.restaurant_id}, {"$set": {"order": index}})
+        for index, category_id in enumerate(data.category_ids, start=1)
+    ]
+    if operations:
+        await db.menu_categories.bulk_write(operations, ordered=False)
+        await invalidate_cache("menu", current_user.restaurant_id)
+        publish_menu_event(current_user.restaurant_id, "menu_changed", {})
+    return await get_categories(current_user)
+
 @api_router.put("/owner/menu/categories/{category_id}", response_model=MenuCategory)
 async def update_category(category_id: str, data: MenuCategoryCreate, current_user: User = Depends(get_current_user)):
     if current_user.role != "owner":
@@ -687,6 +2754,8 @@ async def update_category(category_id: str, data: MenuCategoryCreate, current_us
         {"id": category_id, "restaurant_id": current_user.restaurant_id},
         {"$set": {"name": data.name, "order": data.order}}
     )
+    await invalidate_cache("menu", current_user.restaurant_id)
+    publish_menu_event(current_user.restaurant_id, "menu_changed", {})
     
     category_doc = await db.menu_categories.find_one({"id": category_id}, {"_id": 0})
     if isinstance(category_doc.get('created_at'), str):
@@ -700,6 +2769,8 @@ async def delete_category(category_id: str, current_user: User = Depends(get_cur
     
     await db.menu_categories.delete_one({"id": category_id, "restaurant_id": current_user.restaurant_id})
     await db.menu_items.delete_many({"category_id": category_id})
+    await invalidate_cache("menu", current_user.restaurant_id)
+    publish_menu_event(current_user.restaurant_id, "menu_changed", {})
     return {"message": "Category deleted"}
 
 @api_router.get("/owner/menu/items", response_model=List[MenuItem])
@@ -735,6 +2806,8 @@ async def create_menu_item(data: MenuItemCreate, current_user: User = Depends(ge
     doc = item.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.menu_items.insert_one(doc)
+    await invalidate_cache("menu", current_user.restaurant_id)
+    publish_menu_event(current_user.restaurant_id, "item", menu_item_delta(doc))
     
     return item
 
@@ -744,12 +2817,66 @@ async def update_menu_item(item_id: str, data: MenuItemCreate, current_user: Use
         raise HTTPException(status_code=403, detail="Owner only")
     
     update_data = data.model_dump()
-    await db.menu_items.update_one(
+    item_doc = await db.menu_items.find_one_and_update(
         {"id": item_id, "restaurant_id": current_user.restaurant_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
+    if item_doc is None:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    variants = item_doc.get("image_variants")
+    if variants and not any(item_doc.get("image_url") in v.values() for v in variants.values()):
+        # Görsel elle başka bir URL ile değiştirildi; eski varyantlar artık geçersiz
+        await db.menu_items.update_one(
+            {"id": item_id, "restaurant_id": current_user.restaurant_id},
+            {"$unset": {"image_variants": ""}}
+        )
+        item_doc.pop("image_variants")
+    await invalidate_cache("menu", current_user.restaurant_id)
+    publish_menu_event(current_user.restaurant_id, "item", menu_item_delta(item_doc))
+    if isinstance(item_doc.get('created_at'), str):
+        item_doc['created_at'] = datetime.fromisoformat(item_doc['created_at'])
+    return MenuItem(**item_doc)
+
+@api_router.post("/owner/menu/items/{item_id}/image", response_model=MenuItem)
+async def upload_menu_item_image(item_id: str, request: Request, current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
     
-    item_doc = await db.menu_items.find_one({"id": item_id}, {"_id": 0})
+    item_filter = {"id": item_id, "restaurant_id": current_user.restaurant_id}
+    if not await db.menu_items.find_one(item_filter, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            source = MenuImageSource.model_validate_json(await request.body())
+        except ValidationError:
+            raise HTTPException(status_code=400, detail="Expected {\"url\": ...}")
+        data = await download_image(source.url)
+    elif content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing file field")
+        data = await upload.read(MENU_IMAGE_MAX_BYTES + 1)
+    else:
+        data = await read_limited_body(request)
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty image")
+    if len(data) > MENU_IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    
+    variants = await ingest_menu_image(data)
+    item_doc = await db.menu_items.find_one_and_update(
+        item_filter,
+        {"$set": {"image_variants": variants, "image_url": variants[MENU_IMAGE_DEFAULT_SIZE]["jpeg"]}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    await invalidate_cache("menu", current_user.restaurant_id)
+    publish_menu_event(current_user.restaurant_id, "menu_changed", {})
     if isinstance(item_doc.get('created_at'), str):
         item_doc['created_at'] = datetime.fromisoformat(item_doc['created_at'])
     return MenuItem(**item_doc)
@@ -760,8 +2887,37 @@ async def delete_menu_item(item_id: str, current_user: User = Depends(get_curren
         raise HTTPException(status_code=403, detail="Owner only")
     
     await db.menu_items.delete_one({"id": item_id, "restaurant_id": current_user.restaurant_id})
+    await invalidate_cache("menu", current_user.restaurant_id)
+    publish_menu_event(current_user.restaurant_id, "item", {"id": item_id, "available": False, "price": None})
     return {"message": "Menu item deleted"}
 
+@api_router.post("/owner/menu/import")
+async def import_menu(request: Request, format: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "json")
+    if fmt not in ("csv", "json"):
+        raise HTTPException(status_code=400, detail="Format must be csv or json")
+    
+    rows = validate_menu_import(parse_menu_import(await request.body(), fmt))
+    return await import_menu_rows(current_user.restaurant_id, rows)
+
+@api_router.get("/owner/menu/export")
+async def export_menu(format: str = "csv", current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    if format not in ("csv", "json"):
+        raise HTTPException(status_code=400, detail="Format must be csv or json")
+    
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/json"
+    return StreamingResponse(
+        export_menu_rows(current_user.restaurant_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="menu.{format}"'}
+    )
+
 @api_router.get("/owner/tables", response_model=List[Table])
 async def get_tables(current_user: User = Depends(get_current_user)):
     if current_user.role != "owner":
@@ -802,16 +2958,20 @@ async def delete_table(table_id: str, current_user: User = Depends(get_current_u
         raise HTTPException(status_code=403, detail="Owner only")
     
     await db.tables.delete_one({"id": table_id, "restaurant_id": current_user.restaurant_id})
+    await invalidate_cache("table", table_id)
     return {"message": "Table deleted"}
 
-@api_router.get("/owner/orders", response_model=List[Order])
-async def get_owner_orders(current_user: User = Depends(get_current_user)):
-    if current_user.role != "owner":
-        raise HTTPException(status_code=403, detail="Owner only")
-    
+ROLE_ORDER_LISTS = {
+    "owner": ({}, -1),
+    "kitchen": ({"status": {"$in": ["pending", "preparing"]}}, 1),
+    "cashier": ({"payment_method": "cash", "status": {"$ne": "completed"}}, 1),
+}
+
+async def role_order_list(role: str, restaurant_id: str) -> List[dict]:
+    query, direction = ROLE_ORDER_LISTS[role]
     orders = await db.orders.find(
-        {"restaurant_id": current_user.restaurant_id}, {"_id": 0}
-    ).sort("created_at", -1).to_list(1000)
+        {"restaurant_id": restaurant_id, **query}, {"_id": 0}
+    ).sort("created_at", direction).to_list(1000)
     
     for o in orders:
         if isinstance(o.get('created_at'), str):
@@ -820,83 +2980,168 @@ async def get_owner_orders(current_user: User = Depends(get_current_user)):
             o['updated_at'] = datetime.fromisoformat(o['updated_at'])
     return orders
 
+@api_router.get("/owner/orders", response_model=List[Order])
+async def get_owner_orders(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    not_modified = not_modified_response(request, order_list_version, current_user.restaurant_id, response)
+    if not_modified:
+        return not_modified
+    return await role_order_list("owner", current_user.restaurant_id)
+
+@api_router.get("/orders/events")
+async def get_order_events(since: Optional[int] = None, current_user: User = Depends(get_current_user)):
+    if current_user.role not in ROLE_ORDER_LISTS:
+        raise HTTPException(status_code=403, detail="Staff only")
+    
+    if since is not None:
+        result = await order_events_since(current_user.restaurant_id, since)
+        if result is not None:
+            return result
+    
+    # seq anlık görüntüden ÖNCE okunur; arada gelen olaylar bir sonraki istekte tekrar uygulanır
+    seq = await current_order_event_seq(current_user.restaurant_id)
+    orders = await role_order_list(current_user.role, current_user.restaurant_id)
+    return {"seq": seq, "snapshot": [Order(**o) for o in orders]}
+
 @api_router.get("/kitchen/orders", response_model=List[Order])
-async def get_kitchen_orders(current_user: User = Depends(get_current_user)):
+async def get_kitchen_orders(request: Request, response: Response, current_user: User = Depends(get_current_user)):
     if current_user.role != "kitchen":
         raise HTTPException(status_code=403, detail="Kitchen only")
     
-    orders = await db.orders.find(
-        {"restaurant_id": current_user.restaurant_id, "status": {"$in": ["pending", "preparing"]}},
-        {"_id": 0}
-    ).sort("created_at", 1).to_list(1000)
-    
-    for o in orders:
-        if isinstance(o.get('created_at'), str):
-            o['created_at'] = datetime.fromisoformat(o['created_at'])
-        if isinstance(o.get('updated_at'), str):
-            o['updated_at'] = datetime.fromisoformat(o['updated_at'])
-    return orders
+    not_modified = not_modified_response(request, order_list_version, current_user.restaurant_id, response)
+    if not_modified:
+        return not_modified
+    return await role_order_list("kitchen", current_user.restaurant_id)
 
 @api_router.put("/kitchen/orders/{order_id}/status")
 async def update_order_status(order_id: str, data: OrderStatusUpdate, current_user: User = Depends(get_current_user)):
     if current_user.role != "kitchen":
         raise HTTPException(status_code=403, detail="Kitchen only")
     
-    await db.orders.update_one(
-        {"id": order_id, "restaurant_id": current_user.restaurant_id},
-        {"$set": {"status": data.status, "updated_at": datetime.now(timezone.utc).isoformat()}}
+    if data.status not in ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid order status")
+    
+    order = await db.orders.find_one(
+        {"id": order_id, "restaurant_id": current_user.restaurant_id}, ORDER_TRANSITION_PROJECTION
+    )
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    # Toplu güncellemeyle aynı kural: yalnızca ileri geçişler, okunan durum filtrede
+    current = order.get("status", "pending")
+    if data.status not in ORDER_TRANSITIONS.get(current, ()):
+        raise HTTPException(status_code=409, detail=f"Cannot move order from {current} to {data.status}")
+    
+    now = datetime.now(timezone.utc)
+    order_before = await db.orders.find_one_and_update(
+        {"id": order_id, "restaurant_id": current_user.restaurant_id, "status": current},
+        {"$set": {
+            "status": data.status,
+            "updated_at": now.isoformat(),
+            f"status_history.{data.status}": now.isoformat()
+        }},
+        projection=ORDER_TRANSITION_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
+    if order_before is None:
+        raise HTTPException(status_code=409, detail="Order status changed concurrently")
+    await on_order_status_changed(current_user.restaurant_id, order_before, data.status, now)
+    await append_order_events(current_user.restaurant_id, [order_status_event(order_id, data.status, now.isoformat())])
     return {"message": "Order status updated"}
 
+@api_router.get("/kitchen/prep-board")
+async def get_prep_board(since: Optional[int] = None, current_user: User = Depends(get_current_user)):
+    if current_user.role != "kitchen":
+        raise HTTPException(status_code=403, detail="Kitchen only")
+    
+    load = await get_kitchen_load(current_user.restaurant_id)
+    if since is not None:
+        deltas = load.board_deltas_since(since)
+        if deltas is not None:
+            return {"seq": load.board_seq, "deltas": deltas}
+    return {"seq": load.board_seq, "snapshot": load.board_snapshot()}
+
+@api_router.put("/kitchen/orders/status")
+async def bulk_update_order_status(data: BulkOrderStatusUpdate, current_user: User = Depends(get_current_user)):
+    if current_user.role != "kitchen":
+        raise HTTPException(status_code=403, detail="Kitchen only")
+    
+    results = await bulk_update_order_statuses(
+        current_user.restaurant_id, [(u.order_id, u.status) for u in data.updates]
+    )
+    return {"results": results, "updated": sum(1 for r in results if r["result"] == "updated")}
+
 @api_router.get("/cashier/orders", response_model=List[Order])
-async def get_cashier_orders(current_user: User = Depends(get_current_user)):
+async def get_cashier_orders(request: Request, response: Response, current_user: User = Depends(get_current_user)):
     if current_user.role != "cashier":
         raise HTTPException(status_code=403, detail="Cashier only")
     
-    orders = await db.orders.find(
-        {"restaurant_id": current_user.restaurant_id, "payment_method": "cash", "status": {"$ne": "completed"}},
-        {"_id": 0}
-    ).sort("created_at", 1).to_list(1000)
-    
-    for o in orders:
-        if isinstance(o.get('created_at'), str):
-            o['created_at'] = datetime.fromisoformat(o['created_at'])
-        if isinstance(o.get('updated_at'), str):
-            o['updated_at'] = datetime.fromisoformat(o['updated_at'])
-    return orders
+    not_modified = not_modified_response(request, order_list_version, current_user.restaurant_id, response)
+    if not_modified:
+        return not_modified
+    return await role_order_list("cashier", current_user.restaurant_id)
 
 @api_router.put("/cashier/orders/{order_id}/payment")
 async def update_order_payment(order_id: str, data: OrderPaymentUpdate, current_user: User = Depends(get_current_user)):
     if current_user.role != "cashier":
         raise HTTPException(status_code=403, detail="Cashier only")
     
-    update_fields = {"updated_at": datetime.now(timezone.utc).isoformat()}
+    now = datetime.now(timezone.utc)
+    update_fields = {"updated_at": now.isoformat()}
     if data.payment_status == "paid":
         update_fields["status"] = "completed"
+        update_fields["status_history.completed"] = now.isoformat()
     
-    await db.orders.update_one(
+    order_before = await db.orders.find_one_and_update(
         {"id": order_id, "restaurant_id": current_user.restaurant_id},
-        {"$set": update_fields}
+        {"$set": update_fields},
+        projection=ORDER_TRANSITION_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
+    if order_before and "status" in update_fields:
+        await on_order_status_changed(current_user.restaurant_id, order_before, update_fields["status"], now)
+    if order_before:
+        await append_order_events(current_user.restaurant_id, [
+            order_status_event(order_id, update_fields.get("status"), now.isoformat(), {"payment_status": data.payment_status})
+        ])
     return {"message": "Payment updated"}
 
+@api_router.put("/cashier/orders/payment")
+async def bulk_update_order_payment(data: BulkOrderPaymentUpdate, current_user: User = Depends(get_current_user)):
+    if current_user.role != "cashier":
+        raise HTTPException(status_code=403, detail="Cashier only")
+    
+    # Tekli uçla aynı: yalnızca "paid" siparişi tamamlar, diğer durumlar bir şey değiştirmez
+    paid = [(u.order_id, "completed") for u in data.updates if u.payment_status == "paid"]
+    processed = iter(await bulk_update_order_statuses(current_user.restaurant_id, paid, event_fields={"payment_status": "paid"}))
+    # Sonuçlar istekteki sırayla döner; işlenenler de kendi sıralarını koruduğu için araya yerleştirilir
+    results = [
+        next(processed) if u.payment_status == "paid" else {"order_id": u.order_id, "result": "skipped"}
+        for u in data.updates
+    ]
+    return {"results": results, "updated": sum(1 for r in results if r["result"] == "updated")}
+
+async def load_public_menu(restaurant_id: str):
+    return await asyncio.gather(
+        db.menu_categories.find({"restaurant_id": restaurant_id}, {"_id": 0}).sort("order", 1).to_list(1000),
+        db.menu_items.find({"restaurant_id": restaurant_id, "available": True}, {"_id": 0}).to_list(1000),
+    )
+
 @api_router.get("/public/menu/{table_id}")
 async def get_menu_by_table(table_id: str):
-    table = await db.tables.find_one({"id": table_id}, {"_id": 0})
+    table = await table_cache.get(table_id, lambda: table_loader.load(table_id))
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
     
-    restaurant = await db.restaurants.find_one({"id": table["restaurant_id"]}, {"_id": 0})
+    restaurant_id = table["restaurant_id"]
+    restaurant = await restaurant_cache.get(restaurant_id, lambda: restaurant_loader.load(restaurant_id))
     if not restaurant:
         raise HTTPException(status_code=404, detail="Restaurant not found")
     
-    categories = await db.menu_categories.find(
-        {"restaurant_id": table["restaurant_id"]}, {"_id": 0}
-    ).sort("order", 1).to_list(1000)
-    
-    items = await db.menu_items.find(
-        {"restaurant_id": table["restaurant_id"], "available": True}, {"_id": 0}
-    ).to_list(1000)
+    categories, items = await menu_cache.get(
+        restaurant_id, lambda: menu_flight.do(restaurant_id, lambda: load_public_menu(restaurant_id))
+    )
     
     return {
         "restaurant": restaurant,
@@ -905,13 +3150,36 @@ async def get_menu_by_table(table_id: str):
         "items": items
     }
 
+@api_router.get("/public/menu/{table_id}/stream")
+async def stream_menu_changes(table_id: str, request: Request):
+    table = await table_cache.get(table_id, lambda: table_loader.load(table_id))
+    if not table:
+        raise HTTPException(status_code=404, detail="Table not found")
+    
+    return menu_events.stream(table["restaurant_id"], request)
+
+async def unavailable_order_items(restaurant_id: str, order_items: List[OrderItem]) -> List[str]:
+    _, items = await menu_cache.get(
+        restaurant_id, lambda: menu_flight.do(restaurant_id, lambda: load_public_menu(restaurant_id))
+    )
+    available = {item["id"] for item in items}
+    return [item.menu_item_id for item in order_items if item.menu_item_id not in available]
+
 @api_router.post("/orders", response_model=Order)
 async def create_order(data: OrderCreate):
-    table = await db.tables.find_one({"id": data.table_id}, {"_id": 0})
+    table = await table_cache.get(data.table_id, lambda: table_loader.load(data.table_id))
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
     
-    max_prep_time = max([item.preparation_time_minutes for item in data.items], default=15)
+    unavailable = await unavailable_order_items(table["restaurant_id"], data.items)
+    if unavailable:
+        raise HTTPException(status_code=409, detail={
+            "message": "Some items are no longer available",
+            "unavailable_items": unavailable
+        })
+    
+    max_prep_time = order_prep_minutes(data.items)
+    kitchen_load = await get_kitchen_load(table["restaurant_id"])
     
     order = Order(
         restaurant_id=table["restaurant_id"],
@@ -921,18 +3189,31 @@ async def create_order(data: OrderCreate):
         total_amount=sum(item.price * item.quantity for item in data.items),
         payment_method=data.payment_method,
         status="pending",
-        estimated_completion_minutes=max_prep_time
+        estimated_completion_minutes=kitchen_load.estimate(max_prep_time)
     )
+    order.status_history = {"pending": order.created_at}
     
     doc = order.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     doc['updated_at'] = doc['updated_at'].isoformat()
+    doc['status_history'] = {"pending": doc['created_at']}
     await db.orders.insert_one(doc)
+    kitchen_load.add(order.id, max_prep_time, created_at=order.created_at.timestamp(), items=prep_board_items(order.items))
+    await record_item_sales(order)
+    doc.pop("_id", None)
+    await append_order_events(order.restaurant_id, [{"type": "created", "order_id": order.id, "order": doc}])
     
     return order
 
 @api_router.post("/reviews", response_model=Review)
 async def create_review(data: ReviewCreate):
+    if data.rating not in REVIEW_RATINGS:
+        raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
+    
+    restaurant = await db.restaurants.find_one({"id": data.restaurant_id}, {"_id": 0, "id": 1})
+    if not restaurant:
+        raise HTTPException(status_code=404, detail="Restaurant not found")
+    
     review = Review(
         restaurant_id=data.restaurant_id,
         order_id=data.order_id,
@@ -943,27 +3224,75 @@ async def create_review(data: ReviewCreate):
     doc = review.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.reviews.insert_one(doc)
+    await db.review_stats.update_one(
+        {"restaurant_id": review.restaurant_id},
+        {"$inc": {"count": 1, "sum": review.rating, f"histogram.{review.rating}": 1}},
+        upsert=True
+    )
     
     return review
 
+# Aynı masadan gelen tekrar çağrılar tek açık kayıtta birleştirilir (call_count / last_called_at)
+WAITER_CALL_COALESCE = os.environ.get("WAITER_CALL_COALESCE", "true").lower() == "true"
+
 @api_router.post("/waiter-call", response_model=WaiterCall)
 async def call_waiter(data: WaiterCallCreate):
-    table = await db.tables.find_one({"id": data.table_id}, {"_id": 0})
+    table = await table_cache.get(data.table_id, lambda: table_loader.load(data.table_id))
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
     
-    waiter_call = WaiterCall(
-        restaurant_id=table["restaurant_id"],
-        table_id=data.table_id,
-        table_number=table["table_number"],
-        status="pending"
-    )
+    if not WAITER_CALL_COALESCE:
+        waiter_call = WaiterCall(
+            restaurant_id=table["restaurant_id"],
+            table_id=data.table_id,
+            table_number=table["table_number"],
+            status="pending"
+        )
+        
+        doc = waiter_call.model_dump()
+        doc['created_at'] = doc['created_at'].isoformat()
+        doc['last_called_at'] = doc['last_called_at'].isoformat()
+        try:
+            await db.waiter_calls.insert_one(doc)
+        except DuplicateKeyError:
+            # Birleştirme açıkken kurulmuş one_open_call_per_table index'i hâlâ duruyor: açık kayda eklenir
+            doc = None
+        if doc is not None:
+            doc.pop("_id", None)
+            await invalidate_cache("waiter_calls", table["restaurant_id"])
+            waiter_call_events.publish(table["restaurant_id"], "waiter_call", doc)
+            return waiter_call
     
-    doc = waiter_call.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.waiter_calls.insert_one(doc)
+    now = datetime.now(timezone.utc).isoformat()
+    open_call_filter = {"restaurant_id": table["restaurant_id"], "table_id": data.table_id, "status": "pending"}
+    update = {
+        "$inc": {"call_count": 1},
+        "$set": {"last_called_at": now},
+        "$setOnInsert": {
+            "id": str(uuid.uuid4()),
+            "table_number": table["table_number"],
+            "created_at": now
+        }
+    }
+    try:
+        doc = await db.waiter_calls.find_one_and_update(
+            open_call_filter, update, projection={"_id": 0},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Eşzamanlı ilk dokunuşlardan biri kaydı açtı; diğeri onu günceller
+        doc = await db.waiter_calls.find_one_and_update(
+            open_call_filter, update, projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    await invalidate_cache("waiter_calls", table["restaurant_id"])
+    waiter_call_events.publish(table["restaurant_id"], "waiter_call", doc)
     
-    return waiter_call
+    for field in ('created_at', 'last_called_at'):
+        if isinstance(doc.get(field), str):
+            doc[field] = datetime.fromisoformat(doc[field])
+    return WaiterCall(**doc)
 
 @api_router.get("/admin/reviews", response_model=List[Review])
 async def get_all_reviews(current_user: User = Depends(get_current_user)):
@@ -977,11 +3306,37 @@ async def get_all_reviews(current_user: User = Depends(get_current_user)):
             r['created_at'] = datetime.fromisoformat(r['created_at'])
     return reviews
 
+@api_router.get("/owner/reviews")
+async def get_owner_reviews(limit: int = REVIEW_PAGE_SIZE, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    return await review_feed(current_user.restaurant_id, limit, cursor)
+
+@api_router.get("/owner/reviews/summary")
+async def get_owner_review_summary(current_user: User = Depends(get_current_user)):
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    stats = await db.review_stats.find_one({"restaurant_id": current_user.restaurant_id}, {"_id": 0})
+    return rating_summary(stats)
+
+@api_router.get("/admin/restaurants/{restaurant_id}/reviews")
+async def get_restaurant_reviews(restaurant_id: str, limit: int = REVIEW_PAGE_SIZE, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return await review_feed(restaurant_id, limit, cursor)
+
 @api_router.get("/owner/waiter-calls")
-async def get_waiter_calls(current_user: User = Depends(get_current_user)):
+async def get_waiter_calls(request: Request, response: Response, current_user: User = Depends(get_current_user)):
     if current_user.role != "owner":
         raise HTTPException(status_code=403, detail="Owner only")
     
+    not_modified = not_modified_response(request, waiter_call_list_version, current_user.restaurant_id, response)
+    if not_modified:
+        return not_modified
+    
     calls = await db.waiter_calls.find(
         {"restaurant_id": current_user.restaurant_id, "status": "pending"},
         {"_id": 0}
@@ -990,22 +3345,567 @@ async def get_waiter_calls(current_user: User = Depends(get_current_user)):
     for c in calls:
         if isinstance(c.get('created_at'), str):
             c['created_at'] = datetime.fromisoformat(c['created_at'])
+        if isinstance(c.get('last_called_at'), str):
+            c['last_called_at'] = datetime.fromisoformat(c['last_called_at'])
     return calls
 
+@api_router.get("/owner/waiter-calls/stream")
+async def stream_waiter_calls(request: Request, token: str):
+    # EventSource header gönderemediği için token query parametresiyle gelir
+    current_user = await get_user_from_token(token)
+    if current_user.role != "owner":
+        raise HTTPException(status_code=403, detail="Owner only")
+    
+    return sse_response(waiter_call_events, current_user.restaurant_id, request)
+
 @api_router.put("/owner/waiter-calls/{call_id}")
 async def resolve_waiter_call(call_id: str, current_user: User = Depends(get_current_user)):
     if current_user.role != "owner":
         raise HTTPException(status_code=403, detail="Owner only")
     
-    await db.waiter_calls.update_one(
-        {"id": call_id, "restaurant_id": current_user.restaurant_id},
-        {"$set": {"status": "resolved"}}
+    result = await db.waiter_calls.update_one(
+        {"id": call_id, "restaurant_id": current_user.restaurant_id, "status": "pending"},
+        {"$set": {"status": "resolved", "resolved_at": datetime.now(timezone.utc)}}
     )
+    if result.modified_count:
+        await invalidate_cache("waiter_calls", current_user.restaurant_id)
+        waiter_call_events.publish(current_user.restaurant_id, "waiter_call_resolved", {"id": call_id})
     return {"message": "Waiter call resolved"}
 
+# -----------------------------
+# EVENT LOOP GECİKMESİ VE ROTA METRİKLERİ
+# Loop'ta her LOOP_LAG_INTERVAL_SECONDS'ta bir uyanan örnekleyici, planlanandan ne kadar
+# geç uyandığını gecikme (lag) taslağına yazar; bcrypt, PIL ya da büyük senkron döngüler
+# loop'u tuttukça bu değer büyür. LOOP_DEBUG=1 iken ayrı bir bekçi thread'i örnekleyicinin
+# kalp atışını izler: atış LOOP_BLOCK_THRESHOLD_MS'den uzun gecikirse loop thread'inin o
+# anki yığını sys._current_frames() ile alınır ve loglanır. Rota başına süreler aynı
+# taslakla tutulur; ikisi de /admin/metrics'te yan yana döner.
+# -----------------------------
+LOOP_LAG_INTERVAL_SECONDS = 0.05
+LOOP_DEBUG = os.environ.get("LOOP_DEBUG", "0") == "1"
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_BLOCK_HISTORY = 20
+# Kabul kontrolü tek bir tıkanmaya değil bu penceredeki örneklere bakar
+LOOP_LAG_WINDOW_SECONDS = 10.0
+
+class LoopMonitor:
+    def __init__(self):
+        self.lag = LatencySketch()
+        self.ewma_ms = 0.0
+        self.max_ms = 0.0
+        self.heartbeat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.blocked: deque = deque(maxlen=LOOP_BLOCK_HISTORY)
+        self.recent: deque = deque()
+        self.watchdog: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+
+    def record(self, lag_ms: float, at: Optional[float] = None):
+        at = time.monotonic() if at is None else at
+        self.lag.add(lag_ms)
+        self.ewma_ms += 0.3 * (lag_ms - self.ewma_ms)
+        self.max_ms = max(self.max_ms, lag_ms)
+        self.recent.append((at, lag_ms))
+        while at - self.recent[0][0] > LOOP_LAG_WINDOW_SECONDS:
+            self.recent.popleft()
+
+    def sustained_lag(self, threshold_ms: float, window_seconds: float, min_seconds: float, quantile: float) -> bool:
+        """Penceredeki örneklerin `quantile` yüzdeliği eşiği aşıyor ve eşik üstü ilk örnek en az min_seconds önceyse True."""
+        now = time.monotonic()
+        samples = [(at, lag) for at, lag in self.recent if now - at <= window_seconds]
+        if not samples:
+            return False
+        lags = sorted(lag for _, lag in samples)
+        if lags[min(len(lags) - 1, int(quantile * len(lags)))] < threshold_ms:
+            return False
+        first_over = next(at for at, lag in samples if lag >= threshold_ms)
+        return now - first_over >= min_seconds
+
+    async def sample(self):
+        self.loop_thread_id = threading.get_ident()
+        while True:
+            self.heartbeat = started = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+            self.record(max(0.0, (time.monotonic() - started - LOOP_LAG_INTERVAL_SECONDS) * 1000))
+
+    def start_watchdog(self, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS):
+        self.stopping.clear()
+        self.watchdog = threading.Thread(target=self.watch, args=(threshold_ms,), name="loop-watchdog", daemon=True)
+        self.watchdog.start()
+
+    def stop_watchdog(self):
+        self.stopping.set()
+
+    def watch(self, threshold_ms: float):
+        # Aynı tıkanma için yığın bir kez alınır; süre atış geri gelene kadar güncellenir
+        reported_beat = None
+        while not self.stopping.wait(threshold_ms / 4000):
+            beat = self.heartbeat
+            blocked_ms = (time.monotonic() - beat) * 1000 - LOOP_LAG_INTERVAL_SECONDS * 1000
+            if blocked_ms < threshold_ms or self.loop_thread_id is None:
+                continue
+            if beat == reported_beat:
+                self.blocked[-1]["blocked_ms"] = round(blocked_ms, 1)
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            self.blocked.append({"at": datetime.now(timezone.utc).isoformat(), "blocked_ms": round(blocked_ms, 1), "stack": stack})
+            reported_beat = beat
+            print(f"🐢 Event loop {blocked_ms:.0f} ms'dir bloklu:\n{stack}")
+
+    def snapshot(self) -> dict:
+        return {
+            "lag": self.lag.summary("ms"),
+            "ewma_ms": round(self.ewma_ms, 2),
+            "max_ms": round(self.max_ms, 1),
+            "debug": self.watchdog is not None and self.watchdog.is_alive(),
+            "blocked": list(self.blocked),
+        }
+
+loop_monitor = LoopMonitor()
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    background_tasks.add(asyncio.create_task(loop_monitor.sample()))
+    if LOOP_DEBUG:
+        loop_monitor.start_watchdog()
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency: Dict[str, LatencySketch] = defaultdict(LatencySketch)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, elapsed_ms: float, status_code: int):
+        self.latency[route].add(elapsed_ms)
+        if status_code >= 500:
+            self.errors[route] += 1
+
+    def snapshot(self) -> dict:
+        return {route: {**sketch.summary("ms"), "errors": self.errors[route]} for route, sketch in sorted(self.latency.items())}
+
+route_metrics = RouteMetrics()
+
+class RouteMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or admission_tier(scope["method"], scope["path"], scope.get("query_string", b"")) is None:
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+
+        async def tracked_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, tracked_send)
+        finally:
+            # Rota eşleşmesi scope'a yazılır; eşleşmeyen (404, yük atılan 503) istekler tek anahtarda toplanır
+            route = scope.get("route")
+            key = f"{scope['method']} {route.path}" if route is not None else "unmatched"
+            route_metrics.record(key, (time.perf_counter() - started) * 1000, status_code)
+
+# -----------------------------
+# KABUL KONTROLÜ / ÖNCELİKLİ YÜK ATMA
+# Her istek yoluna göre bir öncelik katmanına girer. "critical" (sipariş, misafir menüsü,
+# garson çağrısı, giriş, mutfak/kasa durum güncellemeleri) hiçbir zaman bekletilmez.
+# "normal" ve "analytics" katmanlarının eşzamanlı istek sayısı hem katman hem restoran
+# başına sınırlanır; sınır doluysa istek kısa bir süre FIFO sırada bekler, süre dolarsa
+# 503 + Retry-After ile reddedilir. Baskı altındayken (kritik katmanda uçuştaki istek sayısı
+# eşiği aştığında, kritik isteklerin kayan ortalama süresi ya da event loop gecikmesi
+# sürekli olarak hedefi geçtiğinde) analitik
+# istekler boş yer olsa bile hiç beklemeden atılır, böylece ağır taramalar sipariş
+# gecikmesini büyütmez.
+# -----------------------------
+ADMISSION_TIER_LIMITS = {
+    "normal": int(os.environ.get("ADMISSION_NORMAL_LIMIT", "64")),
+    "analytics": int(os.environ.get("ADMISSION_ANALYTICS_LIMIT", "4")),
+}
+ADMISSION_MAX_WAITERS = {"normal": 256, "analytics": 16}
+ADMISSION_RESTAURANT_LIMIT = int(os.environ.get("ADMISSION_RESTAURANT_LIMIT", "8"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+ADMISSION_PRESSURE_THRESHOLD = int(os.environ.get("ADMISSION_PRESSURE_THRESHOLD", "32"))
+ADMISSION_TARGET_LATENCY_MS = float(os.environ.get("ADMISSION_TARGET_LATENCY_MS", "250"))
+# Bu süre boyunca kritik istek bitmediyse eski ortalama baskı sayılmaz
+ADMISSION_LATENCY_STALE_SECONDS = 1.0
+# Senkron işler (bcrypt, PIL, büyük toplamlar) loop'u tuttuğunda bekleyen istekler henüz
+# middleware'e bile ulaşmaz; bu baskıyı yalnızca loop gecikmesi (loop_monitor) gösterir.
+# Tek bir giriş ya da QR çizimi de loop'u kısa süre tutar; bu yüzden yalnızca süreklilik
+# sayılır: son ADMISSION_LOOP_LAG_WINDOW_SECONDS içindeki örneklerin p90'ı hedefi geçmeli ve
+# hedef üstü gecikme en az ADMISSION_LOOP_LAG_MIN_SECONDS sürmüş olmalı.
+ADMISSION_TARGET_LOOP_LAG_MS = float(os.environ.get("ADMISSION_TARGET_LOOP_LAG_MS", "100"))
+ADMISSION_LOOP_LAG_WINDOW_SECONDS = float(os.environ.get("ADMISSION_LOOP_LAG_WINDOW_SECONDS", "5"))
+ADMISSION_LOOP_LAG_MIN_SECONDS = float(os.environ.get("ADMISSION_LOOP_LAG_MIN_SECONDS", "2"))
+ADMISSION_LOOP_LAG_QUANTILE = 0.9
+ADMISSION_RETRY_AFTER_SECONDS = 5
+ADMISSION_TIERS = ("critical", "normal", "analytics")
+# Sıra önemli: ilk eşleşen kural kazanır; eşleşmeyen /api istekleri "normal"dır
+ADMISSION_RULES = [
+    (None, re.compile(r"^/api/admin/(analytics|stats|users|orders|reviews)$"), "analytics"),
+    (None, re.compile(r"^/api/owner/(stats|popular-items|kitchen-latency|menu/export|reviews/summary)$"), "analytics"),
+    ("POST", re.compile(r"^/api/(orders|waiter-call|reviews|auth/login)$"), "critical"),
+    ("GET", re.compile(r"^/api/public/menu/[^/]+$"), "critical"),
+    ("PUT", re.compile(r"^/api/(kitchen|cashier)/orders/"), "critical"),
+]
+
+# Panel her sekmeyi (menü, masalar, siparişler) bu uçtan yükler; yalnızca istatistik isteyen çağrı analitiktir
+DASHBOARD_ANALYTICS_SECTIONS = ("stats",)
+
+def dashboard_tier(query_string: bytes) -> str:
+    sections = None
+    for key, value in parse_qsl(query_string.decode("latin-1")):
+        if key == "sections":
+            sections = [x.strip() for x in value.split(",")]
+    # sections verilmezse tüm bölümler, istatistik dahil, döner
+    if sections is None or any(x in DASHBOARD_ANALYTICS_SECTIONS for x in sections):
+        return "analytics"
+    return "normal"
+
+def admission_tier(method: str, path: str, query_string: bytes = b"") -> Optional[str]:
+    # SSE akışları saatlerce açık kalır, sınırlara sayılmaz
+    if not path.startswith("/api/") or path.endswith("/stream"):
+        return None
+    if path == "/api/owner/dashboard":
+        return dashboard_tier(query_string)
+    for rule_method, pattern, tier in ADMISSION_RULES:
+        if (rule_method is None or rule_method == method) and pattern.match(path):
+            return tier
+    return "normal"
+
+class AdmissionGate:
+    """Eşzamanlılık sınırı; boşalan yer doğrudan sıradaki bekleyene devredilir."""
+
+    def __init__(self, limit: int, max_waiters: int):
+        self.limit = limit
+        self.max_waiters = max_waiters
+        self.in_flight = 0
+        self.waiters: deque = deque()
+
+    @property
+    def idle(self) -> bool:
+        return self.in_flight == 0 and not self.waiters
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return True
+        if timeout <= 0 or len(self.waiters) >= self.max_waiters:
+            return False
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # Yer devredildikten hemen sonra iptal edildiyse yer bir sonrakine geçer
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                with contextlib.suppress(ValueError):
+                    self.waiters.remove(waiter)
+
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+
+class AdmissionController:
+    def __init__(self):
+        self.enabled = os.environ.get("ADMISSION_CONTROL", "1") != "0"
+        self.gates = {tier: AdmissionGate(limit, ADMISSION_MAX_WAITERS[tier]) for tier, limit in ADMISSION_TIER_LIMITS.items()}
+        self.restaurant_gates: Dict[str, AdmissionGate] = {}
+        self.in_flight = {tier: 0 for tier in ADMISSION_TIERS}
+        self.admitted = {tier: 0 for tier in ADMISSION_TIERS}
+        self.queued = {tier: 0 for tier in ADMISSION_TIERS}
+        self.shed = {tier: 0 for tier in ADMISSION_TIERS}
+        self.critical_latency_ms = 0.0
+        self.critical_finished_at = 0.0
+
+    @property
+    def under_pressure(self) -> bool:
+        if self.in_flight["critical"] >= ADMISSION_PRESSURE_THRESHOLD:
+            return True
+        if loop_monitor.sustained_lag(
+            ADMISSION_TARGET_LOOP_LAG_MS, ADMISSION_LOOP_LAG_WINDOW_SECONDS, ADMISSION_LOOP_LAG_MIN_SECONDS, ADMISSION_LOOP_LAG_QUANTILE
+        ):
+            return True
+        recent = time.monotonic() - self.critical_finished_at < ADMISSION_LATENCY_STALE_SECONDS
+        return recent and self.critical_latency_ms >= ADMISSION_TARGET_LATENCY_MS
+
+    def restaurant_gate(self, restaurant_id: str) -> AdmissionGate:
+        gate = self.restaurant_gates.get(restaurant_id)
+        if gate is None:
+            gate = self.restaurant_gates[restaurant_id] = AdmissionGate(ADMISSION_RESTAURANT_LIMIT, ADMISSION_MAX_WAITERS["normal"])
+        return gate
+
+    def release_restaurant(self, restaurant_id: str):
+        gate = self.restaurant_gates[restaurant_id]
+        gate.release()
+        if gate.idle:
+            del self.restaurant_gates[restaurant_id]
+
+    async def admit(self, tier: str, restaurant_id: Optional[str]) -> bool:
+        if tier == "critical":
+            self.admitted[tier] += 1
+            self.in_flight[tier] += 1
+            return True
+        
+        if tier == "analytics" and self.under_pressure:
+            self.shed[tier] += 1
+            return False
+        
+        timeout = ADMISSION_QUEUE_TIMEOUT_SECONDS
+        gate = self.gates[tier]
+        restaurant_gate = self.restaurant_gate(restaurant_id) if restaurant_id else None
+        if gate.in_flight >= gate.limit or (restaurant_gate and restaurant_gate.in_flight >= restaurant_gate.limit):
+            self.queued[tier] += 1
+        
+        if restaurant_gate is not None and not await restaurant_gate.acquire(timeout):
+            if restaurant_gate.idle:
+                self.restaurant_gates.pop(restaurant_id, None)
+            self.shed[tier] += 1
+            return False
+        admitted = await gate.acquire(timeout)
+        # Sırada beklerken baskı oluştuysa yer bırakılır
+        if admitted and tier == "analytics" and self.under_pressure:
+            gate.release()
+            admitted = False
+        if not admitted:
+            if restaurant_id:
+                self.release_restaurant(restaurant_id)
+            self.shed[tier] += 1
+            return False
+        
+        self.admitted[tier] += 1
+        self.in_flight[tier] += 1
+        return True
+
+    def release(self, tier: str, restaurant_id: Optional[str], elapsed_ms: float = 0.0):
+        self.in_flight[tier] -= 1
+        if tier == "critical":
+            self.critical_latency_ms += 0.2 * (elapsed_ms - self.critical_latency_ms)
+            self.critical_finished_at = time.monotonic()
+            return
+        self.gates[tier].release()
+        if restaurant_id:
+            self.release_restaurant(restaurant_id)
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "restaurants": len(self.restaurant_gates),
+            "under_pressure": self.under_pressure,
+            "critical_latency_ms": round(self.critical_latency_ms, 2),
+            "tiers": {tier: {
+                "in_flight": self.in_flight[tier],
+                "admitted": self.admitted[tier],
+                "queued": self.queued[tier],
+                "shed": self.shed[tier],
+            } for tier in ADMISSION_TIERS},
+        }
+
+admission = AdmissionController()
+
+async def token_restaurant_id(headers: Headers) -> Optional[str]:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if "rid" in payload or not payload.get("sub"):
+        return payload.get("rid")
+    # rid claim'inden önce verilmiş token'lar: restoran kullanıcıdan bulunur. Handler'daki
+    # get_current_user aynı principal_cache kaydını kullanır, ek sorgu olmaz.
+    user_id = payload["sub"]
+    user = await principal_cache.get(user_id, lambda: load_principal(user_id))
+    return user.restaurant_id if user else None
+
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        tier = admission_tier(scope["method"], scope["path"], scope.get("query_string", b"")) if scope["type"] == "http" and admission.enabled else None
+        if tier is None:
+            await self.app(scope, receive, send)
+            return
+        
+        restaurant_id = None if tier == "critical" else await token_restaurant_id(Headers(scope=scope))
+        if not await admission.admit(tier, restaurant_id):
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(tier, restaurant_id, (time.perf_counter() - started) * 1000)
+
+# -----------------------------
+# İSTEK SÜRESİ SINIRI / İSTEMCİ KOPMASINDA İPTAL
+# Her /api isteği katmanına göre bir süre bütçesiyle pymongo.timeout() içinde çalışır;
+# pymongo bu kalan süreyi o istekteki her komuta maxTimeMS olarak yazar (okuma, yazma,
+# getMore, sunucu seçimi). Süre dolarsa Mongo sorguyu kendisi keser ve istek 504 döner.
+# GET isteklerinde istemci bağlantıyı kapatırsa handler görevi iptal edilir ve isteğin
+# açtığı cursor'lar kapatılır, terk edilen analitik taramalar veritabanını meşgul etmez.
+# Yazma istekleri yarıda kesilmez: sipariş eklenip olay günlüğü yazılmadan kalmamalı.
+# -----------------------------
+REQUEST_DEADLINE_SECONDS = {
+    "critical": float(os.environ.get("REQUEST_DEADLINE_CRITICAL_SECONDS", "5")),
+    "normal": float(os.environ.get("REQUEST_DEADLINE_SECONDS", "10")),
+    "analytics": float(os.environ.get("REQUEST_DEADLINE_ANALYTICS_SECONDS", "30")),
+}
+CANCELLABLE_METHODS = ("GET", "HEAD")
+
+class DeadlineStats:
+    def __init__(self):
+        self.timeouts = 0
+        self.disconnects = 0
+        self.cursors_closed = 0
+
+    def snapshot(self) -> dict:
+        return {"timeouts": self.timeouts, "disconnects": self.disconnects, "cursors_closed": self.cursors_closed}
+
+deadline_stats = DeadlineStats()
+
+async def close_cursors(cursors: list):
+    for cursor in cursors:
+        with contextlib.suppress(Exception):
+            await cursor.close()
+            deadline_stats.cursors_closed += 1
+
+@app.exception_handler(PyMongoError)
+async def mongo_timeout_handler(request: Request, exc: PyMongoError):
+    if not exc.timeout:
+        raise exc
+    deadline_stats.timeouts += 1
+    return JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)
+
+class RequestDeadlineMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        tier = admission_tier(scope["method"], scope["path"], scope.get("query_string", b"")) if scope["type"] == "http" else None
+        if tier is None:
+            await self.app(scope, receive, send)
+            return
+        
+        cursors = []
+        token = request_cursors.set(cursors)
+        try:
+            with operation_timeout(REQUEST_DEADLINE_SECONDS[tier]):
+                if scope["method"] in CANCELLABLE_METHODS:
+                    await self.run_cancellable(scope, receive, send, cursors)
+                else:
+                    await self.app(scope, receive, send)
+        finally:
+            request_cursors.reset(token)
+
+    async def run_cancellable(self, scope, receive, send, cursors: list):
+        response_complete = False
+        disconnected = False
+
+        async def tracked_send(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        # Görev oluşturulurken bağlam (süre sınırı, cursor listesi) kopyalanır
+        handler = asyncio.ensure_future(self.app(scope, receive, tracked_send))
+
+        async def watch_disconnect():
+            nonlocal disconnected
+            # GET gövdesi boştur; ilk mesajdan sonra receive yanıt bitene ya da istemci kopana kadar bekler
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            if not response_complete:
+                disconnected = True
+                handler.cancel()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            deadline_stats.disconnects += 1
+            await close_cursors(cursors)
+        finally:
+            watcher.cancel()
+
+class RequestProfileMiddleware:
+    """Yalnızca PROFILE_SECRET tanımlıysa eklenir; doğru X-Profile başlığı taşıyan isteği cProfile ile çalıştırır."""
+
+    def __init__(self, app):
+        self.app = app
+        self.active = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        secret = Headers(scope=scope).get("x-profile")
+        # sys.setprofile thread başınadır; aynı anda ikinci bir profil açılamaz
+        # Başlık latin-1 olarak çözülmüştür; ASCII dışı değerde str karşılaştırması TypeError verir
+        if not secret or not hmac.compare_digest(secret.encode("latin-1"), PROFILE_SECRET.encode()) or not self.active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        
+        profile_id = uuid.uuid4().hex[:12]
+
+        async def tagged_send(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, tagged_send)
+        finally:
+            profiler.disable()
+            self.active.release()
+            output = io.StringIO()
+            output.write(f"{scope['method']} {scope['path']}\n\n")
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(60)
+            request_profiles[profile_id] = output.getvalue()
+            while len(request_profiles) > PROFILE_REQUEST_HISTORY:
+                request_profiles.pop(next(iter(request_profiles)))
+
 # -----------------------------
 # MIDDLEWARE EKLE (API ROUTER'DAN SONRA)
 # -----------------------------
+# Son eklenen en dıştadır: CORS > rota metrikleri > kabul kontrolü > süre sınırı > istek
+# profili (varsa). 503/504
+# yanıtları da CORS başlıklarını taşır; rota süreleri kabul kuyruğunda beklemeyi içerir,
+# süre bütçesi istek sıradan çıktıktan sonra başlar.
+if PROFILE_SECRET:
+    app.add_middleware(RequestProfileMiddleware)
+app.add_middleware(RequestDeadlineMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(RouteMetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1026,22 +3926,133 @@ frontend_path = Path("frontend/build")
 
 # -----------------------------
 # STATIC DOSYALAR (JS, CSS vs.) - ÖNCE BUNLARI EKLE
+# Build sırasında üretilen .br/.gz kardeş dosyaları varsa onlar sunulur;
+# isminde içerik hash'i olan dosyalar (main.3f2a1b9c.js) kalıcı önbelleğe alınır.
 # -----------------------------
+STATIC_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+def accepted_encodings(headers: Headers) -> Set[str]:
+    encodings = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.add(name.lower())
+    return encodings
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Build dosyaları çalışma sırasında değişmez; bulunan dosyaların stat'ı tutulur. Bulunamayan
+        # .br/.gz kardeşleri de hatırlanır; asıl yol ise (yeni yüklenen menü görselleri) her seferinde aranır.
+        self._found = {}
+
+    def _lookup_existing(self, path: str, remember_missing: bool = False):
+        if path not in self._found:
+            full_path, stat_result = self.lookup_path(path)
+            if not (stat_result and stat.S_ISREG(stat_result.st_mode)):
+                if not remember_missing:
+                    return None, None
+                full_path, stat_result = None, None
+            self._found[path] = (full_path, stat_result)
+        return self._found[path]
+
+    async def get_response(self, path: str, scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        
+        full_path, stat_result = self._lookup_existing(path)
+        if full_path is None:
+            return await super().get_response(path, scope)
+        
+        request_headers = Headers(scope=scope)
+        headers = {
+            "Vary": "Accept-Encoding",
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if HASHED_ASSET_RE.search(path) else REVALIDATE_CACHE_CONTROL,
+        }
+        accepted = accepted_encodings(request_headers)
+        for encoding, suffix in STATIC_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            encoded_path, encoded_stat = self._lookup_existing(path + suffix, remember_missing=True)
+            if encoded_path is not None:
+                full_path, stat_result = encoded_path, encoded_stat
+                headers["Content-Encoding"] = encoding
+                break
+        
+        response = FileResponse(
+            full_path,
+            stat_result=stat_result,
+            media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+            headers=headers,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
 if (frontend_path / "static").exists():
     app.mount(
         "/static",
-        StaticFiles(directory=frontend_path / "static"),
+        PrecompressedStaticFiles(directory=frontend_path / "static"),
         name="static",
     )
 
+# Menü görselleri: dosya adları içerik hash'i taşır, PrecompressedStaticFiles kalıcı önbellek başlığı verir
+if isinstance(image_store, LocalImageStore):
+    app.mount("/media", PrecompressedStaticFiles(directory=image_store.directory), name="media")
+
+# -----------------------------
+# REACT INDEX (BELLEKTE + ETAG)
+# index.html her deploy'da bir kez okunur; dönen misafirin sayfa yüklemesi tek bir 304'tür.
+# -----------------------------
+class CachedIndexHtml:
+    def __init__(self, path: Path):
+        self.path = path
+        self.etag = None
+        self.variants = None
+
+    def load(self) -> bool:
+        if self.variants is not None:
+            return True
+        if not self.path.exists():
+            return False
+        
+        body = self.path.read_bytes()
+        variants = {"identity": body}
+        for encoding, suffix in STATIC_ENCODINGS:
+            encoded_file = self.path.with_name(self.path.name + suffix)
+            if encoded_file.exists():
+                variants[encoding] = encoded_file.read_bytes()
+        variants.setdefault("gzip", gzip.compress(body, compresslevel=9))
+        
+        self.etag = f'W/"{hashlib.sha256(body).hexdigest()[:20]}"'
+        self.variants = variants
+        return True
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": REVALIDATE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if self.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+        
+        accepted = accepted_encodings(request.headers)
+        for encoding, _ in STATIC_ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                headers["Content-Encoding"] = encoding
+                return Response(self.variants[encoding], media_type="text/html", headers=headers)
+        return Response(self.variants["identity"], media_type="text/html", headers=headers)
+
+index_html = CachedIndexHtml(frontend_path / "index.html")
+
 # -----------------------------
 # REACT INDEX SERVE (ANA SAYFA)
 # -----------------------------
 @app.get("/")
-async def serve_root():
-    index_file = frontend_path / "index.html"
-    if index_file.exists():
-        return FileResponse(index_file)
+async def serve_root(request: Request):
+    if index_html.load():
+        return index_html.response(request)
     raise HTTPException(status_code=404, detail="React build bulunamadı")
 
 # -----------------------------
@@ -1049,19 +4060,18 @@ async def serve_root():
 # /login, /admin, /owner vb. tüm route'lar için
 # -----------------------------
 @app.get("/{full_path:path}")
-async def serve_react_app(full_path: str):
+async def serve_react_app(full_path: str, request: Request):
     # API endpointlerine dokunma
     if full_path.startswith("api/"):
         raise HTTPException(status_code=404, detail="API route not found")
     
     # Static dosyalara dokunma  
-    if full_path.startswith("static/"):
+    if full_path.startswith(("static/", "media/")):
         raise HTTPException(status_code=404, detail="Static file not found")
 
     # Tüm diğer route'ları React'e yönlendir
-    index_file = frontend_path / "index.html"
-    if index_file.exists():
-        return FileResponse(index_file)
+    if index_html.load():
+        return index_html.response(request)
 
     raise HTTPException(status_code=404, detail="Sayfa bulunamadı")
 
@@ -1079,4 +4089,12 @@ logger = logging.getLogger(__name__)
 # -----------------------------
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    for task in background_tasks:
+        task.cancel()
+    loop_monitor.stop_watchdog()
+    if image_executor is not None:
+        image_executor.shutdown(wait=False, cancel_futures=True)
+    if client is not None:
+        client.close()
+    else:
+        db.database.close()
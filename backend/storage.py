@@ -0,0 +1,1029 @@
+"""Mongo'suz çalışmak için yerel depolar: bellek içi ve SQLite.
+
+Handler'lar Motor koleksiyon API'sinin küçük bir alt kümesini kullanır (find/find_one,
+insert/update/delete, find_one_and_update, bulk_write, count_documents, basit aggregate).
+Sunucudaki STORAGE_BACKEND bu alt kümeyi sağlayan depoyu seçer:
+  mongo  - Motor (varsayılan, bu modül kullanılmaz)
+  memory - tek süreçlik, index'li bellek içi depo: testler, benchmark'lar, Mongo'suz geliştirme
+  sqlite - küçük tek kutu kurulumlar için dosya tabanlı depo (SQLITE_PATH)
+
+Sorgu eşleme, projeksiyon, güncelleme operatörleri, sıralama ve aggregate iki yerel depoda
+ortaktır. Değerler BSON gibi saklanır: datetime'lar saat dilimsiz UTC'ye çevrilip
+milisaniyeye kırpılır, eklenen dokümana _id yazılır. Desteklenmeyen bir operatör sessizce
+yanlış sonuç vermez, NotImplementedError fırlatır. Change stream yoktur; önbellek
+geçersizleştirme sürüm yoklamaya düşer.
+"""
+import asyncio
+import itertools
+import json
+import math
+import operator
+import re
+import sqlite3
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+STORAGE_TTL_SWEEP_SECONDS = 60
+
+MISSING = object()
+UNINDEXABLE = object()
+
+def bson_value(value):
+    if isinstance(value, dict):
+        return {key: bson_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [bson_value(item) for item in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+def clone_value(value):
+    if isinstance(value, dict):
+        return {key: clone_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone_value(item) for item in value]
+    return value
+
+def field_value(doc: dict, path: str):
+    if "." not in path:
+        return doc.get(path, MISSING)
+    value = doc
+    parts = path.split(".")
+    for position, part in enumerate(parts):
+        if isinstance(value, list):
+            # Mongo gibi dizi elemanlarına iner: "items.quantity" tüm kalemlerin miktarlarıdır
+            rest = ".".join(parts[position:])
+            found = []
+            for item in value:
+                item_value = field_value(item, rest) if isinstance(item, dict) else MISSING
+                if isinstance(item_value, list):
+                    found.extend(item_value)
+                elif item_value is not MISSING:
+                    found.append(item_value)
+            return found or MISSING
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+def set_field(doc: dict, path: str, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+def unset_field(doc: dict, path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+def is_operator_dict(value) -> bool:
+    return isinstance(value, dict) and bool(value) and next(iter(value)).startswith("$")
+
+# BSON karşılaştırma sırası: null < sayılar < metin < nesne < dizi < ObjectId < bool < tarih
+def type_rank(value) -> int:
+    if value is MISSING or value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+def sort_value(value) -> tuple:
+    rank = type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5, 10):
+        return (rank, repr(value))
+    return (rank, value)
+
+def values_equal(a, b) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    return a == b
+
+def equals_or_contains(value, expected) -> bool:
+    if value is MISSING:
+        return expected is None
+    if values_equal(value, expected):
+        return True
+    return isinstance(value, list) and any(values_equal(item, expected) for item in value)
+
+RANGE_OPERATORS = {"$lt": operator.lt, "$lte": operator.le, "$gt": operator.gt, "$gte": operator.ge}
+
+def range_match(value, op: str, arg) -> bool:
+    rank = type_rank(value)
+    if value is MISSING or rank != type_rank(arg) or rank not in (2, 3, 7, 9):
+        return False
+    return RANGE_OPERATORS[op](value, arg)
+
+def match_operator(value, op: str, arg) -> bool:
+    if op == "$eq":
+        return equals_or_contains(value, arg)
+    if op == "$ne":
+        return not equals_or_contains(value, arg)
+    if op == "$in":
+        return any(equals_or_contains(value, item) for item in arg)
+    if op == "$nin":
+        return not any(equals_or_contains(value, item) for item in arg)
+    if op == "$exists":
+        return (value is not MISSING) == bool(arg)
+    if op in RANGE_OPERATORS:
+        items = value if isinstance(value, list) else [value]
+        return any(range_match(item, op, arg) for item in items)
+    raise NotImplementedError(f"Query operator {op} is not supported by the local storage backends")
+
+def match_query(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(match_query(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(match_query(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(match_query(doc, sub) for sub in condition):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"Query operator {key} is not supported by the local storage backends")
+        elif is_operator_dict(condition):
+            value = field_value(doc, key)
+            if not all(match_operator(value, op, arg) for op, arg in condition.items()):
+                return False
+        elif not equals_or_contains(field_value(doc, key), condition):
+            return False
+    return True
+
+def projection_tree(paths: List[str]) -> dict:
+    tree: dict = {}
+    for path in paths:
+        node = tree
+        *parents, last = path.split(".")
+        for part in parents:
+            node = node.setdefault(part, {})
+            if node is True:
+                break
+        else:
+            node[last] = True
+    return tree
+
+# Noktalı projeksiyon dizilerin her elemanına uygulanır: {"items.name": 1} -> items: [{name}, ...]
+def include_fields(doc: dict, tree: dict) -> dict:
+    result = {}
+    for key, sub in tree.items():
+        if key not in doc:
+            continue
+        value = doc[key]
+        if sub is True:
+            result[key] = clone_value(value)
+        elif isinstance(value, dict):
+            result[key] = include_fields(value, sub)
+        elif isinstance(value, list):
+            result[key] = [include_fields(item, sub) for item in value if isinstance(item, dict)]
+    return result
+
+def exclude_fields(doc: dict, tree: dict) -> dict:
+    result = {}
+    for key, value in doc.items():
+        sub = tree.get(key)
+        if sub is True:
+            continue
+        if sub is None:
+            result[key] = clone_value(value)
+        elif isinstance(value, dict):
+            result[key] = exclude_fields(value, sub)
+        elif isinstance(value, list):
+            result[key] = [exclude_fields(item, sub) if isinstance(item, dict) else clone_value(item) for item in value]
+        else:
+            result[key] = clone_value(value)
+    return result
+
+def project_document(doc: dict, projection) -> dict:
+    if not projection:
+        return clone_value(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    included = [field for field, flag in projection.items() if field != "_id" and flag]
+    if included:
+        result = include_fields(doc, projection_tree(included))
+        if include_id and "_id" in doc:
+            result = {"_id": doc["_id"], **result}
+        return result
+    excluded = [field for field, flag in projection.items() if field != "_id" and not flag]
+    result = exclude_fields(doc, projection_tree(excluded))
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+def apply_update(doc: dict, update: dict, inserting: bool = False):
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, arg in fields.items():
+            if op in ("$set", "$setOnInsert"):
+                set_field(doc, path, clone_value(arg))
+            elif op == "$unset":
+                unset_field(doc, path)
+            elif op == "$inc":
+                current = field_value(doc, path)
+                set_field(doc, path, arg if current is MISSING else current + arg)
+            elif op in ("$min", "$max"):
+                current = field_value(doc, path)
+                better = operator.lt if op == "$min" else operator.gt
+                if current is MISSING or (type_rank(current) == type_rank(arg) and better(arg, current)):
+                    set_field(doc, path, clone_value(arg))
+            elif op == "$push":
+                current = field_value(doc, path)
+                set_field(doc, path, (current if isinstance(current, list) else []) + [clone_value(arg)])
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported by the local storage backends")
+
+def upsert_document(query: dict, update: dict) -> dict:
+    doc = {"_id": query["_id"] if "_id" in query and not is_operator_dict(query["_id"]) else ObjectId()}
+    for key, condition in query.items():
+        if key.startswith("$") or key == "_id":
+            continue
+        if is_operator_dict(condition):
+            if "$eq" in condition:
+                set_field(doc, key, clone_value(condition["$eq"]))
+        else:
+            set_field(doc, key, clone_value(condition))
+    apply_update(doc, update, inserting=True)
+    return doc
+
+def sort_spec(key_or_list, direction=None) -> List[tuple]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+def sort_documents(docs: list, spec: List[tuple]):
+    # Kararlı sıralama: en önemsiz anahtardan başlayan çok geçişli sıralama
+    for field, direction in reversed(spec):
+        docs.sort(key=lambda doc: sort_value(field_value(doc, field)), reverse=direction < 0)
+
+def freeze_value(value):
+    if isinstance(value, dict):
+        return tuple((key, freeze_value(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze_value(item) for item in value)
+    if isinstance(value, bool):
+        return (bool, value)
+    return value
+
+def expression_value(doc: dict, expression):
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = field_value(doc, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, dict):
+        return {key: expression_value(doc, item) for key, item in expression.items()}
+    return expression
+
+def accumulate(op: str, values: list):
+    numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    present = [v for v in values if v is not None]
+    if op == "$sum":
+        return sum(numbers)
+    if op == "$avg":
+        return sum(numbers) / len(numbers) if numbers else None
+    if op == "$min":
+        return min(present, key=sort_value) if present else None
+    if op == "$max":
+        return max(present, key=sort_value) if present else None
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$last":
+        return values[-1] if values else None
+    if op == "$push":
+        return values
+    raise NotImplementedError(f"Accumulator {op} is not supported by the local storage backends")
+
+def group_documents(docs: list, spec: dict) -> list:
+    groups: Dict[object, dict] = {}
+    values: Dict[object, Dict[str, list]] = {}
+    for doc in docs:
+        key = expression_value(doc, spec["_id"])
+        frozen = freeze_value(key)
+        if frozen not in groups:
+            groups[frozen] = {"_id": key}
+            values[frozen] = defaultdict(list)
+        for field, accumulator in spec.items():
+            if field != "_id":
+                (op, expression), = accumulator.items()
+                values[frozen][field].append(expression_value(doc, expression))
+    result = []
+    for frozen, group in groups.items():
+        for field, accumulator in spec.items():
+            if field != "_id":
+                group[field] = accumulate(next(iter(accumulator)), values[frozen][field])
+        result.append(group)
+    return result
+
+def run_pipeline(docs: list, pipeline: list) -> list:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if match_query(doc, spec)]
+        elif name == "$group":
+            docs = group_documents(docs, spec)
+        elif name == "$sort":
+            docs = list(docs)
+            sort_documents(docs, sort_spec(spec))
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$project":
+            docs = [project_document(doc, spec) for doc in docs]
+        elif name == "$count":
+            docs = [{spec: len(docs)}]
+        else:
+            raise NotImplementedError(f"Aggregation stage {name} is not supported by the local storage backends")
+    return docs
+
+def write_error(index: int, error: DuplicateKeyError, doc) -> dict:
+    return {"index": index, "code": error.code, "errmsg": str(error), "op": doc}
+
+def bulk_counts() -> dict:
+    return {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [], "writeErrors": [], "writeConcernErrors": []}
+
+class StorageCursor:
+    """Motor cursor'ının kullanılan kısmı; sonuçlar ilk okumada bir kerede yüklenir."""
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.sort_by: Optional[List[tuple]] = None
+        self.skip_count = 0
+        self.limit_count = 0
+        self.results: Optional[deque] = None
+
+    def sort(self, key_or_list, direction=None):
+        self.sort_by = sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, count: int):
+        self.skip_count = count
+        return self
+
+    def limit(self, count: int):
+        self.limit_count = count
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    def max_time_ms(self, ms: int):
+        return self
+
+    async def _load(self):
+        if self.results is None:
+            self.results = deque(await self.fetch(self))
+
+    async def to_list(self, length: Optional[int] = None) -> list:
+        await self._load()
+        if length is None or length >= len(self.results):
+            items = list(self.results)
+            self.results.clear()
+            return items
+        return [self.results.popleft() for _ in range(length)]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._load()
+        if not self.results:
+            raise StopAsyncIteration
+        return self.results.popleft()
+
+    async def close(self):
+        self.results = deque()
+
+class StorageCollection:
+    """Yerel depoların ortak koleksiyon API'si. Alt sınıflar satırları tutar:
+    _select (eşleşen (anahtar, doküman) çiftleri), _insert_doc, _replace_doc, _delete_keys, _create_index."""
+
+    def __init__(self, database: "StorageDatabase", name: str):
+        self.database = database
+        self.name = name
+
+    def __getitem__(self, name: str):
+        return self.database[f"{self.name}.{name}"]
+
+    async def _run(self, fn, *args, write: bool = True):
+        return await self.database.run(self, fn, args, write)
+
+    def _find_sync(self, query: dict, projection, sort: Optional[List[tuple]], skip: int, limit: int) -> list:
+        docs = [doc for _, doc in self._select(query)]
+        if sort:
+            sort_documents(docs, sort)
+        docs = docs[skip:skip + limit] if limit else docs[skip:]
+        return [project_document(doc, projection) for doc in docs]
+
+    def find(self, filter: Optional[dict] = None, projection=None, sort=None, skip: int = 0, limit: int = 0, **kwargs) -> StorageCursor:
+        query = bson_value(filter or {})
+        cursor = StorageCursor(lambda c: self._run(self._find_sync, query, projection, c.sort_by, c.skip_count, c.limit_count, write=False))
+        if sort is not None:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    async def find_one(self, filter: Optional[dict] = None, projection=None, sort=None, **kwargs) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        docs = await self._run(self._find_sync, bson_value(filter or {}), projection, sort_spec(sort) if sort else None, 0, 1, write=False)
+        return docs[0] if docs else None
+
+    def _count_sync(self, query: dict) -> int:
+        return len(self._select(query))
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        return await self._run(self._count_sync, bson_value(filter), write=False)
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        await self._run(self._insert_doc, bson_value(document))
+        return InsertOneResult(document["_id"], True)
+
+    def _insert_many_sync(self, docs: list, ordered: bool):
+        counts = bulk_counts()
+        for index, doc in enumerate(docs):
+            try:
+                self._insert_doc(doc)
+                counts["nInserted"] += 1
+            except DuplicateKeyError as e:
+                counts["writeErrors"].append(write_error(index, e, doc))
+                if ordered:
+                    break
+        if counts["writeErrors"]:
+            raise BulkWriteError(counts)
+
+    async def insert_many(self, documents, ordered: bool = True, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        await self._run(self._insert_many_sync, [bson_value(d) for d in documents], ordered)
+        return InsertManyResult([d["_id"] for d in documents], True)
+
+    def _update_sync(self, query: dict, update: dict, upsert: bool, multi: bool) -> tuple:
+        rows = self._select(query)
+        if not multi:
+            rows = rows[:1]
+        modified = 0
+        for key, doc in rows:
+            updated = clone_value(doc)
+            apply_update(updated, update)
+            if updated != doc:
+                self._replace_doc(key, doc, updated)
+                modified += 1
+        upserted_id = None
+        if not rows and upsert:
+            doc = upsert_document(query, update)
+            self._insert_doc(doc)
+            upserted_id = doc["_id"]
+        return len(rows), modified, upserted_id
+
+    @staticmethod
+    def _update_result(matched: int, modified: int, upserted_id) -> UpdateResult:
+        raw = {"n": matched + (upserted_id is not None), "nModified": modified}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update_result(*await self._run(self._update_sync, bson_value(filter), bson_value(update), upsert, False))
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update_result(*await self._run(self._update_sync, bson_value(filter), bson_value(update), upsert, True))
+
+    def _find_one_and_update_sync(self, query: dict, update: dict, projection, sort, upsert: bool, return_after: bool):
+        rows = self._select(query)
+        if sort and rows:
+            docs = [doc for _, doc in rows]
+            sort_documents(docs, sort)
+            first = docs[0]
+            rows = [next(row for row in rows if row[1] is first)]
+        if rows:
+            key, doc = rows[0]
+            updated = clone_value(doc)
+            apply_update(updated, update)
+            if updated != doc:
+                self._replace_doc(key, doc, updated)
+            result = updated if return_after else doc
+        elif upsert:
+            updated = upsert_document(query, update)
+            self._insert_doc(updated)
+            result = updated if return_after else None
+        else:
+            result = None
+        return project_document(result, projection) if result is not None else None
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection=None, sort=None, upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE, **kwargs) -> Optional[dict]:
+        return await self._run(
+            self._find_one_and_update_sync, bson_value(filter), bson_value(update), projection,
+            sort_spec(sort) if sort else None, upsert, bool(return_document),
+        )
+
+    def _delete_sync(self, query: dict, multi: bool) -> int:
+        rows = self._select(query)
+        if not multi:
+            rows = rows[:1]
+        self._delete_keys([key for key, _ in rows])
+        return len(rows)
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        return DeleteResult({"n": await self._run(self._delete_sync, bson_value(filter), False)}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        return DeleteResult({"n": await self._run(self._delete_sync, bson_value(filter), True)}, True)
+
+    def _bulk_write_sync(self, operations: list, ordered: bool) -> dict:
+        counts = bulk_counts()
+        for index, operation in enumerate(operations):
+            try:
+                if isinstance(operation, (UpdateOne, UpdateMany)):
+                    matched, modified, upserted_id = self._update_sync(
+                        bson_value(operation._filter), bson_value(operation._doc), operation._upsert, isinstance(operation, UpdateMany)
+                    )
+                    counts["nMatched"] += matched
+                    counts["nModified"] += modified
+                    if upserted_id is not None:
+                        counts["nUpserted"] += 1
+                        counts["upserted"].append({"index": index, "_id": upserted_id})
+                elif isinstance(operation, InsertOne):
+                    operation._doc.setdefault("_id", ObjectId())
+                    self._insert_doc(bson_value(operation._doc))
+                    counts["nInserted"] += 1
+                elif isinstance(operation, (DeleteOne, DeleteMany)):
+                    counts["nRemoved"] += self._delete_sync(bson_value(operation._filter), isinstance(operation, DeleteMany))
+                else:
+                    raise NotImplementedError(f"{type(operation).__name__} is not supported by the local storage backends")
+            except DuplicateKeyError as e:
+                counts["writeErrors"].append(write_error(index, e, None))
+                if ordered:
+                    break
+        if counts["writeErrors"]:
+            raise BulkWriteError(counts)
+        return counts
+
+    async def bulk_write(self, requests, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        return BulkWriteResult(await self._run(self._bulk_write_sync, list(requests), ordered), True)
+
+    def _aggregate_sync(self, pipeline: list) -> list:
+        query = pipeline[0]["$match"] if pipeline and "$match" in pipeline[0] else {}
+        docs = [doc for _, doc in self._select(query)]
+        return [clone_value(doc) for doc in run_pipeline(docs, pipeline[1:] if query else pipeline)]
+
+    def aggregate(self, pipeline: list, **kwargs) -> StorageCursor:
+        pipeline = bson_value(pipeline)
+        return StorageCursor(lambda c: self._run(self._aggregate_sync, pipeline, write=False))
+
+    async def create_index(self, keys, unique: bool = False, partialFilterExpression: Optional[dict] = None,
+                           expireAfterSeconds: Optional[int] = None, name: Optional[str] = None, **kwargs) -> str:
+        spec = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in spec)
+        partial = bson_value(partialFilterExpression) if partialFilterExpression else None
+        await self._run(self._create_index, name, [field for field, _ in spec], unique, partial, expireAfterSeconds)
+        return name
+
+    def _ttl_cutoff(self, seconds: int) -> datetime:
+        return bson_value(datetime.now(timezone.utc) - timedelta(seconds=seconds))
+
+class StorageDatabase:
+    collection_class = StorageCollection
+
+    def __init__(self):
+        self.collections: Dict[str, StorageCollection] = {}
+
+    def __getitem__(self, name: str) -> StorageCollection:
+        collection = self.collections.get(name)
+        if collection is None:
+            collection = self.collections[name] = self.collection_class(self, name)
+        return collection
+
+    def __getattr__(self, name: str) -> StorageCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def run(self, collection: StorageCollection, fn, args: tuple, write: bool):
+        return fn(*args)
+
+    async def command(self, command, **kwargs) -> dict:
+        if command == "ping":
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Command {command} is not supported by the local storage backends")
+
+    def watch(self, *args, **kwargs):
+        raise NotImplementedError("Change streams need a MongoDB replica set")
+
+    def close(self):
+        pass
+
+class MemoryIndex:
+    def __init__(self, name: str, fields: List[str], unique: bool, partial: Optional[dict], ttl: Optional[int]):
+        self.name = name
+        self.fields = fields
+        self.unique = unique
+        self.partial = partial
+        self.ttl = ttl
+        # Her alan öneki için ayrı hash: (restaurant_id,) ve (restaurant_id, status) aynı index'ten okunur
+        self.prefixes: List[Dict[tuple, Set[int]]] = [{} for _ in fields]
+        self.unindexable: Set[int] = set()
+
+    @staticmethod
+    def value_key(value):
+        if value is MISSING or value is None:
+            return None
+        if isinstance(value, bool):
+            return (bool, value)
+        if isinstance(value, (dict, list)):
+            return UNINDEXABLE
+        return value
+
+    def key(self, doc: dict):
+        if self.partial is not None and not match_query(doc, self.partial):
+            return None
+        values = tuple(self.value_key(field_value(doc, field)) for field in self.fields)
+        return UNINDEXABLE if UNINDEXABLE in values else values
+
+    def add(self, rowid: int, key):
+        if key is None:
+            return
+        if key is UNINDEXABLE:
+            self.unindexable.add(rowid)
+            return
+        for length, prefix in enumerate(self.prefixes, 1):
+            prefix.setdefault(key[:length], set()).add(rowid)
+
+    def remove(self, rowid: int, key):
+        if key is None:
+            return
+        if key is UNINDEXABLE:
+            self.unindexable.discard(rowid)
+            return
+        for length, prefix in enumerate(self.prefixes, 1):
+            bucket = prefix.get(key[:length])
+            if bucket is not None:
+                bucket.discard(rowid)
+                if not bucket:
+                    del prefix[key[:length]]
+
+    def holders(self, key) -> Set[int]:
+        if key is None or key is UNINDEXABLE:
+            return set()
+        return self.prefixes[-1].get(key, set())
+
+def equality_keys(condition) -> Optional[list]:
+    """Sorgu koşulunun index'te aranabilecek değerleri; eşitlik/$in değilse None."""
+    if condition is MISSING:
+        return None
+    if is_operator_dict(condition):
+        if "$eq" in condition:
+            values = [condition["$eq"]]
+        elif "$in" in condition:
+            values = list(condition["$in"])
+        else:
+            return None
+    else:
+        values = [condition]
+    keys = [MemoryIndex.value_key(value) for value in values]
+    return None if UNINDEXABLE in keys else keys
+
+MEMORY_INDEX_MAX_PROBES = 1024
+
+class MemoryCollection(StorageCollection):
+    def __init__(self, database: "MemoryDatabase", name: str):
+        super().__init__(database, name)
+        self.docs: Dict[int, dict] = {}
+        self.rowids = itertools.count()
+        self.indexes: List[MemoryIndex] = [MemoryIndex("_id_", ["_id"], True, None, None)]
+        self.swept_at = time.monotonic()
+
+    def _candidates(self, query: dict) -> Optional[Set[int]]:
+        best = None
+        for index in self.indexes:
+            if index.partial is not None:
+                continue
+            choices = []
+            for field in index.fields:
+                keys = equality_keys(query.get(field, MISSING))
+                if keys is None:
+                    break
+                choices.append(keys)
+            if choices and (best is None or len(choices) > len(best[1])):
+                best = (index, choices)
+        if best is None or math.prod(len(keys) for keys in best[1]) > MEMORY_INDEX_MAX_PROBES:
+            return None
+        index, choices = best
+        prefix = index.prefixes[len(choices) - 1]
+        rowids = set(index.unindexable)
+        for key in itertools.product(*choices):
+            rowids.update(prefix.get(key, ()))
+        return rowids
+
+    def _select(self, query: dict) -> List[tuple]:
+        rowids = self._candidates(query) if query else None
+        rows = self.docs.items() if rowids is None else ((rowid, self.docs[rowid]) for rowid in sorted(rowids))
+        if not query:
+            return list(rows)
+        return [(rowid, doc) for rowid, doc in rows if match_query(doc, query)]
+
+    def _check_unique(self, keys: list, rowid: Optional[int] = None):
+        for index, key in zip(self.indexes, keys):
+            if index.unique and index.holders(key) - {rowid}:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {index.name} dup key: {key}",
+                    11000, {"keyPattern": {field: 1 for field in index.fields}, "keyValue": dict(zip(index.fields, key))},
+                )
+
+    def _insert_doc(self, doc: dict):
+        keys = [index.key(doc) for index in self.indexes]
+        self._check_unique(keys)
+        rowid = next(self.rowids)
+        self.docs[rowid] = doc
+        for index, key in zip(self.indexes, keys):
+            index.add(rowid, key)
+        self._sweep_expired()
+
+    def _replace_doc(self, rowid: int, old: dict, new: dict):
+        old_keys = [index.key(old) for index in self.indexes]
+        new_keys = [index.key(new) for index in self.indexes]
+        self._check_unique(new_keys, rowid)
+        for index, old_key, new_key in zip(self.indexes, old_keys, new_keys):
+            if old_key != new_key:
+                index.remove(rowid, old_key)
+                index.add(rowid, new_key)
+        self.docs[rowid] = new
+
+    def _delete_keys(self, rowids: list):
+        for rowid in rowids:
+            doc = self.docs.pop(rowid)
+            for index in self.indexes:
+                index.remove(rowid, index.key(doc))
+
+    def _create_index(self, name: str, fields: List[str], unique: bool, partial: Optional[dict], ttl: Optional[int]):
+        if any(index.name == name for index in self.indexes):
+            return
+        index = MemoryIndex(name, fields, unique, partial, ttl)
+        for rowid, doc in self.docs.items():
+            key = index.key(doc)
+            if unique and index.holders(key):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name} dup key: {key}", 11000)
+            index.add(rowid, key)
+        self.indexes.append(index)
+
+    def _sweep_expired(self):
+        if time.monotonic() - self.swept_at < STORAGE_TTL_SWEEP_SECONDS:
+            return
+        self.swept_at = time.monotonic()
+        for index in self.indexes:
+            if index.ttl is not None:
+                cutoff = self._ttl_cutoff(index.ttl)
+                query = {**(index.partial or {}), index.fields[0]: {"$lt": cutoff}}
+                self._delete_keys([rowid for rowid, doc in self.docs.items() if match_query(doc, query)])
+
+class MemoryDatabase(StorageDatabase):
+    collection_class = MemoryCollection
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return sorted(name for name, collection in self.collections.items() if collection.docs)
+
+# SQLite: her koleksiyon (rowid, _id, doc JSON) tablosudur. Üst seviye alanlardaki skaler
+# eşitlik/$in/aralık koşulları json_extract ile SQL'e itilir ve create_index'in kurduğu ifade
+# index'lerini kullanır; sonuç her zaman ortak eşleyiciden geçer, SQL yalnızca ön elemedir.
+# Noktalı yollar dizilere inebildiği için SQL'e itilmez; üst seviyede dizi tutan alanlar bu
+# uygulamada eşitlikle sorgulanmaz (json_extract diziyi tek değer olarak görür).
+# Tüm işlemler tek bir thread'de, yazmalar BEGIN IMMEDIATE işlemi içinde çalışır; WAL modu
+# aynı dosyayı açan birkaç worker'ın okumalarını engellemez.
+SQLITE_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+
+def encode_bson(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat(timespec="microseconds")}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    raise TypeError(f"{type(value).__name__} is not storable")
+
+def decode_bson(obj: dict):
+    if len(obj) == 1:
+        if "$date" in obj:
+            return datetime.fromisoformat(obj["$date"])
+        if "$oid" in obj:
+            return ObjectId(obj["$oid"])
+    return obj
+
+def encode_document(doc) -> str:
+    return json.dumps(doc, default=encode_bson, ensure_ascii=False, separators=(",", ":"))
+
+def decode_document(text: str) -> dict:
+    return json.loads(text, object_hook=decode_bson)
+
+def sqlite_field(path: str) -> str:
+    return "json_extract(doc, '$" + "".join(f'."{part}"' for part in path.split(".")) + "')"
+
+def sqlite_scalar(value) -> bool:
+    return isinstance(value, (str, int, float)) and not (isinstance(value, float) and math.isnan(value))
+
+SQLITE_RANGE_OPERATORS = {"$lt": "<", "$lte": "<=", "$gt": ">", "$gte": ">="}
+
+def sqlite_filter(query: dict) -> tuple:
+    clauses, params = [], []
+    for key, condition in query.items():
+        if key.startswith("$") or "." in key:
+            continue
+        field = sqlite_field(key)
+        conditions = condition.items() if is_operator_dict(condition) else [("$eq", condition)]
+        for op, arg in conditions:
+            if op == "$eq" and arg is None:
+                clauses.append(f"{field} IS NULL")
+            elif op == "$eq" and sqlite_scalar(arg):
+                clauses.append(f"{field} = ?")
+                params.append(arg)
+            elif op == "$in" and arg and all(sqlite_scalar(item) for item in arg):
+                clauses.append(f"{field} IN ({', '.join('?' * len(arg))})")
+                params.extend(arg)
+            elif op in SQLITE_RANGE_OPERATORS and sqlite_scalar(arg) and not isinstance(arg, bool):
+                clauses.append(f"{field} {SQLITE_RANGE_OPERATORS[op]} ?")
+                params.append(arg)
+    return " AND ".join(clauses), params
+
+def sqlite_literal(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise NotImplementedError(f"Partial index value {value!r} is not supported by the sqlite storage backend")
+
+def sqlite_partial(partial: dict) -> str:
+    clauses = []
+    for key, condition in partial.items():
+        if is_operator_dict(condition) and set(condition) == {"$exists"}:
+            clauses.append(f"{sqlite_field(key)} IS {'NOT ' if condition['$exists'] else ''}NULL")
+        elif not is_operator_dict(condition):
+            clauses.append(f"{sqlite_field(key)} = {sqlite_literal(condition)}")
+        else:
+            raise NotImplementedError(f"Partial index filter {condition!r} is not supported by the sqlite storage backend")
+    return " AND ".join(clauses)
+
+class SQLiteCollection(StorageCollection):
+    def __init__(self, database: "SQLiteDatabase", name: str):
+        if not SQLITE_NAME_RE.match(name):
+            raise ValueError(f"Invalid collection name: {name}")
+        super().__init__(database, name)
+        self.table = '"' + name + '"'
+        self.ready = False
+        self.ttl_indexes: List[tuple] = []
+        self.swept_at = time.monotonic()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self.database.connection
+
+    def ensure_table(self):
+        if not self.ready:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (rowid INTEGER PRIMARY KEY, _id TEXT NOT NULL UNIQUE, doc TEXT NOT NULL)"
+            )
+            self.ready = True
+
+    def _select(self, query: dict) -> List[tuple]:
+        where, params = sqlite_filter(query)
+        sql = f"SELECT rowid, doc FROM {self.table}" + (f" WHERE {where}" if where else "") + " ORDER BY rowid"
+        rows = []
+        for rowid, text in self.connection.execute(sql, params):
+            doc = decode_document(text)
+            if match_query(doc, query):
+                rows.append((rowid, doc))
+        return rows
+
+    def _duplicate_key(self, error: sqlite3.IntegrityError):
+        return DuplicateKeyError(f"E11000 duplicate key error collection: {self.name}: {error}", 11000)
+
+    def _insert_doc(self, doc: dict):
+        try:
+            self.connection.execute(f"INSERT INTO {self.table} (_id, doc) VALUES (?, ?)", (encode_document(doc["_id"]), encode_document(doc)))
+        except sqlite3.IntegrityError as e:
+            raise self._duplicate_key(e)
+        self._sweep_expired()
+
+    def _replace_doc(self, rowid: int, old: dict, new: dict):
+        try:
+            self.connection.execute(f"UPDATE {self.table} SET _id = ?, doc = ? WHERE rowid = ?", (encode_document(new["_id"]), encode_document(new), rowid))
+        except sqlite3.IntegrityError as e:
+            raise self._duplicate_key(e)
+
+    def _delete_keys(self, rowids: list):
+        for start in range(0, len(rowids), 500):
+            chunk = rowids[start:start + 500]
+            self.connection.execute(f"DELETE FROM {self.table} WHERE rowid IN ({', '.join('?' * len(chunk))})", chunk)
+
+    def _create_index(self, name: str, fields: List[str], unique: bool, partial: Optional[dict], ttl: Optional[int]):
+        if ttl is not None:
+            self.ttl_indexes.append((fields[0], ttl, sqlite_partial(partial) if partial else None))
+        where = f" WHERE {sqlite_partial(partial)}" if partial else ""
+        index_name = '"' + f"{self.name}__{name}" + '"'
+        try:
+            self.connection.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name} ON {self.table} "
+                f"({', '.join(sqlite_field(field) for field in fields)}){where}"
+            )
+        except sqlite3.IntegrityError as e:
+            raise self._duplicate_key(e)
+
+    def _sweep_expired(self):
+        if not self.ttl_indexes or time.monotonic() - self.swept_at < STORAGE_TTL_SWEEP_SECONDS:
+            return
+        self.swept_at = time.monotonic()
+        for field, seconds, partial in self.ttl_indexes:
+            cutoff = self._ttl_cutoff(seconds).isoformat(timespec="microseconds")
+            where = f"{sqlite_field(field + '.$date')} < ?" + (f" AND {partial}" if partial else "")
+            self.connection.execute(f"DELETE FROM {self.table} WHERE {where}", (cutoff,))
+
+class SQLiteDatabase(StorageDatabase):
+    collection_class = SQLiteCollection
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.connection: Optional[sqlite3.Connection] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, isolation_level=None)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("PRAGMA busy_timeout=5000")
+        return self.connection
+
+    def execute(self, collection: Optional[SQLiteCollection], fn, args: tuple, write: bool):
+        connection = self.connect()
+        if collection is not None:
+            collection.ensure_table()
+        if not write:
+            return fn(*args)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(*args)
+        except BulkWriteError:
+            # Mongo'daki gibi hatadan önceki (sırasız modda hatasız olan tüm) yazmalar kalır
+            connection.execute("COMMIT")
+            raise
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    async def run(self, collection: Optional[SQLiteCollection], fn, args: tuple, write: bool):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.execute, collection, fn, args, write)
+
+    def _table_names(self) -> List[str]:
+        return [row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return await self.run(None, self._table_names, (), False)
+
+    def close(self):
+        def close_connection():
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+        self.executor.submit(close_connection).result()
+        self.executor.shutdown(wait=True)
+
+def open_local_storage(backend: str, path: str) -> StorageDatabase:
+    if backend == "memory":
+        return MemoryDatabase()
+    if backend == "sqlite":
+        return SQLiteDatabase(path)
+    raise Exception(f"Unknown STORAGE_BACKEND: {backend}")
@@ -0,0 +1,409 @@
+"""Async load generator for the QR restaurant API.
+
+Setup (admin login, restaurant, staff, menu and tables) reuses the flows of
+QRRestaurantAPITester from backend_test.py; the load phase then runs guests,
+kitchen and cashier screens concurrently with httpx and writes per-endpoint
+latency percentiles and RPS as JSON.
+
+    python backend_load_test.py --base-url http://localhost:8000/api --restaurants 5 --duration 60
+    python backend_load_test.py --inprocess --output run.json --compare baseline.json
+    python backend_load_test.py --inprocess --storage sqlite --output sqlite.json --compare run.json
+
+Admission control: flood analytics next to the normal guest load, once with the
+middleware off and once on, and compare POST /orders p95. Requests shed with
+503 are counted under "shed", not "errors".
+
+    python backend_load_test.py --inprocess --analytics-clients 8 --no-admission --output off.json
+    python backend_load_test.py --inprocess --analytics-clients 8 --compare off.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from backend_test import QRRestaurantAPITester
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.shed = defaultdict(int)
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, endpoint, seconds, ok, shed=False):
+        self.samples[endpoint].append(seconds)
+        if shed:
+            self.shed[endpoint] += 1
+        elif not ok:
+            self.errors[endpoint] += 1
+
+    def report(self):
+        duration = max((self.finished_at or time.monotonic()) - (self.started_at or 0), 1e-9)
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            endpoints[endpoint] = summarize(samples, self.errors[endpoint], duration, self.shed[endpoint])
+        all_samples = [s for samples in self.samples.values() for s in samples]
+        return {
+            "duration_s": round(duration, 2),
+            "total": summarize(all_samples, sum(self.errors.values()), duration, sum(self.shed.values())),
+            "endpoints": endpoints,
+        }
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples, errors, duration, shed=0):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "shed": shed,
+        "rps": round(len(ordered) / duration, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round((ordered[-1] if ordered else 0) * 1000, 2),
+    }
+
+
+class LoadClient:
+    """httpx client that records latency under the route template, not the concrete URL."""
+
+    def __init__(self, base_url, recorder, timeout):
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/") + "/",
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=200),
+        )
+        self.recorder = recorder
+
+    async def call(self, endpoint, method, path, token=None, json_body=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(method, path, json=json_body, headers=headers)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        shed = response is not None and response.status_code == 503
+        self.recorder.record(endpoint, time.perf_counter() - start, ok, shed)
+        return response
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+# -----------------------------
+# SETUP (backend_test.py akışları)
+# -----------------------------
+def setup_restaurant(base_url, index, run_id, args):
+    tester = QRRestaurantAPITester(base_url=base_url)
+    prefix = f"load-{run_id}-{index}"
+    password = "load123"
+
+    steps = [
+        lambda: tester.test_admin_login(email=args.admin_email, password=args.admin_password),
+        lambda: tester.test_create_restaurant(
+            name=f"Load Restaurant {index}", owner_email=f"{prefix}-owner@test.com", owner_password=password
+        ),
+        lambda: tester.test_owner_login(email=f"{prefix}-owner@test.com", password=password),
+        lambda: tester.test_register_kitchen_user(email=f"{prefix}-kitchen@test.com", password=password),
+        lambda: tester.test_kitchen_login(email=f"{prefix}-kitchen@test.com", password=password),
+        lambda: tester.test_register_cashier_user(email=f"{prefix}-cashier@test.com", password=password),
+        lambda: tester.test_cashier_login(email=f"{prefix}-cashier@test.com", password=password),
+        lambda: tester.test_create_menu_category(),
+    ]
+    for step in steps:
+        if not step():
+            raise RuntimeError(f"Setup failed for restaurant {index}")
+
+    items = []
+    for item_index in range(args.menu_items):
+        tester.test_create_menu_item(
+            name=f"Item {item_index}",
+            price=round(20 + item_index * 3.5, 2),
+            preparation_time_minutes=5 + item_index % 20,
+        )
+        items.append({
+            "menu_item_id": tester.menu_item_id,
+            "name": f"Item {item_index}",
+            "price": round(20 + item_index * 3.5, 2),
+            "preparation_time_minutes": 5 + item_index % 20,
+        })
+
+    tables = []
+    for table_index in range(args.tables):
+        tester.test_create_table(table_number=str(table_index + 1))
+        tables.append(tester.table_id)
+
+    return {
+        "restaurant_id": tester.restaurant_id,
+        "admin_token": tester.admin_token,
+        "owner_token": tester.owner_token,
+        "kitchen_token": tester.kitchen_token,
+        "cashier_token": tester.cashier_token,
+        "items": items,
+        "tables": tables,
+    }
+
+
+# -----------------------------
+# SENARYO
+# -----------------------------
+async def guest_loop(client, restaurant, rng, args, stop):
+    while not stop.is_set():
+        table_id = rng.choice(restaurant["tables"])
+        await client.call("GET /public/menu/{table_id}", "GET", f"public/menu/{table_id}")
+
+        items = [dict(item, quantity=rng.randint(1, 3)) for item in rng.sample(restaurant["items"], rng.randint(1, min(3, len(restaurant["items"]))))]
+        payment_method = "cash" if rng.random() < 0.6 else "card"
+        await client.call("POST /orders", "POST", "orders", json_body={
+            "table_id": table_id, "items": items, "payment_method": payment_method
+        })
+
+        if rng.random() < args.waiter_call_ratio:
+            await client.call("POST /waiter-call", "POST", "waiter-call", json_body={"table_id": table_id})
+
+        await sleep_or_stop(stop, rng.expovariate(1 / args.think_time))
+
+
+async def kitchen_loop(client, restaurant, rng, args, stop):
+    next_status = {"pending": "preparing", "preparing": "ready"}
+    while not stop.is_set():
+        response = await client.call("GET /kitchen/orders", "GET", "kitchen/orders", token=restaurant["kitchen_token"])
+        if response is not None and response.status_code == 200:
+            for order in response.json()[:args.kitchen_batch]:
+                await client.call(
+                    "PUT /kitchen/orders/{order_id}/status", "PUT", f"kitchen/orders/{order['id']}/status",
+                    token=restaurant["kitchen_token"], json_body={"status": next_status.get(order["status"], "ready")}
+                )
+        await sleep_or_stop(stop, args.poll_interval)
+
+
+async def cashier_loop(client, restaurant, rng, args, stop):
+    while not stop.is_set():
+        response = await client.call("GET /cashier/orders", "GET", "cashier/orders", token=restaurant["cashier_token"])
+        if response is not None and response.status_code == 200:
+            for order in [o for o in response.json() if o["status"] == "ready"][:args.kitchen_batch]:
+                await client.call(
+                    "PUT /cashier/orders/{order_id}/payment", "PUT", f"cashier/orders/{order['id']}/payment",
+                    token=restaurant["cashier_token"], json_body={"payment_status": "paid"}
+                )
+        await sleep_or_stop(stop, args.poll_interval)
+
+
+async def owner_loop(client, restaurant, rng, args, stop):
+    while not stop.is_set():
+        await client.call("GET /owner/stats", "GET", "owner/stats", token=restaurant["owner_token"])
+        await client.call("GET /owner/waiter-calls", "GET", "owner/waiter-calls", token=restaurant["owner_token"])
+        await sleep_or_stop(stop, args.owner_interval)
+
+
+async def analytics_loop(client, restaurant, rng, args, stop):
+    """Back-to-back report requests; a 503 is honoured by waiting Retry-After seconds."""
+    requests = [
+        ("GET /owner/stats", "owner/stats", restaurant["owner_token"]),
+        ("GET /admin/analytics", "admin/analytics", restaurant["admin_token"]),
+        ("GET /admin/users", "admin/users", restaurant["admin_token"]),
+    ]
+    while not stop.is_set():
+        endpoint, path, token = rng.choice(requests)
+        response = await client.call(endpoint, "GET", path, token=token)
+        if response is not None and response.status_code == 503:
+            await sleep_or_stop(stop, float(response.headers.get("retry-after", 1)))
+
+
+async def owner_subscription(client, restaurant, stop):
+    """Keeps an owner waiter-call SSE stream open for the whole run."""
+    path = f"owner/waiter-calls/stream?token={restaurant['owner_token']}"
+    with contextlib.suppress(httpx.HTTPError):
+        async with client.http.stream("GET", path, timeout=None) as response:
+            async for _ in response.aiter_lines():
+                if stop.is_set():
+                    break
+
+
+async def sleep_or_stop(stop, seconds):
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+
+
+async def run_load(base_url, restaurants, args):
+    recorder = LatencyRecorder()
+    client = LoadClient(base_url, recorder, args.timeout)
+    stop = asyncio.Event()
+    rng = random.Random(args.seed)
+
+    tasks = []
+    for restaurant in restaurants:
+        for _ in range(args.guests):
+            tasks.append(guest_loop(client, restaurant, random.Random(rng.random()), args, stop))
+        tasks.append(kitchen_loop(client, restaurant, random.Random(rng.random()), args, stop))
+        tasks.append(cashier_loop(client, restaurant, random.Random(rng.random()), args, stop))
+        tasks.append(owner_loop(client, restaurant, random.Random(rng.random()), args, stop))
+        for _ in range(args.analytics_clients):
+            tasks.append(analytics_loop(client, restaurant, random.Random(rng.random()), args, stop))
+        if args.subscribe:
+            tasks.append(owner_subscription(client, restaurant, stop))
+
+    running = [asyncio.create_task(t) for t in tasks]
+    recorder.started_at = time.monotonic()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    recorder.finished_at = time.monotonic()
+    # SSE akışları kendi başına bitmez
+    await asyncio.wait(running, timeout=args.timeout)
+    for task in running:
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    await client.aclose()
+    return recorder.report()
+
+
+# -----------------------------
+# IN-PROCESS SUNUCU (yerel depo)
+# -----------------------------
+def start_inprocess_server(admin_email, admin_password, admission=True, storage="memory"):
+    """Runs backend.server on a free local port against a local memory or SQLite store."""
+    import tempfile
+    import uvicorn
+
+    os.environ["STORAGE_BACKEND"] = storage
+    os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="load-test-"), "load_test.sqlite3"))
+    os.environ.setdefault("ORDER_ARCHIVE_AFTER_DAYS", "0")
+    from backend import server
+
+    server.admission.enabled = admission
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning")
+    uvicorn_server = uvicorn.Server(config)
+
+    async def serve():
+        await server.db.users.insert_one({
+            "id": "admin-001",
+            "email": admin_email,
+            "password": server.hash_password(admin_password),
+            "full_name": "Admin User",
+            "role": "admin",
+            "restaurant_id": None,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+        await uvicorn_server.serve()
+
+    thread = threading.Thread(target=lambda: asyncio.run(serve()), daemon=True)
+    thread.start()
+    while not uvicorn_server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/api", uvicorn_server
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def print_comparison(report, baseline):
+    print(f"{'endpoint':45} {'p95 ms':>16} {'rps':>16} {'shed':>12}", file=sys.stderr)
+    for endpoint, stats in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before:
+            print(f"{endpoint:45} {stats['p95_ms']:>16} {stats['rps']:>16} {stats['shed']:>12}", file=sys.stderr)
+            continue
+        p95 = f"{before['p95_ms']} -> {stats['p95_ms']}"
+        rps = f"{before['rps']} -> {stats['rps']}"
+        shed = f"{before.get('shed', 0)} -> {stats['shed']}"
+        print(f"{endpoint:45} {p95:>16} {rps:>16} {shed:>12}", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="QR restaurant API load test")
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--inprocess", action="store_true", help="start backend.server locally on a local store")
+    parser.add_argument("--admin-email", default="admin@qr-restaurant.com")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--restaurants", type=int, default=3)
+    parser.add_argument("--tables", type=int, default=10, help="tables per restaurant")
+    parser.add_argument("--menu-items", type=int, default=15, help="menu items per restaurant")
+    parser.add_argument("--guests", type=int, default=10, help="concurrent guests per restaurant")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean guest pause in seconds")
+    parser.add_argument("--waiter-call-ratio", type=float, default=0.2)
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="kitchen/cashier poll interval")
+    parser.add_argument("--owner-interval", type=float, default=15.0)
+    parser.add_argument("--kitchen-batch", type=int, default=5, help="orders advanced per poll")
+    parser.add_argument("--analytics-clients", type=int, default=0, help="report clients flooding analytics per restaurant")
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory", help="store for --inprocess")
+    parser.add_argument("--no-admission", action="store_true", help="disable admission control (--inprocess only)")
+    parser.add_argument("--subscribe", action="store_true", help="owners hold the waiter-call SSE stream open")
+    parser.add_argument("--duration", type=float, default=30.0, help="load phase length in seconds")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base_url = args.base_url
+    uvicorn_server = None
+    if args.inprocess:
+        base_url, uvicorn_server = start_inprocess_server(
+            args.admin_email, args.admin_password, admission=not args.no_admission, storage=args.storage
+        )
+
+    run_id = f"{int(time.time())}-{random.Random(args.seed).randint(0, 9999)}"
+    print(f"🚀 Setting up {args.restaurants} restaurants on {base_url}", file=sys.stderr)
+    restaurants = []
+    with contextlib.redirect_stdout(sys.stderr):
+        for index in range(args.restaurants):
+            restaurants.append(setup_restaurant(base_url, index, run_id, args))
+
+    print(f"🔥 Running load for {args.duration:.0f}s", file=sys.stderr)
+    report = asyncio.run(run_load(base_url, restaurants, args))
+    report["config"] = {k: v for k, v in vars(args).items() if k not in ("admin_password", "output", "compare")}
+    report["git_revision"] = git_revision()
+    report["generated_at"] = datetime.now(timezone.utc).isoformat()
+
+    if uvicorn_server is not None:
+        uvicorn_server.should_exit = True
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+
+    return 0 if report["total"]["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -58,14 +58,14 @@ class QRRestaurantAPITester:
             print(f"❌ Failed - Error: {str(e)}")
             return False, {}
 
-    def test_admin_login(self):
+    def test_admin_login(self, email="admin@qr-restaurant.com", password="admin123"):
         """Test admin login"""
         success, response = self.run_test(
             "Admin Login",
             "POST",
             "auth/login",
             200,
-            data={"email": "admin@qr-restaurant.com", "password": "admin123"}
+            data={"email": email, "password": password}
         )
         if success and 'access_token' in response:
             self.admin_token = response['access_token']
@@ -73,14 +73,14 @@ class QRRestaurantAPITester:
             return True
         return False
 
-    def test_create_restaurant(self):
+    def test_create_restaurant(self, name="Test Restaurant", owner_email="owner@test.com", owner_password="owner123"):
         """Test restaurant creation by admin"""
         restaurant_data = {
-            "name": "Test Restaurant",
+            "name": name,
             "address": "Test Address 123",
             "phone": "+90 555 123 4567",
-            "owner_email": "owner@test.com",
-            "owner_password": "owner123",
+            "owner_email": owner_email,
+            "owner_password": owner_password,
             "owner_full_name": "Test Owner"
         }
         
@@ -98,14 +98,14 @@ class QRRestaurantAPITester:
             return True
         return False
 
-    def test_owner_login(self):
+    def test_owner_login(self, email="owner@test.com", password="owner123"):
         """Test owner login"""
         success, response = self.run_test(
             "Owner Login",
             "POST",
             "auth/login",
             200,
-            data={"email": "owner@test.com", "password": "owner123"}
+            data={"email": email, "password": password}
         )
         if success and 'access_token' in response:
             self.owner_token = response['access_token']
@@ -134,15 +134,16 @@ class QRRestaurantAPITester:
             return True
         return False
 
-    def test_create_menu_item(self):
+    def test_create_menu_item(self, name="Test Burger", price=25.50, preparation_time_minutes=10):
         """Test menu item creation"""
         item_data = {
             "category_id": self.category_id,
-            "name": "Test Burger",
+            "name": name,
             "description": "Delicious test burger",
-            "price": 25.50,
+            "price": price,
             "image_url": "https://images.unsplash.com/photo-1630852009278-6cc36322ddfc?crop=entropy&cs=srgb&fm=jpg&q=85",
-            "available": True
+            "available": True,
+            "preparation_time_minutes": preparation_time_minutes
         }
         
         success, response = self.run_test(
@@ -159,10 +160,10 @@ class QRRestaurantAPITester:
             return True
         return False
 
-    def test_create_table(self):
+    def test_create_table(self, table_number="1"):
         """Test table creation with QR code generation"""
         table_data = {
-            "table_number": "1"
+            "table_number": table_number
         }
         
         success, response = self.run_test(
@@ -230,11 +231,11 @@ class QRRestaurantAPITester:
             return True
         return False
 
-    def test_register_kitchen_user(self):
+    def test_register_kitchen_user(self, email="kitchen@test.com", password="kitchen123"):
         """Test registering kitchen user by admin"""
         kitchen_data = {
-            "email": "kitchen@test.com",
-            "password": "kitchen123",
+            "email": email,
+            "password": password,
             "full_name": "Kitchen Staff",
             "role": "kitchen",
             "restaurant_id": self.restaurant_id
@@ -250,14 +251,14 @@ class QRRestaurantAPITester:
         )
         return success
 
-    def test_kitchen_login(self):
+    def test_kitchen_login(self, email="kitchen@test.com", password="kitchen123"):
         """Test kitchen user login"""
         success, response = self.run_test(
             "Kitchen Login",
             "POST",
             "auth/login",
             200,
-            data={"email": "kitchen@test.com", "password": "kitchen123"}
+            data={"email": email, "password": password}
         )
         if success and 'access_token' in response:
             self.kitchen_token = response['access_token']
@@ -291,11 +292,11 @@ class QRRestaurantAPITester:
         )
         return success
 
-    def test_register_cashier_user(self):
+    def test_register_cashier_user(self, email="cashier@test.com", password="cashier123"):
         """Test registering cashier user by admin"""
         cashier_data = {
-            "email": "cashier@test.com",
-            "password": "cashier123",
+            "email": email,
+            "password": password,
             "full_name": "Cashier Staff",
             "role": "cashier",
             "restaurant_id": self.restaurant_id
@@ -311,14 +312,14 @@ class QRRestaurantAPITester:
         )
         return success
 
-    def test_cashier_login(self):
+    def test_cashier_login(self, email="cashier@test.com", password="cashier123"):
         """Test cashier user login"""
         success, response = self.run_test(
             "Cashier Login",
             "POST",
             "auth/login",
             200,
-            data={"email": "cashier@test.com", "password": "cashier123"}
+            data={"email": email, "password": password}
         )
         if success and 'access_token' in response:
             self.cashier_token = response['access_token']
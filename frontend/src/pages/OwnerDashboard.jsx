@@ -54,27 +54,25 @@ const OwnerDashboard = () => {
     try {
       const token = localStorage.getItem('token');
       
-      if (activeTab === 'overview') {
-        const statsRes = await axios.get(`${API}/owner/stats`, {
-          headers: { Authorization: `Bearer ${token}` }
-        });
-        setStats(statsRes.data);
-      }
+      const sectionsByTab = {
+        overview: 'stats',
+        menu: 'categories,items',
+        tables: 'tables',
+        orders: 'orders'
+      };
+      const sections = sectionsByTab[activeTab];
+      if (!sections) return;
       
-      if (activeTab === 'menu') {
-        const [categoriesRes, itemsRes] = await Promise.all([
-          axios.get(`${API}/owner/menu/categories`, { headers: { Authorization: `Bearer ${token}` } }),
-          axios.get(`${API}/owner/menu/items`, { headers: { Authorization: `Bearer ${token}` } })
-        ]);
-        setCategories(categoriesRes.data);
-        setMenuItems(itemsRes.data);
-      } else if (activeTab === 'tables') {
-        const res = await axios.get(`${API}/owner/tables`, { headers: { Authorization: `Bearer ${token}` } });
-        setTables(res.data);
-      } else if (activeTab === 'orders') {
-        const res = await axios.get(`${API}/owner/orders`, { headers: { Authorization: `Bearer ${token}` } });
-        setOrders(res.data);
-      }
+      const res = await axios.get(`${API}/owner/dashboard`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { sections, include_qr: activeTab === 'tables' }
+      });
+      const data = res.data;
+      if (data.stats) setStats(data.stats);
+      if (data.categories) setCategories(data.categories);
+      if (data.items) setMenuItems(data.items);
+      if (data.tables) setTables(data.tables);
+      if (data.orders) setOrders(data.orders);
     } catch (error) {
       toast.error('Veri yüklenemedi');
       console.error(error);
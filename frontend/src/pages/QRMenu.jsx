@@ -1,5 +1,5 @@
 import { useParams } from "react-router-dom";
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
@@ -48,6 +48,7 @@ const QRMenu = () => {
   const [reviewDialog, setReviewDialog] = useState(false);
   const [rating, setRating] = useState(5);
   const [reviewComment, setReviewComment] = useState('');
+  const itemsRef = useRef([]);
 
   /**
    * Sayfa açılınca tableId'yi al
@@ -64,6 +65,38 @@ const QRMenu = () => {
     fetchMenu();
   }, [tableId]);
 
+  useEffect(() => {
+    itemsRef.current = items;
+  }, [items]);
+
+  /**
+   * Stok / fiyat değişikliklerini canlı dinle
+   */
+  useEffect(() => {
+    if (!tableId) return;
+    const source = new EventSource(`${API}/public/menu/${tableId}/stream`);
+
+    source.addEventListener('item', (e) => {
+      const delta = JSON.parse(e.data);
+      const known = itemsRef.current.some(i => i.id === delta.id);
+      if (!known) {
+        if (delta.available) fetchMenu();
+        return;
+      }
+      if (delta.available) {
+        setItems(prev => prev.map(i => i.id === delta.id ? { ...i, price: delta.price } : i));
+        setCart(prev => prev.map(i => i.menu_item_id === delta.id ? { ...i, price: delta.price } : i));
+      } else {
+        setItems(prev => prev.filter(i => i.id !== delta.id));
+        setCart(prev => prev.filter(i => i.menu_item_id !== delta.id));
+      }
+    });
+    source.addEventListener('menu_changed', () => fetchMenu());
+    source.addEventListener('reset', () => fetchMenu());
+
+    return () => source.close();
+  }, [tableId]);
+
   const fetchMenu = async () => {
     try {
       console.log("API CALL:", `${API}/public/menu/${tableId}`);
@@ -142,7 +175,14 @@ const QRMenu = () => {
       setCart([]);
       setCheckoutDialog(false);
     } catch (error) {
-      toast.error('Sipariş gönderilemedi');
+      const unavailable = error.response?.status === 409 ? error.response.data?.detail?.unavailable_items : null;
+      if (unavailable) {
+        toast.error('Sepetinizdeki bazı ürünler artık mevcut değil');
+        setCart(prev => prev.filter(i => !unavailable.includes(i.menu_item_id)));
+        fetchMenu();
+      } else {
+        toast.error('Sipariş gönderilemedi');
+      }
       console.error(error);
     } finally {
       setSubmitting(false);
@@ -245,10 +285,25 @@ const QRMenu = () => {
                     data-testid="menu-item-card"
                   >
                     <div className="flex">
-                      {item.image_url && (
-                        <img 
-                          src={item.image_url} 
-                          alt={item.name} 
+                      {item.image_variants ? (
+                        <picture>
+                          <source
+                            type="image/webp"
+                            srcSet={`${item.image_variants.thumb.webp} 1x, ${item.image_variants.small.webp} 2x`}
+                          />
+                          <img
+                            src={item.image_variants.thumb.jpeg}
+                            srcSet={`${item.image_variants.thumb.jpeg} 1x, ${item.image_variants.small.jpeg} 2x`}
+                            alt={item.name}
+                            loading="lazy"
+                            className="w-28 h-28 object-cover"
+                          />
+                        </picture>
+                      ) : item.image_url && (
+                        <img
+                          src={item.image_url}
+                          alt={item.name}
+                          loading="lazy"
                           className="w-28 h-28 object-cover"
                         />
                       )}
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import random
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("ORDER_ARCHIVE_AFTER_DAYS", "0")
+os.environ.setdefault("MENU_IMAGE_DIR", tempfile.mkdtemp(prefix="menu-images-"))
+
+from backend import server  # noqa: E402
+from backend.storage import open_local_storage  # noqa: E402
+
+DATA_SIZES = [10, 100, 1000]
+# mongomock (default, comparable with earlier saved benchmark runs), memory or sqlite;
+# every test and benchmark runs against the chosen store
+TEST_STORAGE_BACKEND = os.environ.get("TEST_STORAGE_BACKEND", "mongomock")
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def run(loop):
+    return loop.run_until_complete
+
+
+def open_database(backend, tmp_path):
+    if backend == "mongomock":
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        return mongomock_motor.AsyncMongoMockClient()["benchmark"]
+    return open_local_storage(backend, str(tmp_path / "benchmark.sqlite3"))
+
+
+@pytest.fixture
+def db(monkeypatch, run, tmp_path):
+    database = open_database(TEST_STORAGE_BACKEND, tmp_path)
+    monkeypatch.setattr(server, "db", server.CursorTrackingDatabase(database))
+    for cache in server.worker_caches.values():
+        cache.evict()
+    server._archive_partition_cache["names"] = None
+    run(server.ensure_indexes())
+    yield database
+    if TEST_STORAGE_BACKEND != "mongomock":
+        database.close()
+
+
+@pytest.fixture
+def api(loop, db):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://testserver")
+    yield client
+    loop.run_until_complete(client.aclose())
+
+
+def auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def seed_restaurant(db, orders=0, tables=10, menu_items=20, seed=0):
+    """Inserts one restaurant with staff, menu, tables and `orders` orders spread over two weeks."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    restaurant_id = str(uuid.UUID(int=rng.getrandbits(128)))
+
+    users = {}
+    for role in ("admin", "owner", "kitchen", "cashier"):
+        user = {
+            "id": f"{role}-{restaurant_id}",
+            "email": f"{role}-{restaurant_id[:8]}@bench.example.com",
+            "password": "not-used",
+            "full_name": role.title(),
+            "role": role,
+            "restaurant_id": None if role == "admin" else restaurant_id,
+            "created_at": now.isoformat(),
+        }
+        users[role] = user
+    await db.users.insert_many(list(users.values()))
+
+    await db.restaurants.insert_one({
+        "id": restaurant_id,
+        "name": f"Bench {restaurant_id[:8]}",
+        "address": "Bench Street 1",
+        "phone": "+90 555 000 0000",
+        "owner_id": users["owner"]["id"],
+        "subscription_status": "active",
+        "subscription_end_date": now + timedelta(days=30),
+        "created_at": now,
+        "kasa_enabled": True,
+        "mutfak_enabled": True,
+    })
+
+    category_id = str(uuid.uuid4())
+    await db.menu_categories.insert_one({
+        "id": category_id, "restaurant_id": restaurant_id, "name": "Ana Yemekler", "order": 1, "created_at": now.isoformat()
+    })
+    items = [{
+        "id": str(uuid.uuid4()),
+        "restaurant_id": restaurant_id,
+        "category_id": category_id,
+        "name": f"Item {i}",
+        "description": "Bench item",
+        "price": round(20 + i * 2.5, 2),
+        "image_url": None,
+        "available": True,
+        "preparation_time_minutes": 5 + i % 15,
+        "created_at": now.isoformat(),
+    } for i in range(menu_items)]
+    await db.menu_items.insert_many(items)
+
+    table_docs = [{
+        "id": str(uuid.uuid4()),
+        "restaurant_id": restaurant_id,
+        "table_number": str(i + 1),
+        "qr_code": "",
+        "created_at": now.isoformat(),
+    } for i in range(tables)]
+    await db.tables.insert_many(table_docs)
+
+    order_docs = []
+    for _ in range(orders):
+        created_at = (now - timedelta(minutes=rng.randint(0, 60 * 24 * 14))).isoformat()
+        order_items = [{
+            "menu_item_id": item["id"],
+            "name": item["name"],
+            "price": item["price"],
+            "quantity": rng.randint(1, 3),
+            "preparation_time_minutes": item["preparation_time_minutes"],
+        } for item in rng.sample(items, 2)]
+        table = rng.choice(table_docs)
+        order_docs.append({
+            "id": str(uuid.uuid4()),
+            "restaurant_id": restaurant_id,
+            "table_id": table["id"],
+            "table_number": table["table_number"],
+            "items": order_items,
+            "total_amount": sum(i["price"] * i["quantity"] for i in order_items),
+            "payment_method": rng.choice(["cash", "card"]),
+            "status": rng.choice(["pending", "preparing", "ready", "completed", "completed"]),
+            "estimated_completion_minutes": 15,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+    if order_docs:
+        await db.orders.insert_many(order_docs)
+
+    return {
+        "restaurant_id": restaurant_id,
+        "users": users,
+        "tokens": {role: server.create_access_token({"sub": user["id"]}) for role, user in users.items()},
+        "items": items,
+        "tables": table_docs,
+    }
+
+
+@pytest.fixture
+def restaurant(run, db):
+    return run(seed_restaurant(db))
+
+
+@pytest.fixture(params=DATA_SIZES, ids=lambda size: f"{size}-orders")
+def sized_restaurant(request, run, db):
+    return run(seed_restaurant(db, orders=request.param))
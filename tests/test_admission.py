@@ -0,0 +1,127 @@
+"""Priority tiers, concurrency gates and 503 shedding in AdmissionControlMiddleware."""
+import asyncio
+
+import pytest
+
+from backend import server
+from tests.conftest import auth, seed_restaurant
+
+
+@pytest.mark.parametrize("method,path,tier", [
+    ("POST", "/api/orders", "critical"),
+    ("GET", "/api/public/menu/table-1", "critical"),
+    ("PUT", "/api/kitchen/orders/order-1/status", "critical"),
+    ("GET", "/api/owner/stats", "analytics"),
+    ("GET", "/api/admin/users", "analytics"),
+    ("GET", "/api/kitchen/orders", "normal"),
+    ("GET", "/api/public/menu/table-1/stream", None),
+    ("GET", "/static/js/main.js", None),
+])
+def test_admission_tier(method, path, tier):
+    assert server.admission_tier(method, path) == tier
+
+
+@pytest.mark.parametrize("query,tier", [
+    (b"", "analytics"),
+    (b"sections=stats,orders", "analytics"),
+    (b"sections=orders", "normal"),
+    (b"sections=categories%2Citems&include_qr=true", "normal"),
+])
+def test_dashboard_tier_follows_sections(query, tier):
+    assert server.admission_tier("GET", "/api/owner/dashboard", query) == tier
+
+
+def test_operational_dashboard_sections_are_not_shed(monkeypatch, run, api, restaurant):
+    monkeypatch.setitem(server.admission.in_flight, "critical", server.ADMISSION_PRESSURE_THRESHOLD)
+    headers = auth(restaurant["tokens"]["owner"])
+
+    assert run(api.get("/api/owner/dashboard?sections=orders", headers=headers)).status_code == 200
+    assert run(api.get("/api/owner/dashboard?sections=stats", headers=headers)).status_code == 503
+
+
+def test_gate_queues_hands_off_and_times_out(run):
+    async def scenario():
+        gate = server.AdmissionGate(limit=1, max_waiters=1)
+        assert await gate.acquire(0)
+        assert not await gate.acquire(0)
+
+        waiting = asyncio.ensure_future(gate.acquire(1))
+        await asyncio.sleep(0)
+        assert not await gate.acquire(1), "queue is full"
+        gate.release()
+        assert await waiting
+        assert gate.in_flight == 1
+
+        assert not await gate.acquire(0.01)
+        gate.release()
+        return gate
+
+    assert run(scenario()).idle
+
+
+def test_analytics_shed_under_pressure(monkeypatch, run, api, restaurant):
+    monkeypatch.setitem(server.admission.in_flight, "critical", server.ADMISSION_PRESSURE_THRESHOLD)
+    shed_before = server.admission.shed["analytics"]
+
+    response = run(api.get("/api/owner/stats", headers=auth(restaurant["tokens"]["owner"])))
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(server.ADMISSION_RETRY_AFTER_SECONDS)
+    assert server.admission.shed["analytics"] == shed_before + 1
+
+    item = restaurant["items"][0]
+    order = run(api.post("/api/orders", json={
+        "table_id": restaurant["tables"][0]["id"],
+        "items": [{"menu_item_id": item["id"], "name": item["name"], "price": item["price"], "quantity": 1}],
+        "payment_method": "cash",
+    }))
+    assert order.status_code == 200
+
+
+def test_restaurant_gate_is_per_restaurant(monkeypatch, run, api, db, restaurant):
+    owner = restaurant["users"]["owner"]
+    run(db.users.update_one({"id": owner["id"]}, {"$set": {"password": server.hash_password("secret")}}))
+    login = run(api.post("/api/auth/login", json={"email": owner["email"], "password": "secret"}))
+    token = login.json()["access_token"]
+    assert server.jwt.decode(token, server.SECRET_KEY, algorithms=[server.ALGORITHM])["rid"] == restaurant["restaurant_id"]
+    other = run(seed_restaurant(db, seed=1))
+
+    monkeypatch.setattr(server, "ADMISSION_QUEUE_TIMEOUT_SECONDS", 0.01)
+
+    def tables(token, limit=0):
+        # An idle gate is dropped after shedding, so the limit is set on the current one each time
+        server.admission.restaurant_gate(restaurant["restaurant_id"]).limit = limit
+        return run(api.get("/api/owner/tables", headers=auth(token))).status_code
+
+    assert tables(token) == 503
+    # Tokens issued before the rid claim resolve the restaurant through the user
+    assert tables(restaurant["tokens"]["owner"]) == 503
+    assert tables(other["tokens"]["owner"]) == 200
+    assert tables(token, limit=server.ADMISSION_RESTAURANT_LIMIT) == 200
+    assert restaurant["restaurant_id"] not in server.admission.restaurant_gates
+
+
+def lag_monitor(monkeypatch, samples):
+    monitor = server.LoopMonitor()
+    now = server.time.monotonic()
+    for seconds_ago, lag_ms in samples:
+        monitor.record(lag_ms, at=now - seconds_ago)
+    monkeypatch.setattr(server, "loop_monitor", monitor)
+    return monitor
+
+
+def steady(seconds, lag_ms, step=0.05):
+    return [(seconds - i * step, lag_ms) for i in range(int(seconds / step))]
+
+
+@pytest.mark.parametrize("samples,pressure", [
+    ([*steady(4, 1), (0.5, 400)], False),
+    (steady(1, 1) + [(0.2, 400)] * 3, False),
+    (steady(4, 1)[:60] + steady(1, 150), False),
+    (steady(3, 150), True),
+    ([(at, 150 if i % 5 else 1) for i, (at, _) in enumerate(steady(3, 0))], True),
+])
+def test_only_sustained_loop_lag_sheds_analytics(monkeypatch, samples, pressure):
+    lag_monitor(monkeypatch, samples)
+
+    assert server.admission.under_pressure is pressure
@@ -0,0 +1,61 @@
+"""Per-worker caches and the invalidation bus (change-stream events and the
+cache_versions polling fallback)."""
+from datetime import datetime, timedelta, timezone
+
+from backend import server
+from tests.conftest import auth
+
+
+def test_menu_edit_is_visible_on_next_guest_load(run, api, restaurant):
+    table_id = restaurant["tables"][0]["id"]
+    item = restaurant["items"][0]
+    run(api.get(f"/api/public/menu/{table_id}"))
+
+    run(api.put(f"/api/owner/menu/items/{item['id']}", headers=auth(restaurant["tokens"]["owner"]), json={
+        "category_id": item["category_id"], "name": "Renamed", "description": "", "price": 1.0,
+    }))
+
+    menu = run(api.get(f"/api/public/menu/{table_id}")).json()
+    assert next(i for i in menu["items"] if i["id"] == item["id"])["name"] == "Renamed"
+
+
+def test_polling_fallback_evicts_other_workers(monkeypatch, run, restaurant):
+    bus = server.InvalidationBus()
+    bus.last_seen = datetime.now(timezone.utc) - timedelta(seconds=1)
+    restaurant_id = restaurant["restaurant_id"]
+    run(server.menu_cache.get(restaurant_id, lambda: server.load_public_menu(restaurant_id)))
+
+    # Başka bir worker'ın yazması: kendi önbelleğini temizler ve sürüm yayınlar
+    monkeypatch.setattr(server, "invalidation_bus", server.InvalidationBus())
+    run(server.invalidate_cache("menu", restaurant_id))
+    run(server.menu_cache.get(restaurant_id, lambda: server.load_public_menu(restaurant_id)))
+
+    run(bus.poll_once())
+
+    assert restaurant_id not in server.menu_cache.entries
+    assert bus.lag.count == 1
+    run(bus.poll_once())
+    assert bus.events == 1
+
+
+def test_change_events_map_to_cache_entries(run, restaurant):
+    bus = server.InvalidationBus()
+    user = restaurant["users"]["owner"]
+    hits = server.principal_cache.hits
+    run(server.get_user_from_token(restaurant["tokens"]["owner"]))
+    run(server.get_user_from_token(restaurant["tokens"]["owner"]))
+    assert server.principal_cache.hits == hits + 1
+
+    bus.apply_change({
+        "operationType": "update",
+        "ns": {"db": "benchmark", "coll": "users"},
+        "fullDocument": user,
+        "wallTime": datetime.now(timezone.utc),
+    })
+    assert user["id"] not in server.principal_cache.entries
+
+    table_id = restaurant["tables"][0]["id"]
+    run(server.table_cache.get(table_id, lambda: server.table_loader.load(table_id)))
+    bus.apply_change({"operationType": "delete", "ns": {"db": "benchmark", "coll": "tables"}, "documentKey": {"_id": 1}})
+    assert server.table_cache.entries == {}
+    assert bus.snapshot()["lag"]["count"] == 1
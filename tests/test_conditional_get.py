@@ -0,0 +1,67 @@
+"""ETag / If-None-Match on the polled order and waiter-call lists."""
+import pytest
+
+from backend import server
+from tests.conftest import auth
+
+
+def poll(run, api, path, token, etag=None):
+    headers = auth(token)
+    if etag:
+        headers["If-None-Match"] = etag
+    return run(api.get(path, headers=headers))
+
+
+@pytest.mark.parametrize("role,path", [
+    ("kitchen", "/api/kitchen/orders"),
+    ("cashier", "/api/cashier/orders"),
+    ("owner", "/api/owner/orders"),
+])
+def test_idle_poll_is_not_modified(monkeypatch, run, api, restaurant, role, path):
+    token = restaurant["tokens"][role]
+    first = poll(run, api, path, token)
+    etag = first.headers["etag"]
+
+    async def must_not_query(*args):
+        raise AssertionError("orders collection queried for a 304")
+    monkeypatch.setattr(server, "role_order_list", must_not_query)
+
+    response = poll(run, api, path, token, etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_order_write_changes_etag(run, api, restaurant):
+    token = restaurant["tokens"]["kitchen"]
+    etag = poll(run, api, "/api/kitchen/orders", token).headers["etag"]
+    item = restaurant["items"][0]
+    run(api.post("/api/orders", json={
+        "table_id": restaurant["tables"][0]["id"],
+        "items": [{"menu_item_id": item["id"], "name": item["name"], "price": item["price"], "quantity": 1}],
+        "payment_method": "cash",
+    }))
+
+    response = poll(run, api, "/api/kitchen/orders", token, etag)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.headers["etag"] != etag
+
+
+def test_waiter_call_changes_etag(run, api, restaurant):
+    token = restaurant["tokens"]["owner"]
+    etag = poll(run, api, "/api/owner/waiter-calls", token).headers["etag"]
+    assert poll(run, api, "/api/owner/waiter-calls", token, etag).status_code == 304
+
+    run(api.post("/api/waiter-call", json={"table_id": restaurant["tables"][0]["id"]}))
+
+    assert poll(run, api, "/api/owner/waiter-calls", token, etag).status_code == 200
+
+
+def test_not_modified_poll(benchmark, run, api, sized_restaurant):
+    token = sized_restaurant["tokens"]["owner"]
+    etag = poll(run, api, "/api/owner/orders", token).headers["etag"]
+
+    response = benchmark(lambda: poll(run, api, "/api/owner/orders", token, etag))
+
+    assert response.status_code == 304
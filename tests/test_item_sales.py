@@ -0,0 +1,69 @@
+"""Popular items: hourly/daily sales buckets, their retention and the hour/day/week rollup."""
+from datetime import datetime, timedelta, timezone
+
+from backend import server
+
+# Buckets expire by wall-clock TTL (mongomock too), so the fixed "now" sits just ahead of the real clock
+NOW = (datetime.now(timezone.utc) + timedelta(days=1)).replace(hour=12, minute=30, second=0, microsecond=0)
+
+
+def sale(created_at, *items):
+    return server.Order(
+        restaurant_id="r1", table_id="t1", table_number="1", total_amount=0, payment_method="cash", created_at=created_at,
+        items=[server.OrderItem(menu_item_id=item_id, name=item_id.title(), price=1, quantity=quantity) for item_id, quantity in items],
+    )
+
+
+def naive(value):
+    return value.replace(tzinfo=None)
+
+
+def test_sales_upsert_hour_and_day_buckets(run, db):
+    first = NOW.replace(minute=5)
+    run(server.record_item_sales(sale(first, ("soup", 2), ("tea", 1))))
+    run(server.record_item_sales(sale(NOW, ("soup", 1), ("bad.key", 4))))
+
+    buckets = {doc["window"]: doc for doc in run(db.item_sales.find({"restaurant_id": "r1"}, {"_id": 0}).to_list(None))}
+
+    assert {window: doc["bucket"] for window, doc in buckets.items()} == server.item_sales_buckets(NOW)
+    for window, doc in buckets.items():
+        assert doc["counts"] == {"soup": 3, "tea": 1}
+        assert doc["names"] == {"soup": "Soup", "tea": "Tea"}
+        assert naive(doc["expires_at"]) == naive(first + server.ITEM_SALES_RETENTION[window])
+
+
+def test_popular_items_roll_up_hour_day_and_week(run, db):
+    run(server.record_item_sales(sale(NOW.replace(minute=10), ("soup", 3))))
+    run(server.record_item_sales(sale(NOW.replace(hour=9), ("tea", 5))))
+    run(server.record_item_sales(sale(NOW - timedelta(days=3), ("cake", 9))))
+    run(server.record_item_sales(sale(NOW - timedelta(days=9), ("soup", 50))))
+
+    popular = run(server.popular_items_by_window("r1", limit=2, now=NOW))
+
+    assert popular["hour"] == [{"menu_item_id": "soup", "name": "Soup", "count": 3}]
+    assert [(i["menu_item_id"], i["count"]) for i in popular["day"]] == [("tea", 5), ("soup", 3)]
+    assert [(i["menu_item_id"], i["count"]) for i in popular["week"]] == [("cake", 9), ("tea", 5)]
+
+
+def test_backfill_counts_recent_orders_once(run, db):
+    now = datetime.now(timezone.utc)
+
+    def stored(created_at, *items):
+        doc = sale(created_at, *items).model_dump()
+        doc["created_at"] = doc["updated_at"] = created_at.isoformat()
+        return doc
+
+    recent = now - timedelta(minutes=20)
+    run(db.orders.insert_many([
+        stored(recent, ("soup", 2)),
+        stored(now - timedelta(days=3), ("tea", 4)),
+        stored(now - timedelta(days=20), ("cake", 7)),
+    ]))
+
+    for _ in range(2):
+        run(server.run_migration("item_sales_backfill", server.backfill_item_sales))
+
+    popular = run(server.popular_items_by_window("r1", now=recent))
+    assert [(i["menu_item_id"], i["count"]) for i in popular["hour"]] == [("soup", 2)]
+    assert [(i["menu_item_id"], i["count"]) for i in popular["week"]] == [("tea", 4), ("soup", 2)]
+    assert run(db.migrations.find_one({"id": "item_sales_backfill"}))["completed_at"]
@@ -0,0 +1,88 @@
+"""Busy-service simulation for the KitchenLoad ETA model.
+
+A FIFO kitchen with a fixed number of cooks receives a rush of tickets. The
+model only sees what the server sees (order creation and the ready
+transition), and its ETAs are compared with the old max-prep-time estimate.
+"""
+import heapq
+import random
+
+from backend import server
+
+
+def simulate_service(orders=600, cooks=4, mean_gap_seconds=200, seed=7):
+    rng = random.Random(seed)
+    load = server.KitchenLoad(parallel_tickets=3)
+    cook_free_at = [0.0] * cooks
+    pending_ready = []
+    now = 0.0
+    errors_model, errors_naive = [], []
+
+    for index in range(orders):
+        now += rng.expovariate(1 / mean_gap_seconds)
+        while pending_ready and pending_ready[0][0] <= now:
+            ready_at, order_id = heapq.heappop(pending_ready)
+            load.transition(order_id, "ready", now=ready_at)
+
+        prep_minutes = rng.randint(5, 20)
+        eta_minutes = load.estimate(prep_minutes)
+        order_id = f"order-{index}"
+        load.add(order_id, prep_minutes, created_at=now)
+
+        start = max(now, heapq.heappop(cook_free_at))
+        ready_at = start + prep_minutes * 60
+        heapq.heappush(cook_free_at, ready_at)
+        heapq.heappush(pending_ready, (ready_at, order_id))
+
+        actual_minutes = (ready_at - now) / 60
+        errors_model.append(abs(eta_minutes - actual_minutes))
+        errors_naive.append(abs(prep_minutes - actual_minutes))
+
+    return load, sum(errors_model) / orders, sum(errors_naive) / orders
+
+
+def test_eta_tracks_queue_better_than_max_prep():
+    load, model_error, naive_error = simulate_service()
+
+    assert load.calibration_samples > 0
+    assert model_error < naive_error * 0.5
+
+
+def test_backlog_drains_when_tickets_leave_the_kitchen():
+    load = server.KitchenLoad(parallel_tickets=2)
+    load.add("a", 10, created_at=0)
+    load.add("b", 20, created_at=0)
+
+    assert load.estimate(10) == 25
+
+    load.transition("a", "preparing", now=60)
+    load.transition("a", "ready", now=600)
+    load.transition("b", "completed", now=900)
+
+    assert load.backlog_minutes == 0
+    assert load.estimate(10) >= 10
+
+
+def test_busy_service_simulation(benchmark):
+    _, model_error, naive_error = benchmark(simulate_service, orders=2000)
+
+    assert model_error < naive_error
+
+
+def test_prep_board_counts_and_deltas():
+    load = server.KitchenLoad()
+    load.add("a", 10, items=[("adana", "Adana", 2), ("ayran", "Ayran", 1)])
+    load.add("b", 10, items=[("adana", "Adana", 3)])
+    seq = load.board_seq
+
+    load.transition("a", "preparing")
+    load.transition("b", "ready")
+
+    board = {row["menu_item_id"]: row for row in load.board_snapshot()}
+    assert board["adana"]["pending"] == 0
+    assert board["adana"]["preparing"] == 2
+    assert board["ayran"]["preparing"] == 1
+    assert sum(d["delta"] for d in load.board_deltas_since(seq) if d["menu_item_id"] == "adana") == -3
+
+    load.reset_board_feed(load.board_seq)
+    assert load.board_deltas_since(seq) is None
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from backend import server
+
+
+def test_sketch_quantiles_stay_within_relative_accuracy():
+    rng = random.Random(3)
+    samples = sorted(rng.lognormvariate(6, 0.6) for _ in range(20000))
+    sketch = server.LatencySketch()
+    for value in samples:
+        sketch.add(value)
+
+    for q in server.LATENCY_QUANTILES:
+        exact = samples[int(q * (len(samples) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= exact * server.LATENCY_SKETCH_ACCURACY * 1.01
+
+
+def test_sketch_survives_mongo_round_trip():
+    sketch = server.LatencySketch()
+    for value in (0.2, 45, 300, 301, 1800):
+        sketch.add(value)
+
+    doc = {"b": {}, "zero": 0, "count": 0}
+    for path, value in sketch.to_inc("s").items():
+        _, field, *rest = path.split(".")
+        if field == "b":
+            doc["b"][rest[0]] = value
+        else:
+            doc[field] = value
+    restored = server.LatencySketch.from_doc(doc)
+
+    assert restored.count == 5
+    assert restored.summary() == sketch.summary()
+
+
+def test_sketch_add(benchmark):
+    sketch = server.LatencySketch()
+
+    benchmark(sketch.add, 420.0)
+
+    assert sketch.count > 0
+
+
+def test_failed_flush_keeps_pending_deltas(run, db, monkeypatch):
+    latency = server.RestaurantLatency()
+    latency.record("prep", 300.0, [{"menu_item_id": "soup", "name": "Soup"}])
+    monkeypatch.setitem(server.kitchen_latency, "r1", latency)
+
+    async def unavailable(*args, **kwargs):
+        raise RuntimeError("primary stepped down")
+
+    monkeypatch.setattr(server.db.kitchen_latency, "update_one", unavailable)
+    with pytest.raises(RuntimeError):
+        run(server.flush_kitchen_latency())
+    assert latency.pending["prep"]["soup"].count == 1
+
+    monkeypatch.delattr(server.db.kitchen_latency, "update_one")
+    run(server.flush_kitchen_latency())
+    stored = run(db.kitchen_latency.find_one({"restaurant_id": "r1"}, {"_id": 0}))
+    assert server.LatencySketch.from_doc(stored["sketches"]["prep"]["soup"]).count == 1
+    assert not latency.has_pending()
@@ -0,0 +1,52 @@
+"""Single-flight and batched lookups for the guest-facing table/restaurant reads."""
+import asyncio
+
+from backend import server
+
+
+def fresh_stats(monkeypatch):
+    for loader in (server.table_loader, server.restaurant_loader, server.menu_flight):
+        monkeypatch.setattr(loader, "stats", server.LookupStats())
+
+
+def test_concurrent_menu_loads_share_queries(monkeypatch, run, api, restaurant):
+    fresh_stats(monkeypatch)
+    table_id = restaurant["tables"][0]["id"]
+
+    async def bus_group(phones=40):
+        return await asyncio.gather(*[server.get_menu_by_table(table_id) for _ in range(phones)])
+
+    menus = run(bus_group())
+
+    assert all(len(menu["items"]) == len(restaurant["items"]) for menu in menus)
+    metrics = server.lookup_metrics()
+    assert metrics["tables"]["queries"] == 1
+    assert metrics["restaurants"]["queries"] == 1
+    assert metrics["public_menu"]["queries"] == 1
+    assert metrics["tables"]["coalescing_ratio"] > 0.9
+
+
+def test_distinct_tables_are_batched(monkeypatch, run, restaurant):
+    fresh_stats(monkeypatch)
+    table_ids = [table["id"] for table in restaurant["tables"]] + ["missing"]
+
+    async def load_all():
+        return await asyncio.gather(*[server.table_loader.load(table_id) for table_id in table_ids])
+
+    tables = run(load_all())
+
+    assert [t["id"] for t in tables[:-1]] == table_ids[:-1]
+    assert tables[-1] is None
+    assert server.table_loader.stats.queries == 1
+    assert server.table_loader.stats.batched == len(table_ids) - 1
+
+
+def test_concurrent_menu_loads(benchmark, run, api, restaurant):
+    table_id = restaurant["tables"][0]["id"]
+
+    async def bus_group(phones=40):
+        return await asyncio.gather(*[api.get(f"/api/public/menu/{table_id}") for _ in range(phones)])
+
+    responses = benchmark(lambda: run(bus_group()))
+
+    assert all(response.status_code == 200 for response in responses)
@@ -0,0 +1,46 @@
+"""Event-loop lag sampling, the debug blocking watchdog and per-route latency metrics."""
+import asyncio
+import time
+
+from backend import server
+from tests.conftest import auth
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+def test_lag_and_blocking_stack(run):
+    monitor = server.LoopMonitor()
+
+    async def scenario():
+        sampler = asyncio.ensure_future(monitor.sample())
+        await asyncio.sleep(server.LOOP_LAG_INTERVAL_SECONDS * 2)
+        monitor.start_watchdog(threshold_ms=50)
+        try:
+            block_the_loop(0.3)
+            await asyncio.sleep(server.LOOP_LAG_INTERVAL_SECONDS * 2)
+        finally:
+            monitor.stop_watchdog()
+            sampler.cancel()
+
+    run(scenario())
+
+    snapshot = monitor.snapshot()
+    assert snapshot["max_ms"] >= 200
+    assert snapshot["lag"]["count"] >= 3
+    assert len(snapshot["blocked"]) == 1
+    assert "block_the_loop" in snapshot["blocked"][0]["stack"]
+    assert snapshot["blocked"][0]["blocked_ms"] >= 100
+
+
+def test_route_metrics_use_route_templates(run, api, restaurant):
+    table_id = restaurant["tables"][0]["id"]
+    run(api.get(f"/api/public/menu/{table_id}"))
+    run(api.get("/api/public/menu/missing-table"))
+
+    metrics = run(api.get("/api/admin/metrics", headers=auth(restaurant["tokens"]["admin"]))).json()
+
+    assert metrics["routes"]["GET /api/public/menu/{table_id}"]["count"] >= 2
+    assert not any(table_id in route for route in metrics["routes"])
+    assert {"lag", "ewma_ms", "max_ms", "blocked"} <= set(metrics["event_loop"])
@@ -0,0 +1,143 @@
+"""Menu image ingestion: variants are rendered in the process pool and served
+from /media under content-hashed, immutable URLs."""
+import functools
+import io
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from backend import server
+from tests.conftest import auth, seed_restaurant
+
+
+def sample_image(width=2000, height=1500, fmt="PNG"):
+    out = io.BytesIO()
+    mode = "RGBA" if fmt == "PNG" else "RGB"
+    Image.new(mode, (width, height), (200, 80, 20, 255)[:len(mode)]).save(out, fmt)
+    return out.getvalue()
+
+
+def test_render_image_variants(benchmark):
+    variants = benchmark(server.render_image_variants, sample_image(fmt="JPEG"))
+
+    sizes = {(v["size"], v["format"]): (v["width"], v["height"]) for v in variants}
+    assert sizes[("thumb", "webp")] == (160, 120)
+    assert sizes[("large", "jpeg")] == (1280, 960)
+
+
+def test_upload_image_and_serve_variants(run, api, restaurant):
+    headers = auth(restaurant["tokens"]["owner"])
+    item = restaurant["items"][0]
+
+    response = run(api.post(
+        f"/api/owner/menu/items/{item['id']}/image",
+        content=sample_image(),
+        headers={**headers, "Content-Type": "image/png"},
+    ))
+
+    assert response.status_code == 200
+    variants = response.json()["image_variants"]
+    assert set(variants) == set(server.MENU_IMAGE_SIZES)
+    assert response.json()["image_url"] == variants["small"]["jpeg"]
+
+    menu = run(api.get(f"/api/public/menu/{restaurant['tables'][0]['id']}")).json()
+    assert next(i for i in menu["items"] if i["id"] == item["id"])["image_variants"] == variants
+
+    image = run(api.get(variants["thumb"]["webp"]))
+    assert image.status_code == 200
+    assert image.headers["cache-control"] == server.IMMUTABLE_CACHE_CONTROL
+    assert image.headers["content-type"] == "image/webp"
+
+
+def test_replacing_image_url_drops_only_own_variants(run, api, db, restaurant):
+    variants = {"small": {"jpeg": "/media/old-small.jpg"}}
+    other = run(seed_restaurant(db, seed=1))
+    own, foreign = restaurant["items"][0], other["items"][0]
+    for item in (own, foreign):
+        run(db.menu_items.update_one({"id": item["id"]}, {"$set": {"image_variants": variants, "image_url": "/media/old-small.jpg"}}))
+    headers = auth(restaurant["tokens"]["owner"])
+
+    def put(item):
+        return run(api.put(f"/api/owner/menu/items/{item['id']}", headers=headers, json={
+            "category_id": item["category_id"], "name": item["name"], "description": "",
+            "price": item["price"], "image_url": "https://cdn.example.com/new.jpg",
+        }))
+
+    assert put(foreign).status_code == 404
+    assert put(own).status_code == 200
+    assert "image_variants" not in run(db.menu_items.find_one({"id": own["id"]}))
+    assert run(db.menu_items.find_one({"id": foreign["id"]}))["image_variants"] == variants
+
+
+def test_upload_rejects_non_images(run, api, restaurant):
+    response = run(api.post(
+        f"/api/owner/menu/items/{restaurant['items'][0]['id']}/image",
+        content=b"not an image",
+        headers={**auth(restaurant["tokens"]["owner"]), "Content-Type": "image/png"},
+    ))
+
+    assert response.status_code == 400
+
+
+def test_upload_stops_reading_past_the_size_limit(run, api, restaurant, monkeypatch):
+    monkeypatch.setattr(server, "MENU_IMAGE_MAX_BYTES", 1000)
+
+    response = run(api.post(
+        f"/api/owner/menu/items/{restaurant['items'][0]['id']}/image",
+        content=sample_image(),
+        headers={**auth(restaurant["tokens"]["owner"]), "Content-Type": "image/png"},
+    ))
+
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/menu.png", "http://10.1.2.3/menu.png", "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/menu.png", "http://[::ffff:192.168.1.1]/menu.png", "http://localhost:8001/menu.png", "ftp://93.184.216.34/menu.png",
+])
+def test_download_rejects_internal_addresses(run, url):
+    with pytest.raises(HTTPException) as error:
+        run(server.download_image(url))
+
+    assert error.value.status_code == 400
+
+
+def mock_remote(monkeypatch, handler):
+    seen = []
+
+    def record(request):
+        seen.append((str(request.url), request.headers["host"]))
+        return handler(request)
+
+    client = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(record))
+    monkeypatch.setattr(server.httpx, "AsyncClient", client)
+    return seen
+
+
+def test_download_rechecks_every_redirect_hop(run, monkeypatch):
+    seen = mock_remote(monkeypatch, lambda request: httpx.Response(302, headers={"Location": "http://127.0.0.1:8001/admin"}))
+
+    with pytest.raises(HTTPException) as error:
+        run(server.download_image("http://93.184.216.34/menu.png"))
+
+    assert error.value.status_code == 400
+    assert seen == [("http://93.184.216.34/menu.png", "93.184.216.34")]
+
+
+def test_download_follows_public_redirects_with_generic_errors(run, monkeypatch):
+    image = sample_image(40, 30)
+    routes = {
+        "/menu.png": httpx.Response(301, headers={"Location": "http://93.184.216.35:8080/cdn/menu.png"}),
+        "/cdn/menu.png": httpx.Response(200, content=image),
+        "/gone.png": httpx.Response(404, text="secret upstream detail"),
+    }
+    seen = mock_remote(monkeypatch, lambda request: routes[request.url.path])
+
+    assert run(server.download_image("http://93.184.216.34/menu.png")) == image
+    assert seen[-1] == ("http://93.184.216.35:8080/cdn/menu.png", "93.184.216.35:8080")
+
+    with pytest.raises(HTTPException) as error:
+        run(server.download_image("http://93.184.216.34/gone.png"))
+    assert error.value.detail == "Image download failed"
@@ -0,0 +1,111 @@
+"""Live guest-menu channel: availability/price deltas over SSE and the 409 on
+ordering items that are no longer available."""
+import asyncio
+
+from starlette.requests import Request
+
+from backend import server
+from tests.conftest import auth, seed_restaurant
+
+
+def guest_request(last_event_id=None):
+    headers = [(b"last-event-id", last_event_id.encode())] if last_event_id else []
+    never = asyncio.Event()
+
+    async def receive():
+        await never.wait()
+
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers}, receive)
+
+
+def open_stream(broadcast, restaurant_id, last_event_id=None):
+    return broadcast.stream(restaurant_id, guest_request(last_event_id)).body_iterator
+
+
+def test_availability_change_reaches_open_menus(run, api, restaurant):
+    item = restaurant["items"][0]
+    stream = open_stream(server.menu_events, restaurant["restaurant_id"])
+    assert ": connected" in run(stream.__anext__())
+
+    run(api.put(f"/api/owner/menu/items/{item['id']}", headers=auth(restaurant["tokens"]["owner"]), json={
+        "category_id": item["category_id"], "name": item["name"], "description": "",
+        "price": 99.0, "available": False,
+    }))
+
+    frame = run(asyncio.wait_for(stream.__anext__(), 1))
+    assert "event: item" in frame
+    assert f'"id": "{item["id"]}"' in frame
+    assert '"available": false' in frame and '"price": 99.0' in frame
+    run(stream.aclose())
+    assert restaurant["restaurant_id"] not in server.menu_events.channels
+
+
+def test_foreign_or_missing_item_is_not_published(run, api, db, restaurant):
+    other = run(seed_restaurant(db, seed=1))
+    foreign = other["items"][0]
+    stream = open_stream(server.menu_events, restaurant["restaurant_id"])
+    assert ": connected" in run(stream.__anext__())
+    headers = auth(restaurant["tokens"]["owner"])
+    body = {"category_id": foreign["category_id"], "name": "Leaked", "description": "", "price": 1.0, "available": True}
+
+    for item_id in (foreign["id"], "missing-item"):
+        assert run(api.put(f"/api/owner/menu/items/{item_id}", headers=headers, json=body)).status_code == 404
+
+    assert run(db.menu_items.find_one({"id": foreign["id"]}))["name"] == foreign["name"]
+    assert server.menu_events.channels[restaurant["restaurant_id"]].seq == 0
+    run(stream.aclose())
+
+
+def test_reconnect_replays_or_resets(run):
+    broadcast = server.RestaurantBroadcast(history=4)
+    first = open_stream(broadcast, "r1")
+    connected = run(first.__anext__())
+    last_id = connected.split("\n")[0][len("id: "):]
+
+    broadcast.publish("r1", "item", {"id": "a", "available": False})
+    broadcast.publish("r1", "item", {"id": "b", "available": False})
+    resumed = open_stream(broadcast, "r1", last_id)
+    replay = run(resumed.__anext__())
+    assert replay.count("event: item") == 2
+
+    for i in range(5):
+        broadcast.publish("r1", "item", {"id": str(i), "available": True})
+    assert "event: reset" in run(open_stream(broadcast, "r1", last_id).__anext__())
+    assert "event: reset" in run(open_stream(broadcast, "r1", "other-epoch.1").__anext__())
+
+
+def test_fan_out_to_idle_guests(benchmark, run):
+    broadcast = server.RestaurantBroadcast()
+
+    async def fan_out(guests=2000):
+        streams = [open_stream(broadcast, "busy") for _ in range(guests)]
+        await asyncio.gather(*[s.__anext__() for s in streams])
+        waiting = [asyncio.ensure_future(s.__anext__()) for s in streams]
+        await asyncio.sleep(0)
+        broadcast.publish("busy", "item", {"id": "x", "available": False})
+        frames = await asyncio.gather(*waiting)
+        await asyncio.gather(*[s.aclose() for s in streams])
+        return frames
+
+    frames = benchmark.pedantic(lambda: run(fan_out()), rounds=3)
+
+    assert len(frames) == 2000 and all("event: item" in f for f in frames)
+    assert broadcast.channels == {}
+
+
+def test_order_with_unavailable_item_is_rejected(run, api, db, restaurant):
+    item = restaurant["items"][0]
+    run(api.put(f"/api/owner/menu/items/{item['id']}", headers=auth(restaurant["tokens"]["owner"]), json={
+        "category_id": item["category_id"], "name": item["name"], "description": "",
+        "price": item["price"], "available": False,
+    }))
+
+    response = run(api.post("/api/orders", json={
+        "table_id": restaurant["tables"][0]["id"],
+        "items": [{"menu_item_id": item["id"], "name": item["name"], "price": item["price"], "quantity": 1}],
+        "payment_method": "cash",
+    }))
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["unavailable_items"] == [item["id"]]
+    assert run(db.orders.count_documents({})) == 0
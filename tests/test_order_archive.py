@@ -0,0 +1,48 @@
+"""Order archive: completed orders move to monthly partitions and totals read across them."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from backend import server
+
+
+def order(restaurant_id, created_at, status="completed", total=10.0):
+    created = created_at.isoformat()
+    return {
+        "id": str(uuid.uuid4()), "restaurant_id": restaurant_id, "table_id": "t", "table_number": "1",
+        "items": [], "total_amount": total, "payment_method": "cash", "status": status,
+        "created_at": created, "updated_at": created,
+    }
+
+
+def test_archive_moves_old_completed_orders(run, db, restaurant):
+    restaurant_id = restaurant["restaurant_id"]
+    now = datetime.now(timezone.utc)
+    old_completed = [order(restaurant_id, now - timedelta(days=days)) for days in (40, 75)]
+    old_open = order(restaurant_id, now - timedelta(days=50), status="pending")
+    recent = order(restaurant_id, now - timedelta(days=1))
+    run(db.orders.insert_many([*old_completed, old_open, recent]))
+
+    assert run(server.archive_completed_orders(older_than_days=30)) == 2
+
+    hot = {o["id"] for o in run(db.orders.find({}, {"_id": 0, "id": 1}).to_list(None))}
+    assert hot == {old_open["id"], recent["id"]}
+    for archived in old_completed:
+        partition = db[server.order_archive_name(archived["created_at"])]
+        assert run(partition.find_one({"id": archived["id"]}, {"_id": 0}))["status"] == "completed"
+
+    assert run(server.order_totals({"restaurant_id": restaurant_id})) == (4, 40.0)
+    assert run(server.order_totals({"restaurant_id": restaurant_id}, now - timedelta(days=45))) == (2, 20.0)
+    assert run(server.order_totals({"restaurant_id": restaurant_id}, include_hot=False)) == (2, 20.0)
+
+
+def test_reads_see_partition_created_by_another_worker(run, db, restaurant, monkeypatch):
+    monkeypatch.setattr(server, "ORDER_ARCHIVE_AFTER_DAYS", 30)
+    restaurant_id = restaurant["restaurant_id"]
+    assert run(server.order_totals({"restaurant_id": restaurant_id})) == (0, 0)
+
+    # The cached partition list is fresh and empty; another worker now archives at the cutoff month
+    archived = order(restaurant_id, datetime.now(timezone.utc) - timedelta(days=31))
+    run(db[server.order_archive_name(archived["created_at"])].insert_one(archived))
+
+    assert server._archive_partition_cache["names"] == []
+    assert run(server.order_totals({"restaurant_id": restaurant_id})) == (1, 10.0)
@@ -0,0 +1,74 @@
+"""Replayable per-restaurant order event log (GET /api/orders/events)."""
+from datetime import datetime, timedelta, timezone
+
+from backend import server
+from tests.conftest import auth
+
+
+def place_order(run, api, restaurant):
+    item = restaurant["items"][0]
+    return run(api.post("/api/orders", json={
+        "table_id": restaurant["tables"][0]["id"],
+        "items": [{"menu_item_id": item["id"], "name": item["name"], "price": item["price"], "quantity": 1}],
+        "payment_method": "cash",
+    })).json()
+
+
+def test_reconnecting_client_gets_only_missed_events(run, api, restaurant):
+    headers = auth(restaurant["tokens"]["kitchen"])
+    snapshot = run(api.get("/api/orders/events", headers=headers)).json()
+    assert snapshot == {"seq": 0, "snapshot": []}
+
+    order = place_order(run, api, restaurant)
+    run(api.put(f"/api/kitchen/orders/{order['id']}/status", json={"status": "preparing"}, headers=headers))
+    run(api.put(f"/api/cashier/orders/{order['id']}/payment", json={"payment_status": "paid"},
+                headers=auth(restaurant["tokens"]["cashier"])))
+
+    replay = run(api.get("/api/orders/events?since=0", headers=headers)).json()
+    assert [(e["seq"], e["type"], e.get("status")) for e in replay["events"]] == [
+        (1, "created", None), (2, "status", "preparing"), (3, "status", "completed"),
+    ]
+    assert replay["events"][0]["order"]["id"] == order["id"]
+    assert replay["events"][2]["payment_status"] == "paid"
+
+    caught_up = run(api.get(f"/api/orders/events?since={replay['seq']}", headers=headers)).json()
+    assert caught_up["events"] == []
+
+
+def test_truncated_log_falls_back_to_snapshot(run, api, db, restaurant):
+    headers = auth(restaurant["tokens"]["kitchen"])
+    place_order(run, api, restaurant)
+    place_order(run, api, restaurant)
+    run(db.order_events.delete_one({"seq": 1}))
+
+    response = run(api.get("/api/orders/events?since=0", headers=headers)).json()
+    assert response["seq"] == 2
+    assert len(response["snapshot"]) == 2
+
+    assert run(api.get("/api/orders/events?since=1", headers=headers)).json()["events"][0]["seq"] == 2
+    assert "snapshot" in run(api.get("/api/orders/events?since=99", headers=headers)).json()
+
+
+def test_recent_gap_is_not_skipped(run, db, restaurant):
+    restaurant_id = restaurant["restaurant_id"]
+    now = datetime.now(timezone.utc)
+    run(db.counters.insert_one({"_id": f"order_events:{restaurant_id}", "seq": 3}))
+    run(db.order_events.insert_many([
+        {"restaurant_id": restaurant_id, "seq": 1, "type": "updated", "order_id": "a", "created_at": now},
+        {"restaurant_id": restaurant_id, "seq": 3, "type": "updated", "order_id": "c", "created_at": now},
+    ]))
+
+    assert run(server.order_events_since(restaurant_id, 0))["seq"] == 1
+
+    run(db.order_events.update_one({"seq": 3}, {"$set": {"created_at": now - timedelta(minutes=1)}}))
+    assert run(server.order_events_since(restaurant_id, 1))["seq"] == 3
+
+
+def test_resume_from_event_log(benchmark, run, api, sized_restaurant):
+    headers = auth(sized_restaurant["tokens"]["kitchen"])
+    for _ in range(5):
+        place_order(run, api, sized_restaurant)
+
+    response = benchmark(lambda: run(api.get("/api/orders/events?since=3", headers=headers)))
+
+    assert len(response.json()["events"]) == 2
@@ -0,0 +1,68 @@
+"""Admin sampling profiler output formats and header-enabled per-request cProfile."""
+import pytest
+from starlette.middleware import Middleware
+
+from backend import server
+from tests.conftest import auth
+
+PROFILE_SECRET = "test-profile-secret"
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    # Installed at import only when PROFILE_SECRET is set: add it innermost, as server.py does, and rebuild the stack
+    monkeypatch.setattr(server, "PROFILE_SECRET", PROFILE_SECRET)
+    monkeypatch.setattr(server.app, "user_middleware", [*server.app.user_middleware, Middleware(server.RequestProfileMiddleware)])
+    monkeypatch.setattr(server.app, "middleware_stack", None)
+
+
+def test_collapsed_and_speedscope_profiles(run, api, restaurant):
+    headers = auth(restaurant["tokens"]["admin"])
+
+    collapsed = run(api.get("/api/admin/profile?seconds=0.1&interval_ms=2", headers=headers))
+
+    assert collapsed.status_code == 200
+    lines = collapsed.text.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    assert any(line.startswith("MainThread;") for line in lines)
+
+    speedscope = run(api.get("/api/admin/profile?seconds=0.1&interval_ms=2&format=speedscope", headers=headers)).json()
+
+    frames = speedscope["shared"]["frames"]
+    for profile in speedscope["profiles"]:
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(0 <= index < len(frames) for sample in profile["samples"] for index in sample)
+
+
+def test_profile_guards(run, api, restaurant):
+    assert run(api.get("/api/admin/profile?seconds=0.1", headers=auth(restaurant["tokens"]["owner"]))).status_code == 403
+    admin = auth(restaurant["tokens"]["admin"])
+    assert run(api.get(f"/api/admin/profile?seconds={server.PROFILE_MAX_SECONDS + 1}", headers=admin)).status_code == 400
+    assert run(api.get("/api/admin/profile?seconds=0.1&format=pprof", headers=admin)).status_code == 400
+
+
+def test_request_profile_header(run, api, profiling, restaurant):
+    table_id = restaurant["tables"][0]["id"]
+
+    for secret in ("wrong", "şifre"):
+        plain = run(api.get(f"/api/public/menu/{table_id}", headers={"X-Profile": secret.encode()}))
+        assert plain.status_code == 200
+        assert "x-profile-id" not in plain.headers
+
+    profiled = run(api.get(f"/api/public/menu/{table_id}", headers={"X-Profile": PROFILE_SECRET}))
+    assert profiled.status_code == 200
+    profile_id = profiled.headers["x-profile-id"]
+
+    report = run(api.get(f"/api/admin/profile/requests/{profile_id}", headers=auth(restaurant["tokens"]["admin"])))
+    assert report.text.startswith(f"GET /api/public/menu/{table_id}")
+    assert "get_menu_by_table" in report.text
+
+
+def test_request_profiler_is_not_installed_without_secret(run, api, restaurant):
+    assert not server.PROFILE_SECRET
+    assert all(middleware.cls is not server.RequestProfileMiddleware for middleware in server.app.user_middleware)
+
+    response = run(api.get(f"/api/public/menu/{restaurant['tables'][0]['id']}", headers={"X-Profile": PROFILE_SECRET}))
+    assert "x-profile-id" not in response.headers
@@ -0,0 +1,83 @@
+"""Request-scoped Mongo deadlines, 504 mapping and cancellation on client disconnect."""
+import asyncio
+
+from pymongo import _csot
+from pymongo.errors import ExecutionTimeout
+
+from backend import server
+from tests.conftest import auth
+
+
+def test_deadline_follows_admission_tier(monkeypatch, run, api, restaurant):
+    seen = []
+
+    async def fake_stats(restaurant_id):
+        seen.append(_csot.get_timeout())
+        return {}
+    monkeypatch.setattr(server, "owner_stats", fake_stats)
+
+    assert run(api.get("/api/owner/stats", headers=auth(restaurant["tokens"]["owner"]))).status_code == 200
+    assert seen == [server.REQUEST_DEADLINE_SECONDS["analytics"]]
+    assert _csot.get_timeout() is None
+
+
+def test_execution_timeout_is_504(monkeypatch, run, api, restaurant):
+    async def slow_stats(restaurant_id):
+        raise ExecutionTimeout("operation exceeded time limit", 50)
+    monkeypatch.setattr(server, "owner_stats", slow_stats)
+    timeouts = server.deadline_stats.timeouts
+
+    response = run(api.get("/api/owner/stats", headers=auth(restaurant["tokens"]["owner"])))
+
+    assert response.status_code == 504
+    assert server.deadline_stats.timeouts == timeouts + 1
+
+
+def test_disconnect_cancels_handler_and_closes_cursors(monkeypatch, run, restaurant):
+    started, disconnect = asyncio.Event(), asyncio.Event()
+    outcome = {}
+
+    async def abandoned_stats(restaurant_id):
+        cursor = server.db.orders.find({"restaurant_id": restaurant_id})
+        outcome["cursor"] = cursor
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            outcome["cancelled"] = True
+            raise
+    monkeypatch.setattr(server, "owner_stats", abandoned_stats)
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/owner/stats", "raw_path": b"/api/owner/stats", "query_string": b"", "root_path": "",
+        "headers": [(b"authorization", auth(restaurant["tokens"]["owner"])["Authorization"].encode())],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    before = server.deadline_stats.snapshot()
+
+    async def scenario():
+        request = asyncio.ensure_future(server.app(scope, receive, send))
+        await started.wait()
+        disconnect.set()
+        await asyncio.wait_for(request, 1)
+    run(scenario())
+
+    assert outcome["cancelled"]
+    assert sent == []
+    after = server.deadline_stats.snapshot()
+    assert after["disconnects"] == before["disconnects"] + 1
+    assert after["cursors_closed"] == before["cursors_closed"] + 1
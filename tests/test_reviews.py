@@ -0,0 +1,56 @@
+"""Reviews: per-restaurant rating counters, their backfill and the keyset-paginated feed."""
+import uuid
+
+from backend import server
+from tests.conftest import auth
+
+
+def review(restaurant_id, rating, created_at):
+    return {"id": str(uuid.uuid4()), "restaurant_id": restaurant_id, "order_id": None, "rating": rating, "comment": "", "created_at": created_at}
+
+
+def test_review_counters_feed_the_summaries(run, api, restaurant):
+    restaurant_id = restaurant["restaurant_id"]
+    for rating in (5, 4, 5, 1):
+        posted = run(api.post("/api/reviews", json={"restaurant_id": restaurant_id, "rating": rating, "comment": "ok"}))
+        assert posted.status_code == 200
+    assert run(api.post("/api/reviews", json={"restaurant_id": restaurant_id, "rating": 6, "comment": "x"})).status_code == 400
+
+    summary = run(api.get("/api/owner/reviews/summary", headers=auth(restaurant["tokens"]["owner"]))).json()
+    restaurants = run(api.get("/api/admin/restaurants", headers=auth(restaurant["tokens"]["admin"]))).json()
+
+    assert summary == {"count": 4, "average": 3.75, "histogram": {"1": 1, "2": 0, "3": 0, "4": 1, "5": 2}}
+    assert [r["rating"] for r in restaurants if r["id"] == restaurant_id] == [summary]
+
+
+def test_feed_pages_through_equal_timestamps(run, api, db, restaurant):
+    restaurant_id = restaurant["restaurant_id"]
+    stamps = ["2024-06-01T10:00:00+00:00"] * 3 + ["2024-06-01T09:00:00+00:00"] * 2
+    docs = [review(restaurant_id, 5, stamp) for stamp in stamps]
+    run(db.reviews.insert_many([dict(doc) for doc in docs]))
+    run(db.reviews.insert_one(review("other-restaurant", 5, stamps[0])))
+    headers = auth(restaurant["tokens"]["owner"])
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = run(api.get("/api/owner/reviews", params=params, headers=headers)).json()
+        seen.extend(r["id"] for r in page["reviews"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = sorted(docs, key=lambda d: (d["created_at"], d["id"]), reverse=True)
+    assert seen == [d["id"] for d in expected]
+
+
+def test_backfill_rebuilds_counters_from_existing_reviews(run, db, restaurant):
+    restaurant_id = restaurant["restaurant_id"]
+    run(db.reviews.insert_many([review(restaurant_id, rating, "2024-06-01T10:00:00+00:00") for rating in (2, 4, 4)]))
+    run(db.review_stats.insert_one({"restaurant_id": restaurant_id, "count": 1, "sum": 4, "histogram": {"4": 1}}))
+
+    assert run(server.backfill_review_stats(None)) == 1
+    assert run(server.backfill_review_stats(None)) == 1
+
+    stats = run(db.review_stats.find_one({"restaurant_id": restaurant_id}, {"_id": 0}))
+    assert server.rating_summary(stats) == {"count": 3, "average": 3.33, "histogram": {"1": 0, "2": 1, "3": 0, "4": 2, "5": 0}}
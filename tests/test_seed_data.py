@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+from backend import seed_data
+from tests.conftest import auth
+
+NOW = "2024-06-01T12:00:00+00:00"
+
+
+def seed_options(*args):
+    return seed_data.parse_args(["--restaurants", "3", "--orders", "3000", "--months", "3", "--workers", "1", *args])
+
+
+def test_generation_is_deterministic_under_seed():
+    options = seed_options("--now", NOW)
+    counts = seed_data.restaurant_order_counts(options)
+
+    first = seed_data.generate_restaurant(1, counts[1], options, "hash")
+    again = seed_data.generate_restaurant(1, counts[1], options, "hash")
+    other = seed_data.generate_restaurant(1, counts[1], seed_options("--now", NOW, "--seed", "7"), "hash")
+
+    assert first == again
+    assert first["restaurants"] != other["restaurants"]
+    assert sum(counts) == 3000
+
+
+def test_generated_orders_are_consistent(run):
+    options = seed_options("--now", NOW)
+    docs = seed_data.generate_restaurant(0, 2000, options, "hash")
+    orders = docs["orders"] + [o for name, batch in docs.items() if name.startswith(seed_data.ORDER_ARCHIVE_PREFIX) for o in batch]
+    now = datetime.fromisoformat(NOW)
+
+    assert len(orders) == 2000
+    assert all(datetime.fromisoformat(o["updated_at"]) <= now for o in orders)
+    assert all(o["status"] == "completed" for name, batch in docs.items() if name.startswith(seed_data.ORDER_ARCHIVE_PREFIX) for o in batch)
+    assert {o["status"] for o in orders if datetime.fromisoformat(o["created_at"]) < datetime(2024, 5, 31, tzinfo=timezone.utc)} == {"completed"}
+    open_calls = [c["table_id"] for c in docs["waiter_calls"] if c["status"] == "pending"]
+    assert len(open_calls) == len(set(open_calls))
+    stats = docs["review_stats"][0]
+    assert (stats["count"], stats["sum"]) == (len(docs["reviews"]), sum(r["rating"] for r in docs["reviews"]))
+
+
+def test_seeded_data_serves_owner_stats(run, api, db):
+    counts = run(seed_data.seed_data(db, seed_options("--password", "seed-pass")))
+
+    login = run(api.post("/api/auth/login", json={"email": "owner1@seed.qr-restaurant.com", "password": "seed-pass"}))
+    headers = auth(login.json()["access_token"])
+    restaurant_id = login.json()["user"]["restaurant_id"]
+    stats = run(api.get("/api/owner/stats", headers=headers)).json()
+    summary = run(api.get("/api/owner/reviews/summary", headers=headers)).json()
+
+    archived = sum(count for name, count in counts.items() if name.startswith(seed_data.ORDER_ARCHIVE_PREFIX))
+    assert counts["orders"] + archived == 3000
+    assert sum(stats["status_distribution"].values()) == seed_data.restaurant_order_counts(seed_options())[0]
+    assert stats["week"]["orders"] > 0 and stats["popular_items"]
+    assert summary["count"] == run(db.reviews.count_documents({"restaurant_id": restaurant_id}))
+
+
+def test_order_counts_always_sum_to_orders():
+    for restaurants, orders in ((1, 5), (7, 1000), (13, 99_999), (50, 3)):
+        counts = seed_data.restaurant_order_counts(seed_data.parse_args(["--restaurants", str(restaurants), "--orders", str(orders)]))
+        assert len(counts) == restaurants and sum(counts) == orders and min(counts) >= 0
+
+
+def test_drop_removes_only_seeded_restaurants(run, db, restaurant):
+    options = seed_options("--restaurants", "2", "--orders", "200", "--now", NOW)
+    first = run(seed_data.seed_data(db, options))
+    again = run(seed_data.seed_data(db, seed_options("--restaurants", "2", "--orders", "200", "--now", NOW, "--drop")))
+
+    assert again == first
+    assert run(db.restaurants.count_documents({})) == 3
+    assert run(db.orders.count_documents({"restaurant_id": {"$ne": restaurant["restaurant_id"]}})) == first["orders"]
+    assert run(db.users.count_documents({"restaurant_id": restaurant["restaurant_id"]})) == 3
+    assert run(db.menu_items.count_documents({"restaurant_id": restaurant["restaurant_id"]})) == len(restaurant["items"])
@@ -0,0 +1,344 @@
+"""Micro-benchmarks for backend/server.py hot paths.
+
+Endpoints are driven in-process through httpx's ASGI transport against
+mongomock, so no server or Mongo is needed; set TEST_STORAGE_BACKEND=memory
+or sqlite to run the same suite on another store.
+
+A reference run (mongomock store) is committed as
+tests/.benchmarks/Linux-CPython-3.11-64bit/0001_baseline.json. Check a
+change against it; the run fails when a median regresses by more than 25%:
+
+    pytest tests/ --benchmark-only --benchmark-compare=0001 --benchmark-compare-fail=median:25%
+
+Timings only compare on similar hardware, the same Python and the same
+store. On a different machine, save a local reference first, then compare
+against it. The last command prints a side-by-side report of saved runs:
+
+    pytest tests/ --benchmark-only --benchmark-autosave
+    pytest tests/ --benchmark-only --benchmark-compare --benchmark-compare-fail=median:25%
+    pytest-benchmark --storage tests/.benchmarks compare 0001 0002 --group-by=name --columns=min,median,mean
+"""
+import json
+import uuid
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+
+from backend import server
+from tests.conftest import auth, seed_restaurant
+
+
+def test_get_current_user(benchmark, run, restaurant):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=restaurant["tokens"]["owner"])
+
+    user = benchmark(lambda: run(server.get_current_user(credentials)))
+
+    assert user.role == "owner"
+
+
+def test_generate_qr_code(benchmark):
+    qr_code = benchmark(server.generate_qr_code, "https://tabletech-1-production.up.railway.app/menu/bench-table")
+
+    assert qr_code.startswith("data:image/png;base64,")
+
+
+def test_get_menu_by_table(benchmark, run, api, restaurant):
+    table_id = restaurant["tables"][0]["id"]
+
+    response = benchmark(lambda: run(api.get(f"/api/public/menu/{table_id}")))
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == len(restaurant["items"])
+
+
+def test_create_order(benchmark, run, api, restaurant):
+    item = restaurant["items"][0]
+    payload = {
+        "table_id": restaurant["tables"][0]["id"],
+        "items": [{
+            "menu_item_id": item["id"],
+            "name": item["name"],
+            "price": item["price"],
+            "quantity": 2,
+            "preparation_time_minutes": item["preparation_time_minutes"],
+        }],
+        "payment_method": "cash",
+    }
+
+    response = benchmark(lambda: run(api.post("/api/orders", json=payload)))
+
+    assert response.status_code == 200
+
+
+def test_get_owner_stats(benchmark, run, api, sized_restaurant):
+    headers = auth(sized_restaurant["tokens"]["owner"])
+
+    response = benchmark(lambda: run(api.get("/api/owner/stats", headers=headers)))
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("role,path", [
+    ("owner", "/api/owner/orders"),
+    ("kitchen", "/api/kitchen/orders"),
+    ("cashier", "/api/cashier/orders"),
+    ("owner", "/api/owner/waiter-calls"),
+    ("admin", "/api/admin/orders"),
+    ("admin", "/api/admin/users"),
+    ("admin", "/api/admin/restaurants"),
+])
+def test_list_endpoints(benchmark, run, api, sized_restaurant, role, path):
+    headers = auth(sized_restaurant["tokens"][role])
+
+    response = benchmark(lambda: run(api.get(path, headers=headers)))
+
+    assert response.status_code == 200
+
+
+BULK_ORDERS = 50
+
+
+def insert_pending_orders(run, db, restaurant, count=BULK_ORDERS):
+    orders = [{
+        "id": str(uuid.uuid4()),
+        "restaurant_id": restaurant["restaurant_id"],
+        "table_id": restaurant["tables"][0]["id"],
+        "table_number": "1",
+        "items": [],
+        "total_amount": 0,
+        "payment_method": "cash",
+        "status": "pending",
+        "created_at": "2024-01-01T12:00:00+00:00",
+        "updated_at": "2024-01-01T12:00:00+00:00",
+    } for _ in range(count)]
+    run(db.orders.insert_many(orders))
+    return [order["id"] for order in orders]
+
+
+def test_update_order_status_one_by_one(benchmark, run, api, db, restaurant):
+    headers = auth(restaurant["tokens"]["kitchen"])
+
+    async def update_all(order_ids):
+        for order_id in order_ids:
+            await api.put(f"/api/kitchen/orders/{order_id}/status", json={"status": "preparing"}, headers=headers)
+
+    benchmark.pedantic(
+        lambda order_ids: run(update_all(order_ids)),
+        setup=lambda: ((insert_pending_orders(run, db, restaurant),), {}),
+        rounds=5,
+    )
+
+
+def test_update_order_status_bulk(benchmark, run, api, db, restaurant):
+    headers = auth(restaurant["tokens"]["kitchen"])
+
+    def update_all(order_ids):
+        updates = [{"order_id": order_id, "status": "preparing"} for order_id in order_ids]
+        return run(api.put("/api/kitchen/orders/status", json={"updates": updates}, headers=headers))
+
+    response = benchmark.pedantic(
+        update_all,
+        setup=lambda: ((insert_pending_orders(run, db, restaurant),), {}),
+        rounds=5,
+    )
+
+    assert response.json()["updated"] == BULK_ORDERS
+
+
+def test_bulk_status_results(run, api, db, restaurant):
+    pending, completed = insert_pending_orders(run, db, restaurant, count=2)
+    run(db.orders.update_one({"id": completed}, {"$set": {"status": "completed"}}))
+
+    response = run(api.put("/api/kitchen/orders/status", headers=auth(restaurant["tokens"]["kitchen"]), json={"updates": [
+        {"order_id": pending, "status": "ready"},
+        {"order_id": completed, "status": "preparing"},
+        {"order_id": "missing", "status": "ready"},
+        {"order_id": pending, "status": "completed"},
+        {"order_id": "other", "status": "cooking"},
+    ]}))
+
+    assert [r["result"] for r in response.json()["results"]] == [
+        "updated", "invalid_transition", "not_found", "duplicate", "invalid_status",
+    ]
+    assert run(db.orders.find_one({"id": pending}))["status"] == "ready"
+
+    response = run(api.put("/api/cashier/orders/payment", headers=auth(restaurant["tokens"]["cashier"]), json={"updates": [
+        {"order_id": completed, "payment_status": "pending"},
+        {"order_id": pending, "payment_status": "paid"},
+        {"order_id": "missing", "payment_status": "paid"},
+    ]}))
+
+    assert [(r["order_id"], r["result"]) for r in response.json()["results"]] == [
+        (completed, "skipped"), (pending, "updated"), ("missing", "not_found"),
+    ]
+    assert response.json()["updated"] == 1
+    assert run(db.orders.find_one({"id": pending}))["status"] == "completed"
+
+
+def test_single_status_update_rejects_backward_moves(run, api, db, restaurant):
+    order_id, = insert_pending_orders(run, db, restaurant, count=1)
+    headers = auth(restaurant["tokens"]["kitchen"])
+
+    def put_status(target_id, status):
+        return run(api.put(f"/api/kitchen/orders/{target_id}/status", json={"status": status}, headers=headers)).status_code
+
+    assert put_status(order_id, "ready") == 200
+    assert put_status(order_id, "preparing") == 409
+    assert put_status(order_id, "ready") == 409
+    assert put_status("missing", "ready") == 404
+
+    order = run(db.orders.find_one({"id": order_id}))
+    assert order["status"] == "ready"
+    assert set(order["status_history"]) == {"ready"}
+    assert run(server.current_order_event_seq(restaurant["restaurant_id"])) == 1
+
+    assert put_status(order_id, "completed") == 200
+
+
+RESTAURANT_SCOPED_COLLECTIONS = (
+    "users", "tables", "menu_categories", "menu_items", "orders", "reviews", "review_stats",
+    "waiter_calls", "item_sales", "kitchen_latency", "order_events",
+)
+
+
+def test_delete_restaurant_cascades(run, api, db, restaurant):
+    other = run(seed_restaurant(db, orders=5, seed=1))
+    archive = server.order_archive_name("2024-01-01T12:00:00+00:00")
+    for restaurant_id in (restaurant["restaurant_id"], other["restaurant_id"]):
+        scoped = {"restaurant_id": restaurant_id}
+        run(db.reviews.insert_one({**scoped, "id": str(uuid.uuid4()), "rating": 5}))
+        run(db.review_stats.insert_one({**scoped, "count": 1, "sum": 5}))
+        run(db.waiter_calls.insert_one({**scoped, "id": str(uuid.uuid4()), "status": "open"}))
+        run(db.item_sales.insert_one({**scoped, "window": "hour", "bucket": "2024-01-01T12", "counts": {}}))
+        run(db.kitchen_latency.insert_one({**scoped, "sketches": {}}))
+        run(db.order_events.insert_one({**scoped, "seq": 1}))
+        run(db[archive].insert_one({**scoped, "id": str(uuid.uuid4())}))
+    server.kitchen_latency[restaurant["restaurant_id"]] = server.RestaurantLatency()
+
+    response = run(api.delete(f"/api/admin/restaurants/{restaurant['restaurant_id']}", headers=auth(restaurant["tokens"]["admin"])))
+
+    assert response.status_code == 200
+    assert run(db.restaurants.count_documents({"id": restaurant["restaurant_id"]})) == 0
+    assert restaurant["restaurant_id"] not in server.kitchen_latency
+    for name in (*RESTAURANT_SCOPED_COLLECTIONS, archive):
+        assert run(db[name].count_documents({"restaurant_id": restaurant["restaurant_id"]})) == 0, name
+        assert run(db[name].count_documents({"restaurant_id": other["restaurant_id"]})) > 0, name
+
+
+MENU_IMPORT_ITEMS = 500
+
+
+def menu_import_rows(count=MENU_IMPORT_ITEMS):
+    return [{
+        "category": f"Kategori {index % 20}",
+        "name": f"Import Item {index}",
+        "description": "Imported",
+        "price": 10 + index % 50,
+        "preparation_time_minutes": 5 + index % 15,
+    } for index in range(count)]
+
+
+def test_create_menu_items_one_by_one(benchmark, run, api, restaurant):
+    headers = auth(restaurant["tokens"]["owner"])
+    category_id = run(api.get("/api/owner/menu/categories", headers=headers)).json()[0]["id"]
+
+    async def create_all():
+        for row in menu_import_rows():
+            payload = {key: value for key, value in row.items() if key != "category"}
+            await api.post("/api/owner/menu/items", json={**payload, "category_id": category_id}, headers=headers)
+
+    benchmark.pedantic(lambda: run(create_all()), rounds=3)
+
+
+@pytest.mark.parametrize("fmt", ["json", "csv"])
+def test_import_menu(benchmark, run, api, db, restaurant, fmt):
+    headers = auth(restaurant["tokens"]["owner"])
+    rows = menu_import_rows()
+    if fmt == "csv":
+        lines = ["category,name,description,price,preparation_time_minutes"]
+        lines += [",".join(str(row[key]) for key in ("category", "name", "description", "price", "preparation_time_minutes")) for row in rows]
+        body, content_type = "\n".join(lines).encode(), "text/csv"
+    else:
+        body, content_type = json.dumps(rows).encode(), "application/json"
+
+    response = benchmark.pedantic(
+        lambda: run(api.post("/api/owner/menu/import", content=body, headers={**headers, "Content-Type": content_type})),
+        rounds=3,
+    )
+
+    assert response.status_code == 200
+    # The first round creates the rows and later rounds update them; with one round (--benchmark-disable) all are created
+    assert response.json()["items_created"] + response.json()["items_updated"] == MENU_IMPORT_ITEMS
+    assert run(db.menu_items.count_documents({"restaurant_id": restaurant["restaurant_id"], "description": "Imported"})) == MENU_IMPORT_ITEMS
+
+
+def test_export_menu(benchmark, run, api, restaurant):
+    headers = auth(restaurant["tokens"]["owner"])
+    run(api.post("/api/owner/menu/import", json=menu_import_rows(), headers=headers))
+
+    response = benchmark(lambda: run(api.get("/api/owner/menu/export?format=json", headers=headers)))
+
+    assert len(response.json()) == MENU_IMPORT_ITEMS + len(restaurant["items"])
+
+
+def test_menu_import_round_trip(run, api, restaurant):
+    headers = auth(restaurant["tokens"]["owner"])
+
+    invalid = run(api.post("/api/owner/menu/import", json=[{"category": "A", "name": "x", "price": -1}, {"name": "y"}], headers=headers))
+    assert invalid.status_code == 422
+    assert [row["row"] for row in invalid.json()["detail"]["rows"]] == [1, 2]
+
+    exported = run(api.get("/api/owner/menu/export", headers=headers)).text
+    response = run(api.post("/api/owner/menu/import?format=csv", content=exported.encode(), headers=headers))
+
+    assert response.json() == {"categories_created": 0, "items_created": 0, "items_updated": len(restaurant["items"])}
+
+
+def test_reorder_categories(benchmark, run, api, db, restaurant):
+    headers = auth(restaurant["tokens"]["owner"])
+    run(api.post("/api/owner/menu/import", json=menu_import_rows(), headers=headers))
+    category_ids = [c["id"] for c in run(api.get("/api/owner/menu/categories", headers=headers)).json()]
+
+    response = benchmark(lambda: run(api.put(
+        "/api/owner/menu/categories/order", json={"category_ids": category_ids[::-1]}, headers=headers
+    )))
+
+    assert response.status_code == 200
+    assert sorted(c["id"] for c in response.json()) == sorted(category_ids)
+
+
+OWNER_DASHBOARD_PATHS = ["/api/owner/stats", "/api/owner/menu/categories", "/api/owner/menu/items", "/api/owner/tables", "/api/owner/orders"]
+
+
+def test_owner_dashboard_separate_requests(benchmark, run, api, sized_restaurant):
+    headers = auth(sized_restaurant["tokens"]["owner"])
+
+    async def load_all():
+        return [await api.get(path, headers=headers) for path in OWNER_DASHBOARD_PATHS]
+
+    responses = benchmark(lambda: run(load_all()))
+
+    assert all(response.status_code == 200 for response in responses)
+
+
+def test_owner_dashboard(benchmark, run, api, sized_restaurant):
+    headers = {**auth(sized_restaurant["tokens"]["owner"]), "Accept-Encoding": "gzip"}
+
+    response = benchmark(lambda: run(api.get("/api/owner/dashboard", headers=headers)))
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    payload = response.json()
+    assert set(payload) == {"stats", "categories", "items", "tables", "orders"}
+    assert "qr_code" not in payload["tables"][0]
+
+
+def test_owner_dashboard_sections_and_fields(run, api, restaurant):
+    headers = auth(restaurant["tokens"]["owner"])
+
+    response = run(api.get("/api/owner/dashboard?sections=items,tables&items_fields=id,name&include_qr=true", headers=headers))
+
+    assert set(response.json()) == {"items", "tables"}
+    assert set(response.json()["items"][0]) == {"id", "name"}
+    assert "qr_code" in response.json()["tables"][0]
+    assert run(api.get("/api/owner/dashboard?sections=secrets", headers=headers)).status_code == 400
@@ -0,0 +1,79 @@
+"""Precompressed static files and the cached index.html: encoding negotiation, Vary and ETag/304."""
+import gzip
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.requests import Request
+
+from backend import server
+
+
+@pytest.fixture
+def static(loop, tmp_path):
+    (tmp_path / "main.0123abcd.js").write_text("console.log('app')")
+    (tmp_path / "main.0123abcd.js.br").write_bytes(b"br-bytes")
+    (tmp_path / "main.0123abcd.js.gz").write_bytes(gzip.compress(b"console.log('app')"))
+    (tmp_path / "style.css").write_text("body {}")
+    files = server.PrecompressedStaticFiles(directory=tmp_path)
+    app = FastAPI()
+    app.mount("/static", files)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+    yield files, client
+    loop.run_until_complete(client.aclose())
+
+
+@pytest.mark.parametrize("accept,encoding", [("gzip, deflate, br", "br"), ("gzip", "gzip"), ("br;q=0, gzip", "gzip"), ("", None)])
+def test_static_encoding_negotiation(run, static, accept, encoding):
+    _, client = static
+
+    response = run(client.get("/static/main.0123abcd.js", headers={"Accept-Encoding": accept}))
+
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == server.IMMUTABLE_CACHE_CONTROL
+
+
+def test_static_etag_revalidation(run, static):
+    _, client = static
+    etag = run(client.get("/static/style.css")).headers["etag"]
+
+    response = run(client.get("/static/style.css", headers={"If-None-Match": etag}))
+
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == server.REVALIDATE_CACHE_CONTROL
+
+
+def test_missing_encoded_siblings_are_looked_up_once(run, static, monkeypatch):
+    files, client = static
+    lookups = []
+    lookup_path = files.lookup_path
+    monkeypatch.setattr(files, "lookup_path", lambda path: lookups.append(path) or lookup_path(path))
+
+    for _ in range(3):
+        assert run(client.get("/static/style.css", headers={"Accept-Encoding": "gzip, br"})).status_code == 200
+
+    assert sorted(lookups) == ["style.css", "style.css.br", "style.css.gz"]
+    assert run(client.get("/static/missing.js")).status_code == 404
+
+
+def index_request(headers):
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+
+def test_index_html_variants_and_etag(tmp_path):
+    (tmp_path / "index.html").write_text("<html>app</html>")
+    index = server.CachedIndexHtml(tmp_path / "index.html")
+    assert index.load()
+
+    gzipped = index.response(index_request({"Accept-Encoding": "gzip"}))
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(gzipped.body) == b"<html>app</html>"
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+
+    plain = index.response(index_request({}))
+    assert "content-encoding" not in plain.headers and plain.body == b"<html>app</html>"
+
+    assert index.response(index_request({"If-None-Match": index.etag})).status_code == 304
+    assert index.response(index_request({"If-None-Match": 'W/"other"'})).status_code == 200
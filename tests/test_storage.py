@@ -0,0 +1,190 @@
+"""Storage backends: the same checks and per-operation benchmarks on every store.
+
+Benchmarks are grouped per operation so pytest-benchmark prints the backends
+side by side:
+
+    pytest tests/test_storage.py --benchmark-only --benchmark-group-by=group
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from backend import storage
+from tests.conftest import open_database
+
+BACKENDS = ["memory", "sqlite", "mongomock"]
+BENCH_ORDERS = 1000
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, run, tmp_path):
+    database = open_database(request.param, tmp_path)
+    yield database
+    if request.param != "mongomock":
+        database.close()
+
+
+def order_docs(count, restaurants=10, start=datetime(2024, 1, 1, tzinfo=timezone.utc)):
+    statuses = ["pending", "preparing", "ready", "completed"]
+    return [{
+        "id": f"order-{i}",
+        "restaurant_id": f"r{i % restaurants}",
+        "status": statuses[i % len(statuses)],
+        "total_amount": float(i % 50),
+        "created_at": start + timedelta(minutes=i),
+        "items": [{"name": "Item", "quantity": 1 + i % 3}],
+    } for i in range(count)]
+
+
+async def load_orders(database, count):
+    await database.orders.create_index("id")
+    await database.orders.create_index([("restaurant_id", 1), ("status", 1), ("created_at", 1)])
+    await database.orders.insert_many(order_docs(count))
+
+
+def test_query_operators(run, store):
+    run(load_orders(store, 40))
+    orders = store.orders
+
+    def ids(query, **kwargs):
+        return sorted(doc["id"] for doc in run(orders.find(query, {"_id": 0, "id": 1}, **kwargs).to_list(None)))
+
+    assert len(ids({"restaurant_id": "r1"})) == 4
+    assert len(ids({"restaurant_id": {"$in": ["r1", "r2"]}, "status": {"$ne": "completed"}})) == 6
+    assert ids({"total_amount": {"$gte": 38, "$lt": 39}}) == ["order-38"]
+    assert ids({"created_at": {"$lt": datetime(2024, 1, 1, 0, 2, tzinfo=timezone.utc)}}) == ["order-0", "order-1"]
+    assert ids({"$or": [{"id": "order-3"}, {"id": "order-5"}]}) == ["order-3", "order-5"]
+    assert ids({"missing": {"$exists": True}}) == []
+    assert ids({"missing": None, "id": "order-7"}) == ["order-7"]
+    assert ids({"items.quantity": 3, "restaurant_id": "r2"}) == ["order-2", "order-32"]
+
+
+def test_sort_limit_and_projection(run, store):
+    run(load_orders(store, 20))
+
+    docs = run(store.orders.find({"restaurant_id": "r0"}, {"_id": 0, "items": 0}).sort("created_at", -1).limit(1).to_list(None))
+    assert docs == [{
+        "id": "order-10", "restaurant_id": "r0", "status": "ready", "total_amount": 10.0,
+        "created_at": datetime(2024, 1, 1, 0, 10),
+    }]
+    docs = run(store.orders.find({}, {"_id": 0, "id": 1}).sort([("status", 1), ("id", -1)]).limit(3).to_list(None))
+    assert [doc["id"] for doc in docs] == ["order-7", "order-3", "order-19"]
+    assert run(store.orders.find_one({"id": "order-1"}, {"_id": 0, "items.quantity": 1})) == {"items": [{"quantity": 2}]}
+    assert run(store.orders.find_one({"id": "order-1"}, {"_id": 0, "items.name": 0, "created_at": 0, "status": 0})) == {
+        "id": "order-1", "restaurant_id": "r1", "total_amount": 1.0, "items": [{"quantity": 2}],
+    }
+
+
+def test_updates_and_upserts(run, store):
+    run(load_orders(store, 4))
+    orders = store.orders
+
+    result = run(orders.update_many({"status": {"$in": ["pending", "preparing"]}}, {"$set": {"status": "ready"}, "$inc": {"stats.touched": 1}}))
+    assert (result.matched_count, result.modified_count) == (2, 2)
+    assert run(orders.find_one({"id": "order-1"}, {"_id": 0, "stats": 1})) == {"stats": {"touched": 1}}
+
+    result = run(orders.update_one({"id": "order-9"}, {"$set": {"status": "pending"}, "$setOnInsert": {"restaurant_id": "r9"}}, upsert=True))
+    assert result.upserted_id is not None
+    assert run(orders.find_one({"id": "order-9"}, {"_id": 0})) == {"id": "order-9", "status": "pending", "restaurant_id": "r9"}
+
+    doc = run(orders.find_one_and_update(
+        {"_id": "counter"}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    ))
+    assert doc == {"_id": "counter", "seq": 1}
+    doc = run(orders.find_one_and_update({"_id": "counter"}, {"$inc": {"seq": 1}}, projection={"_id": 0}))
+    assert doc == {"seq": 1}
+
+    assert run(orders.delete_many({"status": "ready"})).deleted_count == 3
+    assert run(orders.count_documents({})) == 3
+
+
+def test_unique_partial_index(run, store):
+    calls = store.waiter_calls
+    run(calls.create_index([("restaurant_id", 1), ("table_id", 1)], unique=True, partialFilterExpression={"status": "pending"}))
+    run(calls.insert_one({"restaurant_id": "r", "table_id": "t", "status": "pending"}))
+    run(calls.insert_one({"restaurant_id": "r", "table_id": "t", "status": "resolved"}))
+
+    with pytest.raises(DuplicateKeyError):
+        run(calls.insert_one({"restaurant_id": "r", "table_id": "t", "status": "pending"}))
+    with pytest.raises(BulkWriteError) as error:
+        run(calls.insert_many([{"restaurant_id": "r", "table_id": "t", "status": "pending"}, {"restaurant_id": "r", "table_id": "u", "status": "pending"}], ordered=False))
+    assert [e["code"] for e in error.value.details["writeErrors"]] == [11000]
+    assert run(calls.count_documents({"status": "pending"})) == 2
+
+
+def test_bulk_write_and_aggregate(run, store):
+    run(load_orders(store, 8))
+
+    result = run(store.orders.bulk_write([
+        UpdateOne({"id": "order-0"}, {"$set": {"status": "completed"}}),
+        UpdateOne({"id": "new"}, {"$set": {"status": "pending", "restaurant_id": "r0", "total_amount": 5.0}}, upsert=True),
+        InsertOne({"id": "inserted", "restaurant_id": "r1", "status": "completed", "total_amount": 1.0}),
+        DeleteOne({"id": "order-7"}),
+    ], ordered=False))
+    assert (result.matched_count, result.upserted_count, result.inserted_count, result.deleted_count) == (1, 1, 1, 1)
+
+    rows = run(store.orders.aggregate([
+        {"$match": {"status": "completed"}},
+        {"$group": {"_id": "$restaurant_id", "count": {"$sum": 1}, "revenue": {"$sum": "$total_amount"}}},
+        {"$sort": {"_id": 1}},
+    ]).to_list(None))
+    assert rows == [{"_id": "r0", "count": 1, "revenue": 0.0}, {"_id": "r1", "count": 1, "revenue": 1.0}, {"_id": "r3", "count": 1, "revenue": 3.0}]
+
+
+def test_unsupported_operator_is_loud(run):
+    orders = storage.MemoryDatabase().orders
+    run(orders.insert_one({"name": "a"}))
+
+    with pytest.raises(NotImplementedError):
+        run(orders.find({"name": {"$regex": "^a"}}).to_list(None))
+
+
+# Per-operation costs; compare with --benchmark-group-by=group
+@pytest.fixture
+def loaded_store(run, store):
+    run(load_orders(store, BENCH_ORDERS))
+    return store
+
+
+def test_bench_insert_one(benchmark, run, store):
+    benchmark.group = "storage-insert_one"
+    benchmark(lambda: run(store.orders.insert_one({"id": str(uuid.uuid4()), "restaurant_id": "r1", "status": "pending"})))
+
+
+def test_bench_insert_many(benchmark, run, store):
+    benchmark.group = "storage-insert_many-1000"
+    benchmark.pedantic(lambda docs: run(store.orders.insert_many(docs)), setup=lambda: ((order_docs(1000),), {}), rounds=5)
+
+
+def test_bench_find_one_by_id(benchmark, run, loaded_store):
+    benchmark.group = "storage-find_one-by-id"
+    doc = benchmark(lambda: run(loaded_store.orders.find_one({"id": "order-500"}, {"_id": 0})))
+    assert doc["id"] == "order-500"
+
+
+def test_bench_find_restaurant_orders(benchmark, run, loaded_store):
+    benchmark.group = "storage-find-restaurant-status-sorted"
+    query = {"restaurant_id": "r3", "status": {"$in": ["pending", "preparing"]}}
+    docs = benchmark(lambda: run(loaded_store.orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)))
+    assert len(docs) == 50
+
+
+def test_bench_update_one(benchmark, run, loaded_store):
+    benchmark.group = "storage-update_one"
+    benchmark(lambda: run(loaded_store.orders.update_one({"id": "order-42"}, {"$inc": {"total_amount": 1}})))
+
+
+def test_bench_bulk_write(benchmark, run, loaded_store):
+    benchmark.group = "storage-bulk_write-100"
+    operations = [UpdateOne({"id": f"order-{i}"}, {"$set": {"status": "ready"}}) for i in range(100)]
+    benchmark(lambda: run(loaded_store.orders.bulk_write(operations, ordered=False)))
+
+
+def test_bench_aggregate(benchmark, run, loaded_store):
+    benchmark.group = "storage-aggregate-revenue"
+    pipeline = [{"$match": {"restaurant_id": "r1"}}, {"$group": {"_id": "$status", "revenue": {"$sum": "$total_amount"}}}]
+    rows = benchmark(lambda: run(loaded_store.orders.aggregate(pipeline).to_list(None)))
+    assert len(rows) == 2
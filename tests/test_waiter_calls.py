@@ -0,0 +1,67 @@
+"""Waiter calls: coalescing upsert, the non-coalescing mode and the owner SSE stream."""
+import asyncio
+
+from starlette.requests import Request
+
+from backend import server
+from tests.conftest import TEST_STORAGE_BACKEND, auth, open_database
+
+
+def owner_request():
+    never = asyncio.Event()
+
+    async def receive():
+        await never.wait()
+
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive)
+
+
+def tap(run, api, table_id):
+    return run(api.post("/api/waiter-call", json={"table_id": table_id}))
+
+
+def test_repeat_taps_coalesce_into_one_open_call(run, api, db, restaurant):
+    table_id = restaurant["tables"][0]["id"]
+
+    first, second = tap(run, api, table_id), tap(run, api, table_id)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["id"] == second.json()["id"]
+    assert second.json()["call_count"] == 2
+    assert run(db.waiter_calls.count_documents({"table_id": table_id})) == 1
+
+
+def test_non_coalescing_mode_records_every_tap(run, api, restaurant, monkeypatch, tmp_path):
+    table_id = restaurant["tables"][0]["id"]
+    monkeypatch.setattr(server, "WAITER_CALL_COALESCE", False)
+
+    # Index left behind by an earlier coalescing deploy: the tap joins the open call instead of failing
+    assert tap(run, api, table_id).status_code == 200
+    assert tap(run, api, table_id).status_code == 200
+
+    fresh = tmp_path / "fresh"
+    fresh.mkdir()
+    database = open_database(TEST_STORAGE_BACKEND, fresh)
+    monkeypatch.setattr(server, "db", server.CursorTrackingDatabase(database))
+    run(server.ensure_indexes())
+    run(database.tables.insert_one(dict(restaurant["tables"][0])))
+    server.table_cache.evict()
+
+    assert tap(run, api, table_id).status_code == 200
+    assert tap(run, api, table_id).status_code == 200
+    assert run(database.waiter_calls.count_documents({"table_id": table_id})) == 2
+
+
+def test_stream_delivers_calls_and_resolutions(run, api, restaurant):
+    restaurant_id = restaurant["restaurant_id"]
+    stream = server.sse_response(server.waiter_call_events, restaurant_id, owner_request()).body_iterator
+    assert ": connected" in run(stream.__anext__())
+
+    call = tap(run, api, restaurant["tables"][0]["id"]).json()
+    frame = run(asyncio.wait_for(stream.__anext__(), 1))
+    assert "event: waiter_call" in frame and call["id"] in frame
+
+    run(api.put(f"/api/owner/waiter-calls/{call['id']}", headers=auth(restaurant["tokens"]["owner"])))
+    frame = run(asyncio.wait_for(stream.__anext__(), 1))
+    assert "event: waiter_call_resolved" in frame and call["id"] in frame
+    run(stream.aclose())